@@ -4,6 +4,7 @@ import os
 from dotenv import load_dotenv
 
 from core.bot import PizzaHat
+from core.lifecycle import reexec
 
 load_dotenv()
 
@@ -12,3 +13,7 @@ logger = logging.getLogger("bot")
 if __name__ == "__main__":
     bot = PizzaHat()
     bot.run(os.getenv("TOKEN"), root_logger=True)  # type: ignore
+
+    # only once the loop is gone, so everything got closed first
+    if bot.lifecycle.restarting:
+        reexec()
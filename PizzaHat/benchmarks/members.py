@@ -0,0 +1,204 @@
+import argparse
+import asyncio
+import gc
+import json
+import os
+import resource
+import subprocess
+import sys
+import tempfile
+from typing import Any, Dict, Iterator, List
+
+from benchmarks.replay import (
+    SyntheticGuild,
+    member_payload,
+    next_snowflake,
+    user_payload,
+)
+from benchmarks.startup import install_mocks
+
+# The cache policies to compare, as the environment core/cache.py reads.
+POLICIES = {
+    "startup": {"CHUNK_GUILDS_AT_STARTUP": "1", "MEMBER_CACHE": "default"},
+    "lazy": {"CHUNK_GUILDS_AT_STARTUP": "0", "MEMBER_CACHE": "default"},
+    "lazy-uncached": {"CHUNK_GUILDS_AT_STARTUP": "0", "MEMBER_CACHE": "none"},
+}
+
+CHUNK_SIZE = 1000  # members per GUILD_MEMBERS_CHUNK, as Discord sends them
+
+
+def rss_mb() -> float:
+    try:
+        with open("/proc/self/statm") as f:
+            pages = int(f.read().split()[1])
+
+        return pages * os.sysconf("SC_PAGE_SIZE") / 1024**2
+
+    except OSError:
+        # no procfs, fall back to the peak
+        rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+        return rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+
+def member_chunks(guild_id: int, members: int) -> Iterator[Dict[str, Any]]:
+    # built a chunk at a time so the payloads don't outweigh the cache
+    count = -(-members // CHUNK_SIZE)
+
+    for index in range(count):
+        size = min(CHUNK_SIZE, members - index * CHUNK_SIZE)
+        yield {
+            "guild_id": str(guild_id),
+            "members": [
+                member_payload(user_payload(next_snowflake(), f"user{i}"), [])
+                for i in range(size)
+            ],
+            "chunk_index": index,
+            "chunk_count": count,
+            "not_found": [],
+        }
+
+
+# ====== CHILD ======
+
+
+class FakeGateway:
+    """Answers member chunk requests the way Discord would."""
+
+    def __init__(self, state, members: int):
+        self.state = state
+        self.members = members
+
+    async def request_chunks(self, guild_id: int, *, nonce=None, **kwargs):
+        # the answer has to come after the request starts waiting on it
+        asyncio.get_running_loop().call_soon(self.answer, guild_id, nonce)
+
+    def answer(self, guild_id: int, nonce):
+        for data in member_chunks(guild_id, self.members):
+            data["nonce"] = nonce
+            self.state.parsers["GUILD_MEMBERS_CHUNK"](data)
+
+
+async def load(results: Dict[str, Any], guilds: int, members: int, on_demand: int):
+    from core.bot import PizzaHat
+
+    bot = PizzaHat()
+    install_mocks(bot)
+    await bot._async_setup_hook()
+    state = bot._connection
+
+    gateway = FakeGateway(state, members)
+    state._get_websocket = lambda *args, **kwargs: gateway
+
+    # chunked below, after every guild is in, as READY would
+    chunk = state._chunk_guilds
+    state._chunk_guilds = False
+
+    gc.collect()
+    before = rss_mb()
+
+    for seed in range(guilds):
+        guild = SyntheticGuild(bot.user, 0, seed)  # type: ignore
+
+        # a large guild only arrives with the bot and the owner in it
+        payload = guild.guild_create()
+        payload["large"] = True
+        payload["member_count"] = members + len(payload["members"])
+        state.parsers["GUILD_CREATE"](payload)
+
+    if chunk:
+        for guild in bot.guilds:
+            await state.chunk_guild(guild)
+
+    else:
+        # someone running serverinfo in a few of them
+        for guild in bot.guilds[:on_demand]:
+            await bot.stats.complete(guild)
+
+    await asyncio.sleep(0)
+    gc.collect()
+
+    results["rss_mb"] = rss_mb()
+    results["cache_mb"] = results["rss_mb"] - before
+    results["cached_members"] = sum(len(g.members) for g in bot.guilds)
+    results["total_members"] = sum(g.member_count or 0 for g in bot.guilds)
+
+    await bot.close()
+
+
+def child(output: str, guilds: int, members: int, on_demand: int):
+    results: Dict[str, Any] = {}
+    asyncio.run(load(results, guilds, members, on_demand))
+
+    with open(output, "w") as f:
+        json.dump(results, f)
+
+
+# ====== PARENT ======
+
+
+def run(policy: str, guilds: int, members: int, on_demand: int) -> Dict[str, Any]:
+    env = dict(os.environ, **POLICIES[policy])
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-m", "benchmarks.members", "--child", output]
+            + ["--guilds", str(guilds), "--members", str(members)]
+            + ["--on-demand", str(on_demand)],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+        if proc.returncode != 0:
+            raise RuntimeError(f"{policy} run failed:\n{proc.stderr[-2000:]}")
+
+        with open(output) as f:
+            return json.load(f)
+
+    finally:
+        os.unlink(output)
+
+
+def report(results: Dict[str, Dict[str, Any]]):
+    from utils.formats import TabularData
+
+    table = TabularData()
+    table.set_columns(["Policy", "Cached members", "RSS", "Cache"])
+    table.add_rows(
+        [
+            policy,
+            f"{r['cached_members']:,}/{r['total_members']:,}",
+            f"{r['rss_mb']:.1f}MB",
+            f"{r['cache_mb']:.1f}MB",
+        ]
+        for policy, r in results.items()
+    )
+    print(table.render())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Member cache memory benchmark")
+    parser.add_argument("--guilds", type=int, default=10)
+    parser.add_argument("--members", type=int, default=3000, help="per guild")
+    parser.add_argument(
+        "--on-demand", type=int, default=2, help="guilds chunked by a command"
+    )
+    parser.add_argument("--policy", choices=POLICIES, action="append")
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child, args.guilds, args.members, args.on_demand)
+
+    policies: List[str] = args.policy or list(POLICIES)
+    report(
+        {p: run(p, args.guilds, args.members, args.on_demand) for p in policies}
+    )
+
+
+if __name__ == "__main__":
+    main()
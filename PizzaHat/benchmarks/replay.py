@@ -0,0 +1,599 @@
+import argparse
+import asyncio
+import contextvars
+import datetime
+import itertools
+import json
+import os
+import random
+import time
+from collections import Counter, defaultdict
+from typing import Any, Callable, Dict, Iterator, List, Optional, Tuple
+
+import discord
+
+from benchmarks.startup import FakePool, install_mocks
+
+Payload = Dict[str, Any]
+
+DEFAULT_MIX = (
+    "MESSAGE_CREATE=60,MESSAGE_UPDATE=15,MESSAGE_DELETE=5,"
+    "GUILD_MEMBER_UPDATE=15,GUILD_ROLE_UPDATE=5"
+)
+
+# Chatter the synthetic MESSAGE_CREATE events pick from, covering the
+# automod paths and a command.
+CONTENTS = [
+    "hello there",
+    "has anyone seen the new update?",
+    "THIS IS SO COOL I CAN'T BELIEVE IT",
+    "join my server discord.gg/abcdef",
+    "lol",
+    "p!help",
+    "https://example.com/some/long/link?with=params",
+]
+
+# The listener a query belongs to, so the pool can attribute it.
+current_listener: contextvars.ContextVar[Optional[str]] = contextvars.ContextVar(
+    "current_listener", default=None
+)
+
+
+# ====== STATS ======
+
+
+class ListenerStats:
+    __slots__ = ("calls", "errors", "queries", "timings")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.queries = 0
+        self.timings: List[float] = []
+
+    def percentile(self, p: float) -> float:
+        if not self.timings:
+            return 0.0
+
+        ordered = sorted(self.timings)
+        return ordered[min(len(ordered) - 1, int(len(ordered) * p))]
+
+
+class Recorder:
+    def __init__(self):
+        self.listeners: Dict[str, ListenerStats] = defaultdict(ListenerStats)
+        self.rest: Counter = Counter()
+        self.pending = 0
+        self.idle = asyncio.Event()
+        self.idle.set()
+
+    def reset(self):
+        self.listeners.clear()
+        self.rest.clear()
+
+    def query(self):
+        name = current_listener.get()
+        if name is not None:
+            self.listeners[name].queries += 1
+
+    def wrap(self, name: str, func: Callable) -> Callable:
+        async def timed(*args, **kwargs):
+            token = current_listener.set(name)
+            stats = self.listeners[name]
+            self.pending += 1
+            self.idle.clear()
+            start = time.perf_counter()
+
+            try:
+                return await func(*args, **kwargs)
+
+            except Exception:
+                stats.errors += 1
+                raise
+
+            finally:
+                stats.calls += 1
+                stats.timings.append(time.perf_counter() - start)
+                current_listener.reset(token)
+                self.pending -= 1
+                if self.pending == 0:
+                    self.idle.set()
+
+        timed.__name__ = getattr(func, "__name__", name)
+        return timed
+
+
+def instrument(bot, recorder: Recorder):
+    """Wraps every cog listener and the bot's own `on_` event methods."""
+
+    for event, funcs in bot.extra_events.items():
+        bot.extra_events[event] = [
+            recorder.wrap(f"{event}:{getattr(f, '__qualname__', f)}", f) for f in funcs
+        ]
+
+    for attr in dir(type(bot)):
+        # on_error reports failures of the other listeners, it isn't one
+        if not attr.startswith("on_") or attr == "on_error":
+            continue
+
+        method = getattr(bot, attr)
+        if asyncio.iscoroutinefunction(method):
+            setattr(bot, attr, recorder.wrap(f"{attr}:PizzaHat", method))
+
+
+# ====== DATABASE ======
+
+
+class CountingPool:
+    """Counts queries against the listener running them, then hands them on."""
+
+    def __init__(self, pool, recorder: Recorder):
+        self._pool = pool
+        self._recorder = recorder
+
+    def __getattr__(self, name: str):
+        attr = getattr(self._pool, name)
+
+        if name not in ("execute", "executemany", "fetch", "fetchrow", "fetchval"):
+            return attr
+
+        async def query(*args, **kwargs):
+            self._recorder.query()
+            return await attr(*args, **kwargs)
+
+        return query
+
+
+class SeededPool(FakePool):
+    """A fake pool that answers the per-guild settings lookups."""
+
+    def __init__(self, answers: Dict[str, Any]):
+        self.answers = answers
+
+    async def fetchval(self, query: str, *args, **kwargs):
+        for table, value in self.answers.items():
+            if f"FROM {table}" in query:
+                return value
+
+
+async def seed_database(pool, guild: "SyntheticGuild"):
+    from core.queries import create_tables
+
+    await create_tables(pool)
+    await pool.execute(
+        """INSERT INTO modlogs VALUES ($1, $2)
+        ON CONFLICT (guild_id) DO UPDATE SET channel_id=$2""",
+        guild.id,
+        guild.log_channel_id,
+    )
+    await pool.execute(
+        "INSERT INTO automod VALUES ($1, TRUE) ON CONFLICT (guild_id) DO NOTHING",
+        guild.id,
+    )
+
+
+# ====== REST ======
+
+
+def install_stub_rest(bot, recorder: Recorder):
+    """Answers every Discord REST call locally with the smallest valid payload."""
+
+    async def request(route, **kwargs):
+        recorder.rest[f"{route.method} {route.path}"] += 1
+
+        if route.method == "POST" and route.path.endswith("/messages"):
+            payload = kwargs.get("json") or {}
+            author = user_payload(bot.user.id, bot.user.name, bot=True)
+            message = message_payload(next_snowflake(), route.channel_id, None, author)
+            message["content"] = payload.get("content") or ""
+            message["embeds"] = payload.get("embeds") or []
+            return message
+
+        if route.method == "GET" and route.path.endswith("/messages"):
+            return []
+
+        return {} if route.method != "DELETE" else None
+
+    bot.http.request = request
+
+
+# ====== PAYLOADS ======
+
+_counter = itertools.count()
+
+
+def next_snowflake() -> int:
+    now = discord.utils.time_snowflake(datetime.datetime.now(datetime.timezone.utc))
+    return now + next(_counter) % 4096
+
+
+def now_iso() -> str:
+    return datetime.datetime.now(datetime.timezone.utc).isoformat()
+
+
+def user_payload(user_id: int, name: str, bot: bool = False) -> Payload:
+    return {
+        "id": str(user_id),
+        "username": name,
+        "discriminator": "0",
+        "global_name": None,
+        "avatar": f"{user_id:032x}",
+        "bot": bot,
+    }
+
+
+def member_payload(
+    user: Payload, roles: List[str], nick: Optional[str] = None
+) -> Payload:
+    return {
+        "user": user,
+        "roles": roles,
+        "nick": nick,
+        "joined_at": now_iso(),
+        "deaf": False,
+        "mute": False,
+        "flags": 0,
+    }
+
+
+def role_payload(
+    role_id: int, name: str, permissions: int = 0, position: int = 0
+) -> Payload:
+    return {
+        "id": str(role_id),
+        "name": name,
+        "color": 0,
+        "hoist": False,
+        "position": position,
+        "permissions": str(permissions),
+        "managed": False,
+        "mentionable": False,
+        "flags": 0,
+    }
+
+
+def message_payload(
+    message_id: int,
+    channel_id: int,
+    guild_id: Optional[int],
+    author: Payload,
+    content: str = "",
+) -> Payload:
+    payload = {
+        "id": str(message_id),
+        "channel_id": str(channel_id),
+        "author": author,
+        "content": content,
+        "timestamp": now_iso(),
+        "edited_timestamp": None,
+        "tts": False,
+        "mention_everyone": False,
+        "mentions": [],
+        "mention_roles": [],
+        "attachments": [],
+        "embeds": [],
+        "pinned": False,
+        "type": 0,
+    }
+
+    if guild_id is not None:
+        payload["guild_id"] = str(guild_id)
+
+    return payload
+
+
+class SyntheticGuild:
+    """A made up guild, and a stream of plausible gateway events inside it."""
+
+    def __init__(self, bot_user: discord.ClientUser, members: int, seed: int = 0):
+        self.rng = random.Random(seed)
+        self.id = next_snowflake()
+        self.owner_id = next_snowflake()
+        self.channel_ids = [next_snowflake() for _ in range(5)]
+        self.log_channel_id = next_snowflake()
+
+        admin = next_snowflake()
+        self.roles = [role_payload(self.id, "@everyone", permissions=0x400 | 0x800)]
+        self.roles += [
+            role_payload(next_snowflake(), f"role-{i}", position=i + 1)
+            for i in range(10)
+        ]
+        self.roles.append(role_payload(admin, "bot", permissions=0x8, position=20))
+
+        self.users = [user_payload(self.owner_id, "owner")]
+        self.users += [
+            user_payload(next_snowflake(), f"user{i}") for i in range(members)
+        ]
+        self.members = [member_payload(u, []) for u in self.users]
+
+        me = user_payload(bot_user.id, bot_user.name, bot=True)
+        self.members.append(member_payload(me, [str(admin)]))
+
+        self.messages: List[Tuple[int, int, Payload]] = []
+
+    def guild_create(self) -> Payload:
+        channels = [
+            {
+                "id": str(channel_id),
+                "type": 0,
+                "name": f"channel-{i}",
+                "position": i,
+                "permission_overwrites": [],
+                "nsfw": False,
+                "parent_id": None,
+            }
+            for i, channel_id in enumerate(self.channel_ids + [self.log_channel_id])
+        ]
+        channels[-1]["name"] = "mod-logs"
+
+        return {
+            "id": str(self.id),
+            "name": "Replay Guild",
+            "icon": None,
+            "owner_id": str(self.owner_id),
+            "roles": self.roles,
+            "emojis": [],
+            "stickers": [],
+            "features": [],
+            "member_count": len(self.members),
+            "members": self.members,
+            "channels": channels,
+            "threads": [],
+            "large": False,
+            "verification_level": 0,
+            "default_message_notifications": 0,
+            "explicit_content_filter": 0,
+            "mfa_level": 0,
+            "premium_tier": 0,
+            "preferred_locale": "en-US",
+            "system_channel_flags": 0,
+            "voice_states": [],
+            "presences": [],
+            "stage_instances": [],
+            "guild_scheduled_events": [],
+        }
+
+    def _member(self) -> Tuple[Payload, Payload]:
+        # skip the owner, who bypasses automod
+        index = self.rng.randrange(1, len(self.users))
+        return self.users[index], self.members[index]
+
+    def message_create(self) -> Payload:
+        user, member = self._member()
+        channel_id = self.rng.choice(self.channel_ids)
+        message = message_payload(
+            next_snowflake(), channel_id, self.id, user, self.rng.choice(CONTENTS)
+        )
+        message["member"] = {k: v for k, v in member.items() if k != "user"}
+
+        self.messages.append((int(message["id"]), channel_id, message))
+        del self.messages[:-1000]
+        return message
+
+    def message_update(self) -> Payload:
+        if not self.messages:
+            return self.message_create()
+
+        _, _, message = self.rng.choice(self.messages)
+        return {
+            **message,
+            "content": message["content"] + " (edited)",
+            "edited_timestamp": now_iso(),
+        }
+
+    def message_delete(self) -> Payload:
+        if not self.messages:
+            return self.message_create()
+
+        index = self.rng.randrange(len(self.messages))
+        message_id, channel_id, _ = self.messages.pop(index)
+        return {
+            "id": str(message_id),
+            "channel_id": str(channel_id),
+            "guild_id": str(self.id),
+        }
+
+    def message_delete_bulk(self) -> Payload:
+        if not self.messages:
+            return self.message_create()
+
+        # a purge: the newest messages of one channel
+        channel_id = self.messages[-1][1]
+        picked = [m for m in self.messages if m[1] == channel_id][-50:]
+        self.messages = [m for m in self.messages if m not in picked]
+        return {
+            "ids": [str(message_id) for message_id, _, _ in picked],
+            "channel_id": str(channel_id),
+            "guild_id": str(self.id),
+        }
+
+    def guild_member_update(self) -> Payload:
+        user, member = self._member()
+        picked = self.rng.sample(self.roles[1:-1], self.rng.randint(0, 3))
+        roles = [role["id"] for role in picked]
+        nick = self.rng.choice([None, f"nick{self.rng.randrange(100)}"])
+        member.update(roles=roles, nick=nick)
+        return {**member, "guild_id": str(self.id), "user": user}
+
+    def guild_role_update(self) -> Payload:
+        role = dict(self.rng.choice(self.roles[1:-1]))
+        role["color"] = self.rng.randrange(0xFFFFFF)
+        return {"guild_id": str(self.id), "role": role}
+
+    def events(self, mix: Dict[str, int], count: int) -> Iterator[Tuple[str, Payload]]:
+        makers = {
+            "MESSAGE_CREATE": self.message_create,
+            "MESSAGE_UPDATE": self.message_update,
+            "MESSAGE_DELETE": self.message_delete,
+            "MESSAGE_DELETE_BULK": self.message_delete_bulk,
+            "GUILD_MEMBER_UPDATE": self.guild_member_update,
+            "GUILD_ROLE_UPDATE": self.guild_role_update,
+        }
+        unknown = set(mix) - set(makers)
+        if unknown:
+            raise ValueError(f"Can't generate {', '.join(unknown)}")
+
+        names, weights = list(mix), list(mix.values())
+        for _ in range(count):
+            name = self.rng.choices(names, weights)[0]
+            yield name, makers[name]()
+
+
+def recorded_events(path: str) -> Iterator[Tuple[str, Payload]]:
+    """Reads gateway dispatches, one `{"t": ..., "d": ...}` object per line."""
+
+    with open(path) as f:
+        for line in f:
+            if line.strip():
+                event = json.loads(line)
+                yield event["t"], event["d"]
+
+
+def parse_mix(mix: str) -> Dict[str, int]:
+    pairs = (part.split("=") for part in mix.split(","))
+    return {name.strip(): int(weight) for name, weight in pairs}
+
+
+# ====== REPLAY ======
+
+
+async def replay(args) -> Dict[str, Any]:
+    import asyncpg  # type: ignore
+
+    from core.bot import PizzaHat
+
+    bot = PizzaHat()
+    install_mocks(bot)
+    recorder = Recorder()
+    state = bot._connection
+    state._chunk_guilds = False  # there is no gateway to chunk over
+
+    await bot._async_setup_hook()
+    await bot.setup_hook()
+    install_stub_rest(bot, recorder)
+
+    guild = SyntheticGuild(bot.user, args.members, args.seed)  # type: ignore
+
+    if args.pg:
+        pool = await asyncpg.create_pool(dsn=args.pg, init=bot.init_connection)
+        await seed_database(pool, guild)
+
+    else:
+        pool = SeededPool({"modlogs": guild.log_channel_id, "automod": True})
+
+    bot.db = CountingPool(pool, recorder)
+    instrument(bot, recorder)
+
+    # warm up: the guild and its listeners aren't part of the measurement
+    state.parsers["GUILD_CREATE"](guild.guild_create())
+    await asyncio.sleep(0)
+    await recorder.idle.wait()
+    recorder.reset()
+
+    if args.input:
+        events = recorded_events(args.input)
+    else:
+        events = guild.events(parse_mix(args.mix), args.events)
+
+    fed: Counter = Counter()
+    start = time.perf_counter()
+
+    for i, (name, data) in enumerate(events):
+        if args.rate:
+            delay = start + i / args.rate - time.perf_counter()
+            if delay > 0:
+                await asyncio.sleep(delay)
+
+        elif i % 100 == 0:
+            await asyncio.sleep(0)  # let listeners run, like the gateway would
+
+        state.parsers[name](data)
+        fed[name] += 1
+
+    feed_time = time.perf_counter() - start
+    await asyncio.sleep(0)
+    await recorder.idle.wait()
+    elapsed = time.perf_counter() - start
+
+    await bot.close()
+    if args.pg:
+        await pool.close()
+
+    total = sum(fed.values())
+    return {
+        "events": dict(fed),
+        "elapsed": elapsed,
+        "feed_time": feed_time,
+        "events_per_second": total / elapsed if elapsed else 0,
+        "rest_calls": dict(recorder.rest),
+        "listeners": {
+            name: {
+                "calls": s.calls,
+                "errors": s.errors,
+                "p50": s.percentile(0.50),
+                "p99": s.percentile(0.99),
+                "max": max(s.timings, default=0),
+                "queries_per_call": s.queries / s.calls if s.calls else 0,
+            }
+            for name, s in recorder.listeners.items()
+        },
+    }
+
+
+def report(results: Dict[str, Any]):
+    from utils.formats import TabularData
+
+    total = sum(results["events"].values())
+    print(
+        f"Replayed {total} events in {results['elapsed']:.2f}s "
+        f"({results['events_per_second']:.0f} events/s), "
+        f"{sum(results['rest_calls'].values())} REST calls"
+    )
+
+    table = TabularData()
+    table.set_columns(["Listener", "Calls", "Errors", "p50", "p99", "Max", "Queries"])
+    table.add_rows(
+        [
+            name,
+            s["calls"],
+            s["errors"],
+            f"{s['p50'] * 1000:.2f}ms",
+            f"{s['p99'] * 1000:.2f}ms",
+            f"{s['max'] * 1000:.2f}ms",
+            f"{s['queries_per_call']:.2f}",
+        ]
+        for name, s in sorted(
+            results["listeners"].items(), key=lambda i: -i[1]["p99"]
+        )
+    )
+    print(table.render())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="Replay gateway events into PizzaHat")
+    parser.add_argument("--events", type=int, default=5000)
+    parser.add_argument(
+        "--rate", type=float, default=0, help="events/s, 0 for as fast as possible"
+    )
+    parser.add_argument("--mix", default=DEFAULT_MIX, help="EVENT=weight,...")
+    parser.add_argument("--members", type=int, default=200)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--input", help="JSON lines of recorded gateway dispatches")
+    parser.add_argument(
+        "--pg",
+        default=os.getenv("REPLAY_PG_URL"),
+        help="local Postgres to run queries against, never the production one",
+    )
+    parser.add_argument("--output", help="write the results as JSON")
+    args = parser.parse_args()
+
+    results = asyncio.run(replay(args))
+    report(results)
+
+    if args.output:
+        with open(args.output, "w") as f:
+            json.dump(results, f, indent=4)
+
+
+if __name__ == "__main__":
+    main()
@@ -0,0 +1,351 @@
+import argparse
+import asyncio
+import functools
+import json
+import os
+import re
+import resource
+import statistics
+import subprocess
+import sys
+import tempfile
+import time
+from collections import defaultdict
+from typing import Any, Dict, List
+
+# Fraction a metric may grow over the baseline before it counts as a regression.
+DEFAULT_THRESHOLD = 0.15
+DEFAULT_BASELINE = os.path.join(os.path.dirname(__file__), "startup_baseline.json")
+
+# Smallest absolute change worth flagging, so tiny timings can't fail on noise.
+NOISE_FLOOR = {"peak_rss_mb": 2.0}
+DEFAULT_NOISE_FLOOR = 0.01  # seconds
+
+IMPORTTIME_RE = re.compile(r"^import time:\s+(\d+) \|\s+(\d+) \| (\s*)(\S+)$")
+
+
+# ====== MOCKS ======
+
+
+class FakePool:
+    """Just enough of an asyncpg pool for cogs to set up against."""
+
+    async def execute(self, *args, **kwargs):
+        return "SELECT 0"
+
+    async def fetch(self, *args, **kwargs):
+        return []
+
+    async def fetchrow(self, *args, **kwargs):
+        return None
+
+    async def fetchval(self, *args, **kwargs):
+        return None
+
+    def add_metrics(self, metrics):
+        pass
+
+    def start_health_checks(self):
+        pass
+
+    async def close(self):
+        pass
+
+
+class FakeAppInfo:
+    team = None
+
+    class owner:
+        id = 0
+
+
+def install_mocks(bot) -> None:
+    """Cuts the bot off from Discord, Postgres and any other HTTP endpoint."""
+
+    import discord
+
+    import core.database as db
+    from core.http import HttpClient, Response
+    from utils.prefetch import PrefetchPool
+
+    async def create_db_pool(**kwargs):
+        return FakePool()
+
+    async def application_info():
+        return FakeAppInfo()
+
+    async def request(self, method, url, **kwargs):
+        return Response(200, {}, str(url), b"{}")
+
+    async def prefetch(self):
+        self.fetches += 1
+        return ["https://example.com/image.png"]
+
+    db.create_db_pool = create_db_pool
+    HttpClient.request = request  # type: ignore
+    # the pools fetch through their API clients, not HttpClient
+    PrefetchPool.start = lambda self: None  # type: ignore
+    PrefetchPool._fetch_counted = prefetch  # type: ignore
+    bot.application_info = application_info
+    # keep the config snapshot off disk
+    bot.queries.start_sync = functools.partial(bot.queries.start_sync, ":memory:")
+
+    # what the READY payload would have filled in
+    bot._connection.user = discord.ClientUser(
+        state=bot._connection,
+        data={
+            "id": "860889936914677770",
+            "username": "PizzaHat",
+            "discriminator": "0",
+            "avatar": None,
+            "bot": True,
+        },
+    )
+
+
+# ====== CHILD ======
+
+
+async def boot(results: Dict[str, Any], start: float):
+    phase = time.perf_counter()
+    from core.bot import PizzaHat
+
+    results["phases"]["import"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    bot = PizzaHat()
+    install_mocks(bot)
+    results["phases"]["construct"] = time.perf_counter() - phase
+
+    phase = time.perf_counter()
+    await bot._async_setup_hook()
+    await bot.setup_hook()
+    results["phases"]["setup_hook"] = time.perf_counter() - phase
+
+    # let extensions_loaded listeners (help index, command index) finish
+    phase = time.perf_counter()
+    listeners = [
+        task
+        for task in asyncio.all_tasks()
+        if task.get_name().startswith("discord.py: on_extensions_loaded")
+    ]
+    if listeners:
+        await asyncio.wait(listeners, timeout=5)
+
+    results["phases"]["listeners"] = time.perf_counter() - phase
+
+    results["wall"] = time.perf_counter() - start
+    results["extensions"] = {
+        t.name: {
+            "import": t.import_time,
+            "setup": t.setup_time,
+            "ok": t.ok,
+        }
+        for t in bot.extension_timings
+    }
+    results["commands"] = sum(1 for _ in bot.walk_commands())
+
+    await bot.close()
+
+
+def child(output: str):
+    start = time.perf_counter()
+    results: Dict[str, Any] = {"phases": {}}
+
+    asyncio.run(boot(results, start))
+
+    # kilobytes on Linux, bytes on macOS
+    rss = resource.getrusage(resource.RUSAGE_SELF).ru_maxrss
+    results["peak_rss_mb"] = rss / (1024**2 if sys.platform == "darwin" else 1024)
+
+    with open(output, "w") as f:
+        json.dump(results, f)
+
+
+# ====== PARENT ======
+
+
+def parse_importtime(stderr: str) -> Dict[str, Dict[str, float]]:
+    modules: Dict[str, Dict[str, float]] = {}
+    packages: Dict[str, float] = defaultdict(float)
+
+    for line in stderr.splitlines():
+        match = IMPORTTIME_RE.match(line)
+        if match is None:
+            continue
+
+        self_us, cumulative_us, _, name = match.groups()
+        modules[name] = {
+            "self": int(self_us) / 1e6,
+            "cumulative": int(cumulative_us) / 1e6,
+        }
+        packages[name.split(".")[0]] += int(self_us) / 1e6
+
+    return {"modules": modules, "packages": dict(packages)}
+
+
+def run_once(eager: bool) -> Dict[str, Any]:
+    env = dict(os.environ, LAZY_COGS="0" if eager else "1")
+
+    with tempfile.NamedTemporaryFile(suffix=".json", delete=False) as f:
+        output = f.name
+
+    try:
+        proc = subprocess.run(
+            [sys.executable, "-X", "importtime", "-m", "benchmarks.startup"]
+            + ["--child", output],
+            env=env,
+            stdout=subprocess.DEVNULL,
+            stderr=subprocess.PIPE,
+            text=True,
+        )
+
+        if proc.returncode != 0:
+            errors = [l for l in proc.stderr.splitlines() if "import time:" not in l]
+            raise RuntimeError("Benchmark run failed:\n" + "\n".join(errors[-20:]))
+
+        with open(output) as f:
+            results = json.load(f)
+
+    finally:
+        os.unlink(output)
+
+    results["imports"] = parse_importtime(proc.stderr)
+    return results
+
+
+def summarize(runs: List[Dict[str, Any]], top: int) -> Dict[str, Any]:
+    def median(values):
+        return statistics.median(values)
+
+    def slowest(key: str, field=None) -> Dict[str, float]:
+        samples: Dict[str, List[float]] = defaultdict(list)
+        for run in runs:
+            for name, value in run["imports"][key].items():
+                samples[name].append(value[field] if field else value)
+
+        times = {name: median(v) for name, v in samples.items()}
+        return {n: times[n] for n in sorted(times, key=lambda n: -times[n])[:top]}
+
+    last = runs[-1]
+    return {
+        "runs": len(runs),
+        "wall": median([r["wall"] for r in runs]),
+        "peak_rss_mb": max(r["peak_rss_mb"] for r in runs),
+        "commands": last["commands"],
+        "phases": {
+            name: median([r["phases"][name] for r in runs]) for name in last["phases"]
+        },
+        "extensions": {
+            name: {
+                "import": median([r["extensions"][name]["import"] for r in runs]),
+                "setup": median([r["extensions"][name]["setup"] for r in runs]),
+                "ok": all(r["extensions"][name]["ok"] for r in runs),
+            }
+            for name in last["extensions"]
+        },
+        "imports": slowest("packages"),
+        "modules": slowest("modules", "cumulative"),
+    }
+
+
+def flatten(summary: Dict[str, Any]) -> Dict[str, float]:
+    metrics = {"wall": summary["wall"], "peak_rss_mb": summary["peak_rss_mb"]}
+    metrics.update({f"phase:{k}": v for k, v in summary["phases"].items()})
+    metrics.update(
+        {f"ext:{k}": v["import"] + v["setup"] for k, v in summary["extensions"].items()}
+    )
+    return metrics
+
+
+def compare(summary: Dict[str, Any], baseline: Dict[str, Any], threshold: float):
+    from utils.formats import TabularData
+
+    current, previous = flatten(summary), flatten(baseline)
+    regressions = []
+
+    table = TabularData()
+    table.set_columns(["Metric", "Baseline", "Current", "Change"])
+
+    for name, value in current.items():
+        old = previous.get(name)
+        if not old:
+            continue
+
+        change = (value - old) / old
+        table.add_row([name, f"{old:.3f}", f"{value:.3f}", f"{change:+.1%}"])
+
+        floor = NOISE_FLOOR.get(name, DEFAULT_NOISE_FLOOR)
+        if change > threshold and value - old > floor:
+            regressions.append(name)
+
+    print(table.render())
+    return regressions
+
+
+def report(summary: Dict[str, Any]):
+    from utils.formats import TabularData
+
+    print(
+        f"Ready in {summary['wall'] * 1000:.0f}ms (median of {summary['runs']}), "
+        f"peak RSS {summary['peak_rss_mb']:.1f}MB, {summary['commands']} commands"
+    )
+
+    table = TabularData()
+    table.set_columns(["Phase", "Time"])
+    table.add_rows([k, f"{v * 1000:.0f}ms"] for k, v in summary["phases"].items())
+    print(table.render())
+
+    table = TabularData()
+    table.set_columns(["Package", "Import (self)"])
+    table.add_rows([k, f"{v * 1000:.1f}ms"] for k, v in summary["imports"].items())
+    print(table.render())
+
+    table = TabularData()
+    table.set_columns(["Module", "Import (cumulative)"])
+    table.add_rows([k, f"{v * 1000:.1f}ms"] for k, v in summary["modules"].items())
+    print(table.render())
+
+
+def main():
+    parser = argparse.ArgumentParser(description="PizzaHat startup benchmark")
+    parser.add_argument("--runs", type=int, default=5)
+    parser.add_argument("--top", type=int, default=15, help="slowest packages to keep")
+    parser.add_argument("--eager", action="store_true", help="disable lazy cogs")
+    parser.add_argument("--baseline", default=DEFAULT_BASELINE)
+    parser.add_argument("--save", action="store_true", help="overwrite the baseline")
+    parser.add_argument("--threshold", type=float, default=DEFAULT_THRESHOLD)
+    parser.add_argument("--child", help=argparse.SUPPRESS)
+    args = parser.parse_args()
+
+    if args.child:
+        return child(args.child)
+
+    summary = summarize([run_once(args.eager) for _ in range(args.runs)], args.top)
+    report(summary)
+
+    # a run that skipped extensions isn't comparable, or worth saving
+    failed = [name for name, e in summary["extensions"].items() if not e["ok"]]
+    if failed:
+        print(f"Extensions failed to load: {', '.join(failed)}")
+        sys.exit(1)
+
+    if args.save:
+        with open(args.baseline, "w") as f:
+            json.dump(summary, f, indent=4)
+
+        print(f"Saved baseline to {args.baseline}")
+        return
+
+    if os.path.exists(args.baseline):
+        with open(args.baseline) as f:
+            baseline = json.load(f)
+
+        regressions = compare(summary, baseline, args.threshold)
+        if regressions:
+            print(f"Regressed over {args.threshold:.0%}: {', '.join(regressions)}")
+            sys.exit(1)
+
+
+if __name__ == "__main__":
+    main()
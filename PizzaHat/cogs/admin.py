@@ -37,7 +37,7 @@ class Admin(Cog, emoji=916988537264570368):
         """
 
         try:
-            await self.bot.db.execute("INSERT INTO staff_role (guild_id, role_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET role_id=$2", ctx.guild.id, role.id)  # type: ignore
+            await self.bot.queries.set_staff_role(ctx.guild.id, role.id)  # type: ignore
             await ctx.send(f"{self.bot.yes} Staff role set to {role.name}")
 
         except Exception as e:
@@ -57,7 +57,7 @@ class Admin(Cog, emoji=916988537264570368):
         """
 
         try:
-            await self.bot.db.execute("INSERT INTO modlogs (guild_id, channel_id) VALUES ($1, $2) ON CONFLICT (guild_id) DO UPDATE SET channel_id=$2", ctx.guild.id, channel.id)  # type: ignore
+            await self.bot.queries.set_modlog_channel(ctx.guild.id, channel.id)  # type: ignore
             await ctx.send(f"{self.bot.yes} Mod-logs channel set to {channel}")
 
         except Exception as e:
@@ -109,7 +109,7 @@ class Admin(Cog, emoji=916988537264570368):
         """
 
         try:
-            await self.bot.db.execute("INSERT INTO automod (guild_id, enabled) VALUES ($1, $2)", ctx.guild.id, True)  # type: ignore
+            await self.bot.queries.enable_automod(ctx.guild.id)  # type: ignore
             await ctx.send(f"{self.bot.yes} Auto-mod enabled.")
 
         except Exception as e:
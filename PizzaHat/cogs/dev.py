@@ -1,15 +1,13 @@
 import inspect
 import io
-import os
-import sys
 import textwrap
 import time
 import traceback
 from contextlib import redirect_stdout
-from typing import TYPE_CHECKING, Awaitable, Callable, Union
+from typing import TYPE_CHECKING, Awaitable, Callable, List, Union
 
 import discord
-from core.bot import INITIAL_EXTENSIONS, PizzaHat
+from core.bot import INITIAL_EXTENSIONS, LOGGING_CONFIG, PizzaHat
 from core.cog import Cog
 from discord.ext import commands
 from discord.ext.commands import Context
@@ -19,16 +17,18 @@ if TYPE_CHECKING:
     from asyncpg import Record
 
 
-def restart_bot():
-    os.execv(sys.executable, ["python"] + sys.argv)
-
-
 class Dev(Cog, emoji=833297795761831956):
     """Developer commands."""
 
     def __init__(self, bot: PizzaHat):
         self.bot: PizzaHat = bot
 
+    async def cog_load(self):
+        self.bot.ipc.add_handler("reload", self.reload_extensions)
+
+    async def cog_unload(self):
+        self.bot.ipc.remove_handler("reload")
+
     def cleanup_code(self, content: str) -> str:
         """Automatically removes code blocks from the code."""
         # remove ```py\n```
@@ -41,10 +41,10 @@ class Dev(Cog, emoji=833297795761831956):
     @commands.command(hidden=True)
     @commands.is_owner()
     async def restart(self, ctx: Context):
-        """Restarts the bot."""
+        """Restarts the bot once the commands it is running have finished."""
 
         await ctx.message.add_reaction("✅")
-        restart_bot()
+        self.bot.lifecycle.restart()
 
     @commands.command(name="eval", hidden=True)
     @commands.is_owner()
@@ -211,23 +211,164 @@ class Dev(Cog, emoji=833297795761831956):
     async def botlogs(self, ctx: Context):
         """Command to show bot logs (bot.log) file in discord itself."""
 
-        f = open("bot.log")
+        f = open(LOGGING_CONFIG["handlers"]["file"]["filename"])
         await ctx.send(f"```ruby\n{f.read()}\n```")
 
     @commands.command(hidden=True)
     @commands.is_owner()
-    async def reloadall(self, ctx: Context):
-        """Quick way to reload all cogs at once."""
+    async def httpstats(self, ctx: Context):
+        """Shows outbound HTTP request metrics per host."""
 
-        try:
-            for cog in INITIAL_EXTENSIONS:
+        stats = self.bot.http_client.stats
+
+        if not stats:
+            return await ctx.send("No HTTP requests made yet.")
+
+        table = TabularData()
+        table.set_columns(["Host", "Requests", "Errors", "Retries", "Avg", "Max"])
+        table.add_rows(
+            [
+                host,
+                s.requests,
+                s.errors,
+                s.retries,
+                f"{s.avg_time * 1000:.0f}ms",
+                f"{s.max_time * 1000:.0f}ms",
+            ]
+            for host, s in sorted(stats.items(), key=lambda i: -i[1].requests)
+        )
+
+        await ctx.send(f"```\n{table.render()}\n```")
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def dbstats(self, ctx: Context, limit: int = 10):
+        """Shows the database queries that took the most total time."""
+
+        pool = self.bot.db
+        queries = pool.queries
+
+        if not queries:
+            return await ctx.send("No queries made yet.")
+
+        top = sorted(queries.items(), key=lambda i: -i[1].total_time)[:limit]
+
+        table = TabularData()
+        table.set_columns(["Query", "Calls", "Total", "Avg", "Max", "Rows"])
+        table.add_rows(
+            [
+                query if len(query) <= 40 else query[:37] + "...",
+                s.calls,
+                f"{s.total_time * 1000:.0f}ms",
+                f"{s.avg_time * 1000:.1f}ms",
+                f"{s.max_time * 1000:.0f}ms",
+                s.rows,
+            ]
+            for query, s in top
+        )
+
+        fmt = (
+            f"```\n{table.render()}\n```\n"
+            f"*Pool wait: {pool.avg_wait * 1000:.2f}ms avg, "
+            f"{pool.max_wait * 1000:.0f}ms max over {plural(pool.acquires):acquire}. "
+            f"{plural(len(pool.slow)):slow query|slow queries} logged.*\n"
+            f"*{pool.in_use}/{pool.get_size()} connections in use "
+            f"(max {pool.get_max_size()}), "
+            f"{'healthy' if pool.healthy else 'unhealthy'}, "
+            f"{plural(pool.reconnects):reconnect} so far.*"
+        )
+
+        if len(fmt) > 2000:
+            fp = io.BytesIO(fmt.encode("utf-8"))
+            file = discord.File(fp, "dbstats.txt")
+            return await ctx.send("Too many results...", file=file)
+
+        await ctx.send(fmt)
+
+    async def reload_extensions(self) -> List[str]:
+        """Reloads every loaded cog and returns the ones that failed."""
+
+        failed = []
+
+        for cog in INITIAL_EXTENSIONS:
+            # lazy cogs that haven't been used yet have nothing to reload
+            if cog not in self.bot.extensions:
+                continue
+
+            try:
                 await self.bot.reload_extension(cog)
                 print(cog, "reloaded")
 
-            await ctx.send("Reloaded all cogs!")
+            except Exception as e:
+                print("".join(traceback.format_exception(e, e, e.__traceback__)))  # type: ignore
+                failed.append(cog)
 
-        except Exception as e:
-            print("".join(traceback.format_exception(e, e, e.__traceback__)))  # type: ignore
+        self.bot.dispatch("extensions_loaded")
+        return failed
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def reloadall(self, ctx: Context):
+        """Quick way to reload all cogs at once, on every cluster."""
+
+        lines = []
+        for reply in await self.bot.ipc.request("reload", timeout=30):
+            if reply["error"] is not None:
+                result = f"error: {reply['error']}"
+
+            elif reply["result"]:
+                result = f"failed: {', '.join(reply['result'])}"
+
+            else:
+                result = "reloaded all cogs"
+
+            lines.append(f"Cluster {reply['cluster']}: {result}")
+
+        await ctx.send("\n".join(lines))
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def clusters(self, ctx: Context):
+        """Shows every cluster's shards, guilds and memory."""
+
+        replies = await self.bot.ipc.request("stats")
+
+        table = TabularData()
+        table.set_columns(
+            ["Cluster", "Shards", "Guilds", "Members", "Latency", "Memory"]
+        )
+
+        for reply in replies:
+            c = reply["result"]
+            if c is None:
+                table.add_row([reply["cluster"], "-", "-", "-", "-", reply["error"]])
+                continue
+
+            shards = sorted(int(i) for i in c["shards"])
+            latencies = [s["latency"] for s in c["shards"].values() if s["latency"]]
+            latency = sum(latencies) / len(latencies) if latencies else 0
+            table.add_row(
+                [
+                    c["cluster"],
+                    f"{shards[0]}-{shards[-1]}" if shards else "-",
+                    c["guilds"],
+                    c["members"],
+                    f"{latency * 1000:.0f}ms",
+                    f"{c['memory'] / 1024**2:.0f}MiB",
+                ]
+            )
+
+        await ctx.send(f"```\n{table.render()}\n```")
+
+    @commands.command(hidden=True)
+    @commands.is_owner()
+    async def rollingrestart(self, ctx: Context):
+        """Restarts the clusters one at a time."""
+
+        if not await self.bot.ipc.notify("restart"):
+            return await ctx.send("Not running under the launcher.")
+
+        await ctx.message.add_reaction("✅")
 
 
 async def setup(bot):
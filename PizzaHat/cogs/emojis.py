@@ -73,7 +73,7 @@ class Emojis(Cog, emoji="😀"):
             if emoji_count >= ctx.guild.emoji_limit:
                 return await ctx.send("There are no more emoji slots in this server.")
 
-            async with self.bot.session.get(emoji.url) as resp:
+            async with self.bot.http_client.session.get(emoji.url) as resp:
                 if resp.status >= 400:
                     return await ctx.send("Could not fetch the image.")
 
@@ -1,20 +1,54 @@
+import asyncio
 import base64
+import logging
 import os
 import random
+import time
 from io import BytesIO
+from typing import Dict, List
 
 import aiohttp
 import alexflipnote
 import discord
+from asyncdagpi import errors as dagpi_errors
 from asyncdagpi.client import Client
 from asyncdagpi.image_features import ImageFeatures
 from core.bot import PizzaHat
 from core.cog import Cog
 from discord.ext import commands
 from discord.ext.commands import Context
+from utils import effects
+from utils.avatars import AvatarCache
+from utils.image_cache import CachedImage, ImageCache
+from utils.prefetch import PrefetchPool, single
 
-dagpi = Client(os.getenv("DAGPI"))  # type: ignore
-alex_api = alexflipnote.Client()
+logger = logging.getLogger("bot")
+
+MEMES_URL = "https://www.reddit.com/r/dankmemes/new.json?sort=hot"
+
+# dagpi features that have a local equivalent in utils.effects
+LOCAL_EFFECTS = {
+    "pixel": "pixelate",
+    "triggered": "triggered",
+    "invert": "invert",
+    "deepfry": "deepfry",
+}
+
+DAGPI_TIMEOUT = 8
+# how long to skip dagpi for effects we can render locally after it fails
+DAGPI_COOLDOWN = 60
+
+DAGPI_ERRORS = (
+    asyncio.TimeoutError,
+    aiohttp.ClientError,
+    dagpi_errors.ApiError,
+    dagpi_errors.RateLimited,
+    dagpi_errors.Unauthorised,
+)
+
+
+class DagpiUnavailable(Exception):
+    pass
 
 
 class Images(Cog, emoji="📷"):
@@ -22,6 +56,104 @@ class Images(Cog, emoji="📷"):
 
     def __init__(self, bot: PizzaHat):
         self.bot: PizzaHat = bot
+        self.dagpi = Client(os.getenv("DAGPI"), session=bot.http_client.session)  # type: ignore
+        self.alex_api = alexflipnote.Client(session=bot.http_client.session)
+        self.cache = ImageCache()
+        self.avatars = AvatarCache(bot.http_client)
+        self.dagpi_down_until = 0.0
+
+        alex_endpoints = {
+            "birb": self.alex_api.birb,
+            "dogs": self.alex_api.dogs,
+            "cats": self.alex_api.cats,
+            "sadcat": self.alex_api.sadcat,
+            "coffee": self.alex_api.coffee,
+        }
+        self.pools: Dict[str, PrefetchPool[str]] = {
+            name: PrefetchPool(name, single(fetch), size=10, low_water=3)
+            for name, fetch in alex_endpoints.items()
+        }
+        # one listing request fills the whole pool, so no parallel refills
+        self.pools["meme"] = PrefetchPool(
+            "meme", self.fetch_memes, size=25, low_water=5, concurrency=1, max_age=1800
+        )
+
+    async def cog_load(self):
+        await self.cache.load()
+        await self.avatars.load()
+
+        for pool in self.pools.values():
+            pool.start()
+
+    async def cog_unload(self):
+        for pool in self.pools.values():
+            pool.stop()
+
+        await self.avatars.flush()
+        effects.shutdown_pool()
+
+    async def render_local(self, effect: str, avatar: discord.Asset) -> CachedImage:
+        data = await self.avatars.fetch(avatar, effects.source_size(effect))
+        return await effects.render(effect, data)
+
+    async def send_local(self, ctx: Context, effect: str, member: discord.Member):
+        """Renders a local effect on a member's avatar, going through the cache."""
+
+        avatar = member.display_avatar
+        key = ImageCache.make_key(effect, avatar.key, engine="local")
+        data, fmt = await self.cache.get_or_create(
+            key, lambda: self.render_local(effect, avatar)
+        )
+
+        await ctx.send(file=discord.File(fp=BytesIO(data), filename=f"{effect}.{fmt}"))
+
+    async def send_processed(
+        self, ctx: Context, feature: str, member: discord.Member, **kwargs: str
+    ):
+        """
+        Runs a dagpi image feature on a member's avatar, going through the cache.
+        Falls back to the local effect, if there is one, when dagpi is slow or down.
+        """
+
+        avatar = member.display_avatar
+        url = str(avatar.with_format("png").with_size(1024))
+        local = LOCAL_EFFECTS.get(feature)
+
+        async def process():
+            if local is not None and time.monotonic() < self.dagpi_down_until:
+                raise DagpiUnavailable
+
+            img = await asyncio.wait_for(
+                self.dagpi.image_process(
+                    getattr(ImageFeatures, feature)(), url=url, **kwargs
+                ),
+                timeout=DAGPI_TIMEOUT,
+            )
+            return img.image.getvalue(), img.format
+
+        key = ImageCache.make_key(feature, avatar.key, **kwargs)
+
+        try:
+            data, fmt = await self.cache.get_or_create(key, process)
+
+        except (DagpiUnavailable, *DAGPI_ERRORS) as e:
+            if local is None:
+                raise
+
+            if not isinstance(e, DagpiUnavailable):
+                logger.warning(f"dagpi {feature} failed ({e!r}), rendering locally")
+                self.dagpi_down_until = time.monotonic() + DAGPI_COOLDOWN
+
+            return await self.send_local(ctx, local, member)
+
+        file = discord.File(fp=BytesIO(data), filename=f"{feature}.{fmt}")
+        await ctx.send(file=file)
+
+    async def fetch_memes(self) -> List[str]:
+        memes = await self.bot.http_client.get_json(MEMES_URL)
+        urls = [child["data"]["url"] for child in memes["data"]["children"]]
+        random.shuffle(urls)
+        return urls
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -30,34 +162,27 @@ class Images(Cog, emoji="📷"):
 
         msg = await ctx.send("Please wait...")
 
-        async with aiohttp.request(
-            "POST", "https://backend.craiyon.com/generate", json={"prompt": prompt}
-        ) as resp:
-            r = await resp.json()
-            images = r["images"]
-            image = BytesIO(base64.decodebytes(images[0].encode("utf-8")))
+        r = await self.bot.http_client.post_json(
+            "https://backend.craiyon.com/generate",
+            json={"prompt": prompt},
+            timeout=aiohttp.ClientTimeout(total=120),
+        )
+        images = r["images"]
+        image = BytesIO(base64.decodebytes(images[0].encode("utf-8")))
 
-            await msg.delete()
-            return await ctx.send(file=discord.File(fp=image, filename="GenImg.png"))
+        await msg.delete()
+        return await ctx.send(file=discord.File(fp=image, filename="GenImg.png"))
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def meme(self, ctx: Context):
         """Gets a random meme from Reddit."""
 
-        async with aiohttp.ClientSession() as cs:
-            async with cs.get(
-                "https://www.reddit.com/r/dankmemes/new.json?sort=hot"
-            ) as r:
-                memes = await r.json()
-
-                em = discord.Embed(color=self.bot.color)
-                em.set_image(
-                    url=memes["data"]["children"][random.randint(0, 25)]["data"]["url"]
-                )
-                em.set_footer(text="r/dankmemes")
+        em = discord.Embed(color=self.bot.color)
+        em.set_image(url=await self.pools["meme"].get())
+        em.set_footer(text="r/dankmemes")
 
-                await ctx.send(embed=em)
+        await ctx.send(embed=em)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -66,7 +191,7 @@ class Images(Cog, emoji="📷"):
 
         if ctx.author.avatar is not None:
             em = discord.Embed(color=self.bot.color)
-            em.set_image(url=await alex_api.birb())
+            em.set_image(url=await self.pools["birb"].get())
             em.set_footer(
                 text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar.url
             )
@@ -83,7 +208,7 @@ class Images(Cog, emoji="📷"):
 
         if ctx.author.avatar is not None:
             em = discord.Embed(color=self.bot.color)
-            em.set_image(url=await alex_api.dogs())
+            em.set_image(url=await self.pools["dogs"].get())
             em.set_footer(
                 text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar.url
             )
@@ -100,7 +225,7 @@ class Images(Cog, emoji="📷"):
 
         if ctx.author.avatar is not None:
             em = discord.Embed(color=self.bot.color)
-            em.set_image(url=await alex_api.cats())
+            em.set_image(url=await self.pools["cats"].get())
             em.set_footer(
                 text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar.url
             )
@@ -117,7 +242,7 @@ class Images(Cog, emoji="📷"):
 
         if ctx.author.avatar is not None:
             em = discord.Embed(color=self.bot.color)
-            em.set_image(url=await alex_api.sadcat())
+            em.set_image(url=await self.pools["sadcat"].get())
             em.set_footer(
                 text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar.url
             )
@@ -134,7 +259,7 @@ class Images(Cog, emoji="📷"):
 
         if ctx.author.avatar is not None:
             em = discord.Embed(color=self.bot.color)
-            em.set_image(url=await alex_api.coffee())
+            em.set_image(url=await self.pools["coffee"].get())
             em.set_footer(
                 text=f"Requested by {ctx.author}", icon_url=ctx.author.avatar.url
             )
@@ -155,26 +280,16 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        url = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.pixel(), url)
-        file = discord.File(fp=img.image, filename=f"pixel.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "pixel", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def tweet(self, ctx: Context, member: discord.Member, *, text):
         """Tweeting with your pfp."""
 
-        uname = member.name
-        text = str(text)
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(
-            ImageFeatures.tweet(), url=pfp, username=uname, text=text
+        await self.send_processed(
+            ctx, "tweet", member, username=member.name, text=str(text)
         )
-        file = discord.File(fp=img.image, filename=f"tweet.{img.format}")
-
-        await ctx.send(file=file)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -184,11 +299,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.triggered(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"triggered.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "triggered", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -201,11 +312,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.wasted(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"wasted.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "wasted", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -215,11 +322,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.angel(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"angel.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "angel", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -229,11 +332,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.hitler(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"hitler.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "hitler", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -243,11 +342,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.delete(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"delete.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "delete", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -257,11 +352,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.wanted(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"wanted.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "wanted", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -271,11 +362,7 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.jail(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"jail.{img.format}")
-
-        await ctx.send(file=file)
+        await self.send_processed(ctx, "jail", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
@@ -285,26 +372,46 @@ class Images(Cog, emoji="📷"):
         if member is None:
             member = ctx.author  # type: ignore
 
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(ImageFeatures.trash(), url=pfp)
-        file = discord.File(fp=img.image, filename=f"trash.{img.format}")
+        await self.send_processed(ctx, "trash", member)
 
-        await ctx.send(file=file)
+    @commands.command()
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    async def invert(self, ctx: Context, member: discord.Member = None):  # type: ignore
+        """Inverts the colors of yours or someone's avatar."""
+
+        if member is None:
+            member = ctx.author  # type: ignore
+
+        await self.send_processed(ctx, "invert", member)
+
+    @commands.command()
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    async def deepfry(self, ctx: Context, member: discord.Member = None):  # type: ignore
+        """Deepfries yours or someone's avatar."""
+
+        if member is None:
+            member = ctx.author  # type: ignore
+
+        await self.send_processed(ctx, "deepfry", member)
+
+    @commands.command(aliases=["greyscale"])
+    @commands.cooldown(1, 5, commands.BucketType.user)
+    async def grayscale(self, ctx: Context, member: discord.Member = None):  # type: ignore
+        """Turns yours or someone's avatar black and white."""
+
+        if member is None:
+            member = ctx.author  # type: ignore
+
+        await self.send_local(ctx, "grayscale", member)
 
     @commands.command()
     @commands.cooldown(1, 5, commands.BucketType.user)
     async def discord(self, ctx: Context, member: discord.Member, *, text):
         """Send a Discord message, simple."""
 
-        uname = member.name
-        text = str(text)
-        pfp = str(member.display_avatar.with_format("png").with_size(1024))
-        img = await dagpi.image_process(
-            ImageFeatures.discord(), url=pfp, username=uname, text=text
+        await self.send_processed(
+            ctx, "discord", member, username=member.name, text=str(text)
         )
-        file = discord.File(fp=img.image, filename=f"discord.{img.format}")
-
-        await ctx.send(file=file)
 
     # @commands.command()
     # @commands.cooldown(1, 5, commands.BucketType.user)
@@ -315,7 +422,7 @@ class Images(Cog, emoji="📷"):
     #         member = ctx.author
 
     #     pfp = str(member.display_avatar.with_format("png").with_size(1024))
-    #     img = await dagpi.image_process(ImageFeatures.bonk(), url=pfp)
+    #     img = await self.dagpi.image_process(ImageFeatures.bonk(), url=pfp)
     #     file = discord.File(fp=img.image, filename=f"bonk.{img.format}")
 
     #     await ctx.send(file=file)
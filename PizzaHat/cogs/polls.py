@@ -5,6 +5,7 @@ from core.bot import PizzaHat
 from core.cog import Cog
 from discord.ext import commands
 from discord.ext.commands import Context
+from utils.reactions import seed_reactions
 
 
 def to_keycap(c):
@@ -80,8 +81,7 @@ class Polls(Cog, emoji="🗳"):
         )
 
         poll = await ctx.send(embed=e)
-        for emoji, _ in choices:
-            await poll.add_reaction(emoji)
+        seed_reactions(poll, [emoji for emoji, _ in choices])
 
     @commands.command()
     @commands.guild_only()
@@ -110,8 +110,7 @@ class Polls(Cog, emoji="🗳"):
         yes_thumb = "👍"
         no_thumb = "👎"
 
-        await msg.add_reaction(yes_thumb)
-        await msg.add_reaction(no_thumb)
+        seed_reactions(msg, [yes_thumb, no_thumb])
 
     @commands.command()
     @commands.guild_only()
@@ -144,10 +143,9 @@ class Polls(Cog, emoji="🗳"):
         header = {"Content-Type": "application/json"}
         payload = {"title": question, "options": choices, "multi": False}
 
-        async with self.bot.session.post(
+        data = await self.bot.http_client.post_json(
             "https://www.strawpoll.me/api/v2/polls", headers=header, json=payload
-        ) as r:
-            data = await r.json()
+        )
         id = data["id"]
 
         await ctx.send(f"http://www.strawpoll.me/{id}")
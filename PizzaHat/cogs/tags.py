@@ -42,13 +42,13 @@ class Tags(Cog, emoji="🏷"):
                     f"{self.bot.no} Tag name length cannot exceed 50 characters!"
                 )
 
-            data = await self.bot.db.fetchrow("SELECT * FROM tags WHERE guild_id=$1", ctx.guild.id)  # type: ignore
+            data = await self.bot.queries.tag(ctx.guild.id, name)  # type: ignore
 
-            if data is None or data[1] != name:
-                await self.bot.db.execute("INSERT INTO tags (guild_id, tag_name, content, creator) VALUES ($1, $2, $3, $4)", ctx.guild.id, name, content, ctx.author.id)  # type: ignore
+            if data is None:
+                await self.bot.queries.create_tag(ctx.guild.id, name, content, ctx.author.id)  # type: ignore
                 await ctx.send(f"{self.bot.yes} Tag created successfully!")
 
-            elif data[1] == name:
+            else:
                 await ctx.send(f"{self.bot.no} Tag with this name already exists!")
 
         except Exception as e:
@@ -69,13 +69,8 @@ class Tags(Cog, emoji="🏷"):
         To use this command, you must have Manage Messages permission.
         """
 
-        data = await self.bot.db.fetch("SELECT * FROM tags WHERE guild_id=$1", ctx.guild.id)  # type: ignore
-
-        for i in data:
-            if i[1] == tag:
-                await self.bot.db.execute("DELETE FROM tags WHERE guild_id=$1 AND tag_name=$2", ctx.guild.id, tag)  # type: ignore
-                await ctx.send(f"{self.bot.yes} Tag deleted!")
-                break
+        if await self.bot.queries.delete_tag(ctx.guild.id, tag):  # type: ignore
+            await ctx.send(f"{self.bot.yes} Tag deleted!")
 
         else:
             await ctx.send(f"{self.bot.no} Tag with name `{tag}` does not exist.")
@@ -87,7 +82,7 @@ class Tags(Cog, emoji="🏷"):
         """Retrieve all tags"""
 
         if ctx.guild is not None:
-            data = await self.bot.db.fetch("SELECT tag_name FROM tags WHERE guild_id=$1", ctx.guild.id)  # type: ignore
+            data = await self.bot.queries.tag_names(ctx.guild.id)
             em = discord.Embed(
                 description="",
                 color=self.bot.color,
@@ -95,7 +90,7 @@ class Tags(Cog, emoji="🏷"):
 
             if data:
                 for i in data:
-                    em.description += f"<:join_arrow:946077216297590836> {i[0]}\n"  # type: ignore
+                    em.description += f"<:join_arrow:946077216297590836> {i}\n"  # type: ignore
 
                 await ctx.send(embed=em)
 
@@ -108,7 +103,7 @@ class Tags(Cog, emoji="🏷"):
     async def tag_info(self, ctx: Context, tag: str):
         """Get info on a particular tag."""
 
-        data = await self.bot.db.fetch("SELECT tag_name, content, creator FROM tags WHERE guild_id=$1 AND tag_name=$2", ctx.guild.id, tag)  # type: ignore
+        data = await self.bot.queries.tag(ctx.guild.id, tag)  # type: ignore
         em = discord.Embed(
             title=tag,
             description="",
@@ -118,13 +113,12 @@ class Tags(Cog, emoji="🏷"):
         em.set_author(name=ctx.author.display_name, icon_url=ctx.author.avatar)
 
         if data:
-            for i in data:
-                em.description += i[1]
-                em.add_field(
-                    name="Owner",
-                    value=f"<@{i[2]}> `[{await self.bot.fetch_user(i[2])}]`",
-                    inline=False,
-                )
+            em.description += data[1]
+            em.add_field(
+                name="Owner",
+                value=f"<@{data[2]}> `[{await self.bot.fetch_user(data[2])}]`",
+                inline=False,
+            )
 
         await ctx.send(embed=em)
 
@@ -143,14 +137,8 @@ class Tags(Cog, emoji="🏷"):
         To use this command, you must have Manage Messages permission.
         """
 
-        data = await self.bot.db.fetch("SELECT tag_name, content FROM tags WHERE guild_id=$1", ctx.guild.id)  # type: ignore
-
-        if data:
-            for i in data:
-                if i[0] == tag:
-                    await self.bot.db.execute("UPDATE tags SET content=$1 WHERE guild_id=$2 AND tag_name=$3", content, ctx.guild.id, tag)  # type: ignore
-                    await ctx.send(f"{self.bot.yes} Tag updated!")
-                    break
+        if await self.bot.queries.edit_tag(ctx.guild.id, tag, content):  # type: ignore
+            await ctx.send(f"{self.bot.yes} Tag updated!")
 
         else:
             await ctx.send(f"{self.bot.no} Tag with name `{tag}` does not exist.")
@@ -13,9 +13,7 @@ class TicketView(ui.View):
         super().__init__(timeout=None)
 
     async def get_staff_role(self, guild_id: int) -> int:
-        return await self.bot.db.fetchval(
-            "SELECT role_id FROM staff_role WHERE guild_id=$1", guild_id
-        )
+        return await self.bot.queries.staff_role(guild_id)
 
     @ui.button(
         emoji="<:ticket_emoji:1004648922158989404>", custom_id="create_ticket_btn"
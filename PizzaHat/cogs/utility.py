@@ -8,7 +8,8 @@ from core.cog import Cog
 from discord.ext import commands
 from discord.ext.commands import Context
 from discord.ui import Button, View
-from typing import Union, Optional
+from typing import Any, Dict, Union, Optional
+from utils.formats import plural
 
 start_time = time.time()
 
@@ -19,6 +20,12 @@ def format_date(dt: datetime.datetime):
     return f"<t:{int(dt.timestamp())}>"
 
 
+def format_latency(latency: Optional[float]) -> str:
+    if latency is None:
+        return "N/A"
+    return f"{round(latency * 1000)}ms"
+
+
 class Utility(Cog, emoji="🛠️"):
     """Utility commands which makes your discord experience smooth!"""
 
@@ -35,9 +42,14 @@ class Utility(Cog, emoji="🛠️"):
         msg = await ctx.send("Pinging...")
         time2 = time.perf_counter()
 
+        shard_id = ctx.guild.shard_id if ctx.guild else 0
+        api = f"`{format_latency(self.bot.shard_tracker.latency(shard_id))}`"
+        if len(self.bot.shards) > 1:
+            api += f" (shard {shard_id}, average `{format_latency(self.bot.latency)}`)"
+
         await msg.edit(
             content="🏓 Pong!"
-            f"\nAPI: `{round(self.bot.latency*1000)}ms`"
+            f"\nAPI: {api}"
             f"\nBot: `{round(time2-time1)*1000}ms`"
         )
 
@@ -193,19 +205,29 @@ class Utility(Cog, emoji="🛠️"):
             )
             boosts = f"<:booster:983684380134371339> {ctx.guild.premium_subscription_count} Boosts ({boost_level})"
 
+            owner = ctx.guild.owner
+            if owner is None and ctx.guild.owner_id is not None:
+                # members aren't all cached, see core/cache.py
+                try:
+                    owner = await ctx.guild.fetch_member(ctx.guild.owner_id)
+
+                except discord.HTTPException:
+                    pass
+
             em = discord.Embed(title=ctx.guild.name, color=self.bot.color)
-            if ctx.guild.owner is not None:
+            if owner is not None:
                 em.description = f"""
-    **Owner:** {ctx.guild.owner.mention} `[{ctx.guild.owner}]`
+    **Owner:** {owner.mention} `[{owner}]`
     **Description:** {ctx.guild.description if ctx.guild.description else "N/A"}
     **ID:** {ctx.guild.id}
     """
 
+            counts = await self.bot.stats.complete(ctx.guild)
             em.add_field(
                 name=f"👥 {ctx.guild.member_count} Members",
                 value=(
-                    f"<:memberlist:811747305543434260> Humans: {len([m for m in ctx.guild.members if not m.bot])}\n"
-                    f"<:botlist:811747723434786859> Bots: {sum(member.bot for member in ctx.guild.members)}"
+                    f"<:memberlist:811747305543434260> Humans: {counts.humans}\n"
+                    f"<:botlist:811747723434786859> Bots: {counts.bots}"
                 ),
                 inline=False,
             )
@@ -349,31 +371,45 @@ class Utility(Cog, emoji="🛠️"):
 
         return fmt.format(d=days, h=hours, m=minutes, s=seconds)
 
-    @commands.command(aliases=["stats"])
-    @commands.cooldown(1, 3, commands.BucketType.user)
-    async def about(self, ctx: Context):
-        """Tells you information about the bot itself."""
+    def shard_summary(self, shards: Dict[int, Dict[str, Any]]) -> str:
+        if len(shards) <= 10:
+            return "\n".join(
+                f"`#{shard_id}` {format_latency(s['latency'])}, "
+                f"{plural(s['guilds']):guild}, {s['status']}"
+                for shard_id, s in sorted(shards.items())
+            ) or "N/A"
 
-        total_members = 0
-        total_unique = len(self.bot.users)
-        my_commands = [command for command in self.bot.walk_commands()]
+        # too many to list, show the ones worth looking at
+        latencies = {i: s["latency"] for i, s in sorted(shards.items())}
+        ready = [i for i in latencies if shards[i]["status"] == "ready"]
+        known = {i: l for i, l in latencies.items() if l is not None}
+        lines = [f"{len(ready)}/{len(latencies)} ready"]
 
-        text = 0
-        voice = 0
-        guilds = 0
+        if known:
+            slowest = max(known, key=known.__getitem__)
+            average = sum(known.values()) / len(known)
+            lines.append(f"Average {format_latency(average)}")
+            lines.append(f"Slowest `#{slowest}` {format_latency(known[slowest])}")
 
-        for guild in self.bot.guilds:
-            guilds += 1
-            if guild.unavailable:
-                continue
+        down = [f"`#{i}`" for i in latencies if i not in ready]
+        if down:
+            lines.append(f"Not ready: {', '.join(down[:20])}")
 
-            total_members += guild.member_count or 0
-            for channel in guild.channels:
-                if isinstance(channel, discord.TextChannel):
-                    text += 1
+        return "\n".join(lines)
 
-                elif isinstance(channel, discord.VoiceChannel):
-                    voice += 1
+    @commands.command(aliases=["stats"])
+    @commands.cooldown(1, 3, commands.BucketType.user)
+    async def about(self, ctx: Context):
+        """Tells you information about the bot itself."""
+
+        # every cluster's counts; users in more than one are counted by each
+        clusters = await self.bot.ipc.gather("stats")
+        total_members = sum(c["members"] for c in clusters)
+        total_unique = sum(c["users"] for c in clusters)
+        text = sum(c["text_channels"] for c in clusters)
+        voice = sum(c["voice_channels"] for c in clusters)
+        guilds = sum(c["guilds"] for c in clusters)
+        shards = {int(i): s for c in clusters for i, s in c["shards"].items()}
 
         memory_usage = self.process.memory_full_info().uss / 1024**2
         cpu_usage = self.process.cpu_percent() / psutil.cpu_count()
@@ -402,10 +438,18 @@ class Utility(Cog, emoji="🛠️"):
 
         em.add_field(name="Guilds", value=guilds)
 
-        em.add_field(name="Commands", value=len(my_commands))
+        em.add_field(name="Commands", value=self.bot.stats.command_count)
 
         em.add_field(name="Uptime", value=self.get_bot_uptime(brief=True))
 
+        if self.bot.ipc.cluster_count > 1:
+            em.add_field(
+                name="Clusters",
+                value=f"{len(clusters)}/{self.bot.ipc.cluster_count} answering",
+            )
+
+        em.add_field(name="Shards", value=self.shard_summary(shards), inline=False)
+
         if self.bot.user and self.bot.user.avatar is not None:
             em.set_thumbnail(url=self.bot.user.avatar.url)
         em.set_footer(
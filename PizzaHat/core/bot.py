@@ -1,15 +1,34 @@
+import asyncio
 import datetime
+import os
 import sys
+import time
 import traceback
 from logging.config import dictConfig
+from typing import Any, Dict, List, Optional
 
 import aiohttp
 import discord
+import psutil
 from discord.ext import commands
 from discord.ext.commands import CommandError, Context
 from discord.ext.commands.errors import ExtensionAlreadyLoaded
 
 import core.database as db
+from core.cache import CHUNK_GUILDS_AT_STARTUP, member_cache_flags
+from core.http import HttpClient
+from core.ipc import IPC
+from core.lifecycle import Lifecycle, ShuttingDown
+from core.lazy import LazyExtension, register_lazy
+from core.loader import ExtensionLoader, ExtensionTiming
+from core.messages import MessageStore
+from core.metrics import Gauge, Metrics
+from core.queries import Queries, create_tables
+from core.shards import ShardTracker, shard_config
+from core.stats import StatsTracker
+from core.suggest import CommandIndex
+from core.watchdog import LoopWatchdog
+from utils import reactions
 
 INITIAL_EXTENSIONS = [
     # 'cogs.activities',
@@ -27,6 +46,13 @@ INITIAL_EXTENSIONS = [
     "cogs.utility",
 ]
 
+# Heavy cogs only imported once one of their commands is used
+LAZY_EXTENSIONS = [
+    "cogs.games",
+    "cogs.images",
+    "cogs.meta",
+]
+
 SUB_EXTENSIONS = [
     "utils.automod",
     "utils.events",
@@ -59,7 +85,7 @@ LOGGING_CONFIG = {
             "level": "INFO",
             "class": "logging.FileHandler",
             "formatter": "verbose",
-            "filename": "bot.log",
+            "filename": os.getenv("LOG_FILE", "bot.log"),
             "mode": "w",
         },
     },
@@ -87,8 +113,10 @@ I'm also open source. You can see my code on [GitHub](https://github.com/DTS-11/
 """
 
 
-class PizzaHat(commands.Bot):
+class PizzaHat(commands.AutoShardedBot):
     bot_app_info: discord.AppInfo
+    http_client: HttpClient
+    extension_timings: List[ExtensionTiming]
 
     def __init__(self):
         allowed_mentions = discord.AllowedMentions(
@@ -105,6 +133,9 @@ class PizzaHat(commands.Bot):
             message_content=True,
         )
 
+        # created first, it wraps listeners as soon as they are added
+        self.metrics = Metrics()
+
         super().__init__(
             command_prefix=commands.when_mentioned_or("p!", "P!"),
             description=description,
@@ -116,6 +147,11 @@ class PizzaHat(commands.Bot):
             activity=discord.Activity(
                 type=discord.ActivityType.watching, name="p!help"
             ),
+            http_trace=self.metrics.http_trace(),
+            max_messages=int(os.getenv("MAX_MESSAGES", "1000")),
+            chunk_guilds_at_startup=CHUNK_GUILDS_AT_STARTUP,
+            member_cache_flags=member_cache_flags(intents),
+            **shard_config(),
         )
 
         self._BotBase__cogs = commands.core._CaseInsensitiveDict()
@@ -124,7 +160,34 @@ class PizzaHat(commands.Bot):
         self.color = 0x456DD4
         self.success = discord.Color.green()
         self.failed = discord.Color.red()
-        self.session = aiohttp.ClientSession()
+        self.stats = StatsTracker(self)
+        self.message_store = MessageStore(self)
+        self.message_store.add_metrics(self.metrics)
+        self.before_invoke(self.metrics.before_invoke)
+        self.after_invoke(self.metrics.after_invoke)
+        self.add_listener(self.metrics.on_command_error, "on_command_error")
+        self.metrics.add(
+            Gauge("pizzahat_guilds", "Guilds the bot is in.", lambda: len(self.guilds))
+        )
+        self.metrics.add(
+            Gauge(
+                "pizzahat_shard_guilds",
+                "Guilds on each shard.",
+                lambda: {(str(i),): s.guilds for i, s in self.stats.shards.items()},
+                ["shard"],
+            )
+        )
+        self.shard_tracker = ShardTracker(self)
+        self.shard_tracker.add_metrics(self.metrics)
+        self.lazy_extensions: Dict[str, LazyExtension] = {}
+        self.command_index = CommandIndex(self)
+        self.queries = Queries(self)
+        self.ipc = IPC(self)
+        self.ipc.add_handler("stats", self.cluster_stats)
+        self.lifecycle = Lifecycle(self)
+        self.lifecycle.add_hook("reactions", reactions.drain)
+        self.lifecycle.add_hook("journal", self.queries.flush)
+        self._close_task: Optional[asyncio.Task] = None
 
     async def on_ready(self):
         if not hasattr(self, "uptime"):
@@ -134,35 +197,44 @@ class PizzaHat(commands.Bot):
         # self.togetherControl = await DiscordTogether(os.getenv("TOKEN"), debug=True)  # type: ignore
 
     async def setup_hook(self) -> None:
+        # Shared HTTP pool, created here so it is bound to the running loop
+        self.http_client = HttpClient(trace_configs=[self.metrics.http_trace()])
+        await self.metrics.start()
+
+        self.watchdog = LoopWatchdog(self.metrics)
+        self.watchdog.start()
+        self.lifecycle.install_signal_handlers()
+
+        await self.ipc.connect()
+
         self.bot_app_info = await self.application_info()
         self.owner_id = self.bot_app_info.owner.id
 
         # Create DB connection
-        self.db = await db.create_db_pool()
+        self.db = await db.create_db_pool(init=self.init_connection)
+        self.db.add_metrics(self.metrics)
+        self.db.start_health_checks()
+        await create_tables(self.db)
+        self.queries.start_sync()
 
         # Loading cogs...
-        success = fail = 0
-        total = len(INITIAL_EXTENSIONS + SUB_EXTENSIONS)
-
-        for ext in INITIAL_EXTENSIONS:
-            try:
-                await self.load_extension(ext)
-                success += 1
-
-            except Exception as e:
-                print(f"Failed to load extension {ext}")
-                print("".join(traceback.format_exception(e, e, e.__traceback__)))  # type: ignore
-                fail += 1
-
-        for sub_ext in SUB_EXTENSIONS:
-            try:
-                await self.load_extension(sub_ext)
-                success += 1
-
-            except Exception as e:
-                print(f"Failed to load extension: {sub_ext}")
-                print("".join(traceback.format_exception(e, e, e.__traceback__)))  # type: ignore
-                fail += 1
+        eager = LAZY_EXTENSIONS
+        if os.getenv("LAZY_COGS", "1") != "0":
+            eager = await register_lazy(self, LAZY_EXTENSIONS)
+
+        extensions = [
+            ext
+            for ext in INITIAL_EXTENSIONS
+            if ext not in LAZY_EXTENSIONS or ext in eager
+        ]
+        loader = ExtensionLoader(self, extensions + SUB_EXTENSIONS)
+        start = time.perf_counter()
+        timings = self.extension_timings = await loader.load()
+        elapsed = time.perf_counter() - start
+
+        success = sum(1 for t in timings if t.ok)
+        fail = len(timings) - success
+        total = len(timings)
 
         try:
             await self.load_extension("jishaku")
@@ -171,11 +243,18 @@ class PizzaHat(commands.Bot):
         except ExtensionAlreadyLoaded:
             pass
 
+        if self.lazy_extensions:
+            print(f"Deferred until first use: {', '.join(self.lazy_extensions)}")
+
         print(
             f"Loaded all cogs.\nSuccess: {success}, Fail: {fail}\nDone! ({success+fail}/{total})"
         )
+        print(f"Startup profile ({elapsed * 1000:.0f}ms):\n{loader.profile()}")
         print("=========================")
 
+        # Lets listeners precompute anything derived from the loaded commands
+        self.dispatch("extensions_loaded")
+
     # async def on_wavelink_node_ready(self, node: wavelink.Node):
     #     print(f"Node: {node.identifier} is ready.")
 
@@ -215,14 +294,48 @@ class PizzaHat(commands.Bot):
     #     except wavelink.errors.QueueEmpty:
     #         pass
 
+    async def cluster_stats(self) -> Dict[str, Any]:
+        """This cluster's counts, as the "stats" IPC op returns them."""
+
+        stats = self.stats
+        tracker = self.shard_tracker
+
+        return {
+            "cluster": self.ipc.cluster_id,
+            "guilds": stats.guild_count,
+            "members": stats.members,
+            "users": len(self.users),
+            "text_channels": stats.text_channels,
+            "voice_channels": stats.voice_channels,
+            "memory": psutil.Process().memory_info().rss,
+            "shards": {
+                str(shard_id): {
+                    "latency": latency,
+                    "guilds": stats.shard(shard_id).guilds,
+                    "status": tracker.get(shard_id).status,
+                }
+                for shard_id, latency in tracker.latencies().items()
+            },
+        }
+
+    async def init_connection(self, conn) -> None:
+        await self.metrics.init_connection(conn)
+
     async def on_command_error(self, ctx: Context, error: CommandError) -> None:
         if isinstance(error, commands.CommandNotFound):
-            pass
+            if ctx.invoked_with and (
+                matches := self.command_index.suggest(ctx.invoked_with)
+            ):
+                names = ", ".join(f"`{name}`" for name in matches)
+                await ctx.send(f"Command not found. Did you mean {names}?")
 
         elif isinstance(error, commands.NotOwner):
             pass
 
-        if isinstance(error, commands.NoPrivateMessage):
+        if isinstance(error, ShuttingDown):
+            await ctx.send(str(error))
+
+        elif isinstance(error, commands.NoPrivateMessage):
             await ctx.author.send("This command cannot be used in private messages.")
 
         elif isinstance(error, commands.DisabledCommand):
@@ -274,6 +387,64 @@ class PizzaHat(commands.Bot):
 
                 await ctx.send(embed=em)
 
+    def _schedule_event(self, coro, event_name: str, *args, **kwargs):
+        task = super()._schedule_event(coro, event_name, *args, **kwargs)
+        self.lifecycle.track_event(task)
+        return task
+
+    async def add_cog(self, cog: commands.Cog, /, **kwargs) -> None:
+        await super().add_cog(cog, **kwargs)
+        self.stats.invalidate_commands()
+
+    async def remove_cog(self, name: str, /, **kwargs) -> Optional[commands.Cog]:
+        cog = await super().remove_cog(name, **kwargs)
+        self.stats.invalidate_commands()
+        return cog
+
+    def add_listener(self, func, /, name=discord.utils.MISSING) -> None:
+        name = func.__name__ if name is discord.utils.MISSING else name
+        super().add_listener(self.metrics.wrap_listener(func, name), name)
+
+    def remove_listener(self, func, /, name=discord.utils.MISSING) -> None:
+        name = func.__name__ if name is discord.utils.MISSING else name
+        super().remove_listener(self.metrics.unwrap_listener(func), name)
+
+    async def __aexit__(self, *args) -> None:
+        # discord.py only waits for its own part of closing if it has started
+        await self.close()
+
+    async def close(self) -> None:
+        await self.lifecycle.drain()
+
+        # SIGTERM closes the bot from a task of its own, and leaving `run`
+        # closes it again, so the second waits for the first
+        if self._close_task is None:
+            self._close_task = asyncio.create_task(self._close())
+
+        await self._close_task
+
+    async def _close(self):
+        await super().close()
+
+        if hasattr(self, "http_client"):
+            await self.http_client.close()
+
+        if hasattr(self, "watchdog"):
+            self.watchdog.stop()
+
+        await self.ipc.close()
+
+        self.queries.stop_sync()
+
+        if hasattr(self, "db"):
+            await self.db.close()
+
+        await self.metrics.stop()
+
     @property
     def owner(self) -> discord.User:
         return self.bot_app_info.owner
+
+    @property
+    def session(self) -> aiohttp.ClientSession:
+        return self.http_client.session
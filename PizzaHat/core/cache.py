@@ -0,0 +1,36 @@
+import os
+
+import discord
+
+# Asking for every member of every guild on connect is what makes a large
+# bot's memory grow with its member count. Off by default: member lists are
+# requested when a command needs them, see `StatsTracker.complete`.
+CHUNK_GUILDS_AT_STARTUP = os.getenv("CHUNK_GUILDS_AT_STARTUP", "0") != "0"
+
+# "default" (everything the intents allow), "all", "none", or a comma
+# separated list of MemberCacheFlags such as "voice,joined".
+MEMBER_CACHE = os.getenv("MEMBER_CACHE", "default")
+
+
+def member_cache_flags(
+    intents: discord.Intents, policy: str = MEMBER_CACHE
+) -> discord.MemberCacheFlags:
+    policy = policy.strip().lower()
+
+    if policy == "default":
+        return discord.MemberCacheFlags.from_intents(intents)
+
+    if policy == "all":
+        return discord.MemberCacheFlags.all()
+
+    if policy == "none":
+        return discord.MemberCacheFlags.none()
+
+    flags = discord.MemberCacheFlags.none()
+    for name in filter(None, (n.strip() for n in policy.split(","))):
+        if name not in discord.MemberCacheFlags.VALID_FLAGS:
+            raise ValueError(f"Unknown member cache flag in MEMBER_CACHE: {name}")
+
+        setattr(flags, name, True)
+
+    return flags
@@ -1,21 +1,367 @@
+import asyncio
+import json
+import logging
 import os
+import re
 import ssl
+import sys
+import time
+from collections import defaultdict, deque
+from typing import Any, Awaitable, Callable, Deque, Dict, Optional, Tuple
 
 import asyncpg  # type: ignore
 from dotenv import load_dotenv
 
+from core.metrics import Counter, Gauge, Histogram, Metrics
+
 load_dotenv()
 
+logger = logging.getLogger("bot")
+
+# Set `DB_SSL=0` if you are using localhost for postgres
+ENABLE_SSL = os.getenv("DB_SSL", "1") != "0"
+
+POOL_MIN_SIZE = int(os.getenv("DB_POOL_MIN_SIZE", "2"))
+POOL_MAX_SIZE = int(os.getenv("DB_POOL_MAX_SIZE", "10"))
+# Idle connections are closed after this long, so the pool shrinks back
+# down after a burst and never holds a connection the server has dropped.
+MAX_INACTIVE_LIFETIME = float(os.getenv("DB_MAX_INACTIVE_LIFETIME", "300"))
+# Applied both client side and as the server's `statement_timeout`.
+STATEMENT_TIMEOUT = float(os.getenv("DB_STATEMENT_TIMEOUT", "10"))
+
+HEALTH_CHECK_INTERVAL = float(os.getenv("DB_HEALTH_CHECK_INTERVAL", "30"))
+CONNECT_ATTEMPTS = int(os.getenv("DB_CONNECT_ATTEMPTS", "5"))
+BACKOFF_BASE = 1.0
+BACKOFF_MAX = 30.0
+
+SLOW_QUERY_THRESHOLD = float(os.getenv("DB_SLOW_QUERY_MS", "100")) / 1000
+
+# What a lost or unreachable server looks like from asyncpg
+CONNECTION_ERRORS = (
+    OSError,
+    asyncio.TimeoutError,
+    asyncpg.InterfaceError,
+    asyncpg.PostgresConnectionError,
+    asyncpg.CannotConnectNowError,
+)
+
+_WHITESPACE = re.compile(r"\s+")
+
+# Frames skipped when finding who ran a query: this module and core.queries,
+# which every cog goes through
+_QUERY_MODULES = {__file__, os.path.join(os.path.dirname(__file__), "queries.py")}
+
+
+class QueryStats:
+    __slots__ = ("calls", "errors", "rows", "total_time", "max_time")
+
+    def __init__(self):
+        self.calls = 0
+        self.errors = 0
+        self.rows = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.calls if self.calls else 0.0
+
+
+class SlowQuery:
+    __slots__ = ("query", "elapsed", "call_site", "when")
+
+    def __init__(self, query: str, elapsed: float, call_site: str):
+        self.query = query
+        self.elapsed = elapsed
+        self.call_site = call_site
+        self.when = time.time()
+
+
+def _call_site() -> str:
+    # the first frame outside the query modules is the code that ran the query
+    frame = sys._getframe(1)
+
+    while frame is not None and frame.f_code.co_filename in _QUERY_MODULES:
+        frame = frame.f_back  # type: ignore
+
+    if frame is None:
+        return "unknown"
+
+    code = frame.f_code
+    return f"{os.path.relpath(code.co_filename)}:{frame.f_lineno} in {code.co_name}"
+
+
+def _row_count(method: str, result: Any) -> int:
+    if method == "fetch":
+        return len(result)
+
+    if method in ("fetchrow", "fetchval"):
+        return 0 if result is None else 1
+
+    if method == "execute" and isinstance(result, str):
+        # command tags look like "INSERT 0 5" or "UPDATE 3"
+        last = result.rsplit(" ", 1)[-1]
+        return int(last) if last.isdigit() else 0
+
+    return 0
+
+
+def backoff(attempt: int) -> float:
+    return min(BACKOFF_MAX, BACKOFF_BASE * 2**attempt)
+
+
+class InstrumentedPool:
+    """
+    Wraps an asyncpg pool and times every query made through it.
+
+    Queries are grouped by their normalised text. The time spent waiting for
+    a free connection is tracked separately from the query itself, and any
+    query slower than `SLOW_QUERY_THRESHOLD` is logged with its call site.
+
+    `start_health_checks` pings the server in the background. When a ping
+    fails every pooled connection is expired, so the next acquire reconnects
+    (to the new primary, after a failover), and pings back off until one
+    succeeds.
+    """
+
+    def __init__(
+        self, pool: asyncpg.Pool, *, slow_threshold: float = SLOW_QUERY_THRESHOLD
+    ):
+        self.pool = pool
+        self.slow_threshold = slow_threshold
+        self.queries: Dict[str, QueryStats] = defaultdict(QueryStats)
+        self.slow: Deque[SlowQuery] = deque(maxlen=50)
+
+        self.acquires = 0
+        self.total_wait = 0.0
+        self.max_wait = 0.0
+
+        self.healthy = True
+        self.failures = 0
+        self.reconnects = 0
+        self._health_task: Optional[asyncio.Task] = None
+        self._acquire_wait: Optional[Histogram] = None
+        self._reconnects: Optional[Counter] = None
+
+    def __getattr__(self, name: str) -> Any:
+        return getattr(self.pool, name)
+
+    @property
+    def in_use(self) -> int:
+        return self.pool.get_size() - self.pool.get_idle_size()
+
+    @property
+    def avg_wait(self) -> float:
+        return self.total_wait / self.acquires if self.acquires else 0.0
+
+    def reset(self):
+        self.queries.clear()
+        self.slow.clear()
+        self.acquires = 0
+        self.total_wait = self.max_wait = 0.0
+
+    async def _run(self, method: str, query: str, args: Tuple, kwargs: Dict) -> Any:
+        key = _WHITESPACE.sub(" ", query).strip()
+        stats = self.queries[key]
+
+        start = time.perf_counter()
+        # a timeout covers waiting for a connection as well as the query
+        async with self.pool.acquire(timeout=kwargs.get("timeout")) as conn:
+            waited = time.perf_counter() - start
+            self.acquires += 1
+            self.total_wait += waited
+            self.max_wait = max(self.max_wait, waited)
+
+            if self._acquire_wait is not None:
+                self._acquire_wait.observe(waited)
+
+            start = time.perf_counter()
+            try:
+                result = await getattr(conn, method)(query, *args, **kwargs)
+
+            except Exception:
+                stats.errors += 1
+                raise
 
-# Change this to `False` if you are using localhost for postgres
-ENABLE_SSL = True
+            finally:
+                elapsed = time.perf_counter() - start
+                stats.calls += 1
+                stats.total_time += elapsed
+                stats.max_time = max(stats.max_time, elapsed)
 
+        stats.rows += _row_count(method, result)
 
-async def create_db_pool():
+        if elapsed > self.slow_threshold:
+            site = _call_site()
+            self.slow.append(SlowQuery(key, elapsed, site))
+            logger.warning(f"Slow query ({elapsed * 1000:.0f}ms) at {site}: {key}")
+
+        return result
+
+    async def execute(self, query: str, *args: Any, **kwargs: Any) -> str:
+        return await self._run("execute", query, args, kwargs)
+
+    async def executemany(self, query: str, *args: Any, **kwargs: Any) -> None:
+        return await self._run("executemany", query, args, kwargs)
+
+    async def fetch(self, query: str, *args: Any, **kwargs: Any) -> list:
+        return await self._run("fetch", query, args, kwargs)
+
+    async def fetchrow(self, query: str, *args: Any, **kwargs: Any) -> Optional[Any]:
+        return await self._run("fetchrow", query, args, kwargs)
+
+    async def fetchval(self, query: str, *args: Any, **kwargs: Any) -> Any:
+        return await self._run("fetchval", query, args, kwargs)
+
+    # ====== HEALTH ======
+
+    def _healthy(self) -> int:
+        return int(self.healthy)
+
+    def start_health_checks(self, interval: float = HEALTH_CHECK_INTERVAL):
+        if interval > 0 and self._health_task is None:
+            self._health_task = asyncio.create_task(self._check_health(interval))
+
+    def _saturated(self) -> bool:
+        return self.in_use >= self.pool.get_max_size()
+
+    async def _ping(self) -> bool:
+        """Pings the server, or returns False if every connection stayed busy."""
+
+        try:
+            conn = await self.pool.acquire(timeout=STATEMENT_TIMEOUT)
+
+        except asyncio.TimeoutError:
+            # a busy pool is load, not an outage; a timeout with connections
+            # to spare means opening a new one hung
+            if self._saturated():
+                return False
+
+            raise
+
+        try:
+            await conn.fetchval("SELECT 1", timeout=STATEMENT_TIMEOUT)
+
+        finally:
+            await self.pool.release(conn)
+
+        return True
+
+    async def _check_health(self, interval: float):
+        delay = interval
+
+        while True:
+            await asyncio.sleep(delay)
+
+            try:
+                if not await self._ping():
+                    logger.debug("Skipped a health check, the pool is busy")
+                    continue
+
+            except CONNECTION_ERRORS as e:
+                if self.healthy:
+                    logger.warning(f"Lost the database connection: {e!r}")
+
+                self.healthy = False
+                self.pool.expire_connections()
+                delay = backoff(self.failures)
+                self.failures += 1
+                continue
+
+            if not self.healthy:
+                logger.info(f"Database is back after {self.failures} failed checks")
+                self.reconnects += 1
+
+                if self._reconnects is not None:
+                    self._reconnects.inc()
+
+            self.healthy = True
+            self.failures = 0
+            delay = interval
+
+    async def close(self):
+        if self._health_task is not None:
+            self._health_task.cancel()
+            self._health_task = None
+
+        await self.pool.close()
+
+    # ====== METRICS ======
+
+    def add_metrics(self, metrics: Metrics):
+        self._acquire_wait = metrics.add(
+            Histogram(
+                "pizzahat_db_acquire_wait_seconds",
+                "Time spent waiting for a free pool connection.",
+            )
+        )
+        self._reconnects = metrics.add(
+            Counter(
+                "pizzahat_db_reconnects_total",
+                "Times the database came back after a failed health check.",
+            )
+        )
+
+        gauges = [
+            ("size", "Open pool connections.", self.pool.get_size),
+            ("idle", "Idle pool connections.", self.pool.get_idle_size),
+            ("max_size", "Most connections allowed.", self.pool.get_max_size),
+            ("in_use", "Connections checked out.", lambda: self.in_use),
+            ("healthy", "1 if the last health check passed.", self._healthy),
+        ]
+
+        for name, doc, read in gauges:
+            metrics.add(Gauge(f"pizzahat_db_pool_{name}", doc, read))
+
+
+def _ssl_context() -> ssl.SSLContext:
     ssl_object = ssl.create_default_context()
     ssl_object.check_hostname = False
     ssl_object.verify_mode = ssl.CERT_NONE
+    return ssl_object
+
+
+async def create_db_pool(
+    init: Optional[Callable[[asyncpg.Connection], Awaitable[None]]] = None,
+    **kwargs,
+) -> InstrumentedPool:
+    async def init_connection(conn: asyncpg.Connection):
+        for json_type in ("json", "jsonb"):
+            await conn.set_type_codec(
+                json_type, encoder=json.dumps, decoder=json.loads, schema="pg_catalog"
+            )
+
+        if init is not None:
+            await init(conn)
+
+    options = dict(
+        dsn=os.getenv("PG_URL"),
+        min_size=POOL_MIN_SIZE,
+        max_size=POOL_MAX_SIZE,
+        max_inactive_connection_lifetime=MAX_INACTIVE_LIFETIME,
+        command_timeout=STATEMENT_TIMEOUT,
+        server_settings={"statement_timeout": str(int(STATEMENT_TIMEOUT * 1000))},
+        init=init_connection,
+    )
+
+    if ENABLE_SSL:
+        options["ssl"] = _ssl_context()
+
+    options.update(kwargs)
+
+    for attempt in range(CONNECT_ATTEMPTS):
+        try:
+            pool = await asyncpg.create_pool(**options)
+            break
+
+        except CONNECTION_ERRORS as e:
+            if attempt == CONNECT_ATTEMPTS - 1:
+                raise
+
+            delay = backoff(attempt)
+            logger.warning(
+                f"Could not connect to the database ({e!r}), retrying in {delay:.0f}s"
+            )
+            await asyncio.sleep(delay)
 
-    if not ENABLE_SSL:
-        return await asyncpg.create_pool(dsn=os.getenv("PG_URL"))
-    return await asyncpg.create_pool(dsn=os.getenv("PG_URL"), enable_ssl=ssl_object)
+    return InstrumentedPool(pool)  # type: ignore
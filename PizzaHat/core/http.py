@@ -0,0 +1,233 @@
+import asyncio
+import json
+import logging
+import random
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Dict, Mapping, Optional, Sequence
+
+import aiohttp
+from yarl import URL
+
+logger = logging.getLogger("bot")
+
+USER_AGENT = "PizzaHat (https://github.com/DTS-11/PizzaHat)"
+
+DEFAULT_TIMEOUT = aiohttp.ClientTimeout(total=30, connect=10, sock_read=20)
+
+# Hosts that need a tighter (or looser) concurrency cap than the default.
+HOST_LIMITS: Dict[str, int] = {
+    "backend.craiyon.com": 2,
+    "www.reddit.com": 4,
+}
+
+IDEMPOTENT_METHODS = frozenset({"GET", "HEAD", "OPTIONS", "PUT", "DELETE"})
+RETRY_STATUSES = frozenset({429, 500, 502, 503, 504})
+
+
+class HTTPStatusError(Exception):
+    """Raised by the helper methods when a response has an error status."""
+
+    def __init__(self, method: str, response: "Response"):
+        self.status = response.status
+        self.url = response.url
+        super().__init__(f"{method} {response.url} returned {response.status}")
+
+
+class HostStats:
+    __slots__ = ("requests", "errors", "retries", "total_time", "max_time", "statuses")
+
+    def __init__(self):
+        self.requests = 0
+        self.errors = 0
+        self.retries = 0
+        self.total_time = 0.0
+        self.max_time = 0.0
+        self.statuses: Dict[int, int] = defaultdict(int)
+
+    @property
+    def avg_time(self) -> float:
+        return self.total_time / self.requests if self.requests else 0.0
+
+
+class Response:
+    """A fully read HTTP response, so the connection is back in the pool."""
+
+    __slots__ = ("status", "headers", "url", "body")
+
+    def __init__(self, status: int, headers: Mapping[str, str], url: URL, body: bytes):
+        self.status = status
+        self.headers = headers
+        self.url = url
+        self.body = body
+
+    @property
+    def ok(self) -> bool:
+        return self.status < 400
+
+    def text(self, encoding: str = "utf-8") -> str:
+        return self.body.decode(encoding, errors="replace")
+
+    def json(self) -> Any:
+        return json.loads(self.body)
+
+
+class HttpClient:
+    """
+    The bot's shared HTTP layer.
+
+    One pooled session with DNS caching, default timeouts, per-host
+    concurrency limits, retries with exponential backoff and per-host
+    request metrics. Third party API clients should be given `session`
+    so their traffic goes through the same pool and shows up in `stats`.
+    """
+
+    def __init__(
+        self,
+        *,
+        limit: int = 100,
+        limit_per_host: int = 10,
+        dns_ttl: int = 300,
+        timeout: aiohttp.ClientTimeout = DEFAULT_TIMEOUT,
+        max_retries: int = 3,
+        backoff: float = 0.5,
+        trace_configs: Sequence[aiohttp.TraceConfig] = (),
+    ):
+        self.limit_per_host = limit_per_host
+        self.max_retries = max_retries
+        self.backoff = backoff
+        self.stats: Dict[str, HostStats] = defaultdict(HostStats)
+        self._host_locks: Dict[str, asyncio.Semaphore] = {}
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(self._on_request_start)
+        trace.on_request_end.append(self._on_request_end)
+        trace.on_request_exception.append(self._on_request_exception)
+
+        self.connector = aiohttp.TCPConnector(
+            limit=limit,
+            limit_per_host=limit_per_host,
+            ttl_dns_cache=dns_ttl,
+            use_dns_cache=True,
+            enable_cleanup_closed=True,
+        )
+        self.session = aiohttp.ClientSession(
+            connector=self.connector,
+            timeout=timeout,
+            headers={"User-Agent": USER_AGENT},
+            trace_configs=[trace, *trace_configs],
+        )
+
+    # ====== METRICS ======
+
+    async def _on_request_start(self, session, ctx: SimpleNamespace, params):
+        ctx.start = time.perf_counter()
+
+    def _record(self, ctx: SimpleNamespace, url: URL) -> HostStats:
+        elapsed = time.perf_counter() - ctx.start
+        stats = self.stats[url.host or "unknown"]
+        stats.requests += 1
+        stats.total_time += elapsed
+        stats.max_time = max(stats.max_time, elapsed)
+        return stats
+
+    async def _on_request_end(self, session, ctx: SimpleNamespace, params):
+        stats = self._record(ctx, params.url)
+        stats.statuses[params.response.status] += 1
+
+        if params.response.status >= 400:
+            stats.errors += 1
+
+    async def _on_request_exception(self, session, ctx: SimpleNamespace, params):
+        self._record(ctx, params.url).errors += 1
+
+    # ====== REQUESTS ======
+
+    def _host_lock(self, host: str) -> asyncio.Semaphore:
+        lock = self._host_locks.get(host)
+
+        if lock is None:
+            lock = asyncio.Semaphore(HOST_LIMITS.get(host, self.limit_per_host))
+            self._host_locks[host] = lock
+
+        return lock
+
+    def _retry_delay(self, attempt: int, retry_after: Optional[str] = None) -> float:
+        if retry_after is not None:
+            try:
+                return min(float(retry_after), 30.0)
+
+            except ValueError:
+                pass
+
+        return self.backoff * 2**attempt + random.uniform(0, self.backoff)
+
+    async def request(
+        self, method: str, url: str, *, retries: Optional[int] = None, **kwargs: Any
+    ) -> Response:
+        """
+        Makes a request and reads the whole body.
+
+        Only idempotent methods are retried unless `retries` is given.
+        """
+
+        method = method.upper()
+        if retries is None:
+            retries = self.max_retries if method in IDEMPOTENT_METHODS else 0
+
+        host = URL(url).host or "unknown"
+        attempt = 0
+
+        while True:
+            try:
+                async with self._host_lock(host):
+                    async with self.session.request(method, url, **kwargs) as resp:
+                        body = await resp.read()
+                        response = Response(resp.status, resp.headers, resp.url, body)
+
+            except (aiohttp.ClientConnectionError, asyncio.TimeoutError) as e:
+                if attempt >= retries:
+                    raise
+
+                delay = self._retry_delay(attempt)
+                logger.warning(
+                    f"{method} {url} failed ({e!r}), retrying in {delay:.2f}s"
+                )
+
+            else:
+                if response.status not in RETRY_STATUSES or attempt >= retries:
+                    return response
+
+                delay = self._retry_delay(attempt, response.headers.get("Retry-After"))
+                logger.warning(
+                    f"{method} {url} returned {response.status}, "
+                    f"retrying in {delay:.2f}s"
+                )
+
+            self.stats[host].retries += 1
+            attempt += 1
+            await asyncio.sleep(delay)
+
+    def _raise_for_status(self, method: str, response: Response):
+        if not response.ok:
+            raise HTTPStatusError(method, response)
+
+    async def get_json(self, url: str, **kwargs: Any) -> Any:
+        response = await self.request("GET", url, **kwargs)
+        self._raise_for_status("GET", response)
+        return response.json()
+
+    async def get_bytes(self, url: str, **kwargs: Any) -> bytes:
+        response = await self.request("GET", url, **kwargs)
+        self._raise_for_status("GET", response)
+        return response.body
+
+    async def post_json(self, url: str, **kwargs: Any) -> Any:
+        response = await self.request("POST", url, **kwargs)
+        self._raise_for_status("POST", response)
+        return response.json()
+
+    async def close(self):
+        if not self.session.closed:
+            await self.session.close()
@@ -0,0 +1,446 @@
+import asyncio
+import itertools
+import json
+import logging
+import os
+import time
+from typing import Any, Awaitable, Callable, Dict, List, Optional, Tuple
+
+from core.database import backoff
+
+logger = logging.getLogger("bot")
+
+# Set by the launcher for each cluster it starts. Without IPC_PATH the bot is
+# a cluster of one and IPC calls only reach this process.
+IPC_PATH = os.getenv("IPC_PATH", "")
+CLUSTER_ID = int(os.getenv("CLUSTER_ID", "0"))
+CLUSTER_COUNT = int(os.getenv("CLUSTER_COUNT", "1"))
+IPC_TIMEOUT = float(os.getenv("IPC_TIMEOUT", "5"))
+# How long a cluster that lost the launcher keeps trying to reach it again
+# before shutting down, rather than run on with nothing to stop it
+IPC_RECONNECT_GRACE = float(os.getenv("IPC_RECONNECT_GRACE", "30"))
+
+LINE_LIMIT = 4 * 1024**2  # largest message either side will read
+
+Handler = Callable[..., Awaitable[Any]]
+
+
+class IPCError(Exception):
+    pass
+
+
+# Messages are JSON, one per line. A cluster sends "hello" once connected,
+# "request" to run an op on every cluster, "reply" to answer a "call", and
+# "ready" or "restart" for the launcher. The launcher sends "call" to run an
+# op and "response" with every cluster's reply to a request.
+
+
+async def _send(writer: asyncio.StreamWriter, message: Dict[str, Any]):
+    writer.write(json.dumps(message).encode() + b"\n")
+    await writer.drain()
+
+
+async def _receive(reader: asyncio.StreamReader) -> Optional[Dict[str, Any]]:
+    line = await reader.readline()
+    return json.loads(line) if line else None
+
+
+def _reply(cluster: int, result: Any = None, error: Optional[str] = None):
+    return {"cluster": cluster, "result": result, "error": error}
+
+
+# ====== CLUSTER ======
+
+
+class IPC:
+    """
+    This cluster's connection to the launcher, and through it to the others.
+
+    Handlers are async functions registered under an op name. `gather` runs
+    an op on every cluster, this one included, and returns their results;
+    `broadcast` does the same without waiting. Handlers take and return
+    JSON, so they return plain dicts and lists rather than discord objects.
+    """
+
+    def __init__(
+        self,
+        bot,
+        *,
+        path: str = IPC_PATH,
+        cluster_id: int = CLUSTER_ID,
+        cluster_count: int = CLUSTER_COUNT,
+        reconnect_grace: float = IPC_RECONNECT_GRACE,
+    ):
+        self.bot = bot
+        self.path = path
+        self.cluster_id = cluster_id
+        self.cluster_count = cluster_count
+        self.reconnect_grace = reconnect_grace
+        self._launcher_pid = os.getppid()
+        self.handlers: Dict[str, Handler] = {}
+        self._ids = itertools.count()
+        self._pending: Dict[int, asyncio.Future] = {}
+        self._writer: Optional[asyncio.StreamWriter] = None
+        self._task: Optional[asyncio.Task] = None
+
+        bot.add_listener(self.on_ready, "on_ready")
+
+    @property
+    def connected(self) -> bool:
+        return self._writer is not None
+
+    def add_handler(self, op: str, func: Handler):
+        self.handlers[op] = func
+
+    def remove_handler(self, op: str):
+        self.handlers.pop(op, None)
+
+    # ====== CONNECTION ======
+
+    async def connect(self):
+        if not self.path or self._writer is not None:
+            return
+
+        reader = await self._open()
+        self._task = asyncio.create_task(self._listen(reader))
+        logger.info(f"Cluster {self.cluster_id} connected to the launcher")
+
+    async def _open(self) -> asyncio.StreamReader:
+        reader, writer = await asyncio.open_unix_connection(
+            self.path, limit=LINE_LIMIT
+        )
+
+        try:
+            await _send(writer, {"type": "hello", "cluster": self.cluster_id})
+
+        except ConnectionError:
+            writer.close()
+            raise
+
+        self._writer = writer
+        return reader
+
+    async def close(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+        if self._writer is not None:
+            self._writer.close()
+            self._writer = None
+
+        self._fail_pending("IPC closed")
+
+    def _fail_pending(self, reason: str):
+        for future in self._pending.values():
+            if not future.done():
+                future.set_exception(IPCError(reason))
+
+        self._pending.clear()
+
+    async def _listen(self, reader: Optional[asyncio.StreamReader]):
+        while reader is not None:
+            try:
+                while (message := await _receive(reader)) is not None:
+                    kind = message["type"]
+
+                    if kind == "call":
+                        asyncio.create_task(self._answer(message))
+
+                    elif kind == "response":
+                        future = self._pending.pop(message["id"], None)
+                        if future is not None and not future.done():
+                            future.set_result(message["results"])
+
+            except (ConnectionError, json.JSONDecodeError) as e:
+                logger.warning(f"IPC connection broke: {e!r}")
+
+            logger.warning(f"Cluster {self.cluster_id} lost the launcher")
+            self._writer = None
+            self._fail_pending("Lost the launcher")
+            reader = await self._reconnect()
+
+        # the launcher would have restarted its clusters, an orphan would
+        # keep its shards connected next to theirs
+        logger.error(f"Cluster {self.cluster_id} has no launcher, shutting down")
+        self.bot.lifecycle.shutdown()
+
+    async def _reconnect(self) -> Optional[asyncio.StreamReader]:
+        deadline = time.monotonic() + self.reconnect_grace
+        attempt = 0
+
+        while True:
+            # reparented, so the launcher is gone for good
+            if os.getppid() != self._launcher_pid:
+                return None
+
+            remaining = deadline - time.monotonic()
+            if remaining <= 0:
+                return None
+
+            await asyncio.sleep(min(backoff(attempt), remaining))
+            attempt += 1
+
+            try:
+                reader = await self._open()
+
+            except OSError:
+                continue
+
+            logger.info(f"Cluster {self.cluster_id} reconnected to the launcher")
+            if self.bot.is_ready():
+                await self.notify("ready")
+
+            return reader
+
+    async def _answer(self, message: Dict[str, Any]):
+        result, error = await self._run(message["op"], message["data"])
+
+        if message["id"] is not None and self._writer is not None:
+            reply = _reply(self.cluster_id, result, error)
+            await _send(self._writer, {"type": "reply", "id": message["id"], **reply})
+
+    async def _run(self, op: str, data: Dict[str, Any]) -> Tuple[Any, Optional[str]]:
+        handler = self.handlers.get(op)
+        if handler is None:
+            return None, f"No handler for {op!r}"
+
+        try:
+            return await handler(**data), None
+
+        except Exception as e:
+            logger.exception(f"IPC handler {op!r} failed")
+            return None, repr(e)
+
+    # ====== CALLS ======
+
+    async def request(
+        self, op: str, *, timeout: float = IPC_TIMEOUT, **data: Any
+    ) -> List[Dict[str, Any]]:
+        """
+        Runs `op` on every cluster and returns each one's reply, with its
+        `cluster`, `result` and `error`. Clusters that are down or too slow
+        come back with an error.
+        """
+
+        if self._writer is None:
+            return [_reply(self.cluster_id, *await self._run(op, data))]
+
+        request_id = next(self._ids)
+        future = self._pending[request_id] = asyncio.get_running_loop().create_future()
+
+        try:
+            await _send(
+                self._writer,
+                {
+                    "type": "request",
+                    "id": request_id,
+                    "op": op,
+                    "data": data,
+                    "timeout": timeout,
+                },
+            )
+            # the launcher gives up on slow clusters after `timeout`
+            return await asyncio.wait_for(future, timeout + 1)
+
+        finally:
+            self._pending.pop(request_id, None)
+
+    async def gather(
+        self, op: str, *, timeout: float = IPC_TIMEOUT, **data: Any
+    ) -> List[Any]:
+        """Like `request`, but only the results of the clusters that answered."""
+
+        results = []
+
+        for reply in await self.request(op, timeout=timeout, **data):
+            if reply["error"] is None:
+                results.append(reply["result"])
+
+            else:
+                logger.warning(
+                    f"Cluster {reply['cluster']} failed {op!r}: {reply['error']}"
+                )
+
+        return results
+
+    async def broadcast(self, op: str, **data: Any):
+        if self._writer is None:
+            await self._run(op, data)
+            return
+
+        await _send(
+            self._writer,
+            {"type": "request", "id": None, "op": op, "data": data},
+        )
+
+    async def notify(self, kind: str) -> bool:
+        """Sends the launcher a message of its own, like "restart"."""
+
+        if self._writer is None:
+            return False
+
+        await _send(self._writer, {"type": kind, "cluster": self.cluster_id})
+        return True
+
+    async def on_ready(self):
+        await self.notify("ready")
+
+
+# ====== LAUNCHER ======
+
+
+class IPCServer:
+    """The launcher's end: routes requests between the clusters."""
+
+    def __init__(
+        self,
+        path: str,
+        *,
+        on_message: Optional[Callable[[int, Dict[str, Any]], Any]] = None,
+    ):
+        self.path = path
+        self.on_message = on_message
+        self.clusters: Dict[int, asyncio.StreamWriter] = {}
+        self.ready: Dict[int, asyncio.Event] = {}
+        self._ids = itertools.count()
+        self._waiting: Dict[int, asyncio.Future] = {}
+        self._server: Optional[asyncio.AbstractServer] = None
+
+    async def start(self):
+        # a socket left over from a launcher that didn't exit cleanly
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+        self._server = await asyncio.start_unix_server(
+            self._client, self.path, limit=LINE_LIMIT
+        )
+
+    async def close(self):
+        if self._server is not None:
+            self._server.close()
+            self._server = None
+
+        for writer in list(self.clusters.values()):
+            writer.close()
+
+        if os.path.exists(self.path):
+            os.unlink(self.path)
+
+    def _ready(self, cluster: int) -> asyncio.Event:
+        event = self.ready.get(cluster)
+
+        if event is None:
+            event = self.ready[cluster] = asyncio.Event()
+
+        return event
+
+    def reset(self, cluster: int):
+        """Forgets that a cluster was ready, before it is started again."""
+        self._ready(cluster).clear()
+
+    async def wait_ready(self, cluster: int, timeout: float) -> bool:
+        try:
+            await asyncio.wait_for(self._ready(cluster).wait(), timeout)
+            return True
+
+        except asyncio.TimeoutError:
+            return False
+
+    async def _client(self, reader: asyncio.StreamReader, writer: asyncio.StreamWriter):
+        hello = await _receive(reader)
+        if hello is None or hello["type"] != "hello":
+            writer.close()
+            return
+
+        cluster = hello["cluster"]
+        self.clusters[cluster] = writer
+        self._ready(cluster).clear()
+
+        try:
+            while (message := await _receive(reader)) is not None:
+                kind = message["type"]
+
+                if kind == "reply":
+                    future = self._waiting.pop(message["id"], None)
+                    if future is not None and not future.done():
+                        future.set_result(message)
+
+                elif kind == "request":
+                    asyncio.create_task(self._route(writer, message))
+
+                elif kind == "ready":
+                    self._ready(cluster).set()
+
+                elif self.on_message is not None:
+                    self.on_message(cluster, message)
+
+        except (ConnectionError, json.JSONDecodeError) as e:
+            logger.warning(f"Dropped cluster {cluster}: {e!r}")
+
+        finally:
+            if self.clusters.get(cluster) is writer:
+                del self.clusters[cluster]
+                self._ready(cluster).clear()
+
+            writer.close()
+
+    async def _route(self, writer: asyncio.StreamWriter, message: Dict[str, Any]):
+        op, data = message["op"], message["data"]
+
+        if message["id"] is None:
+            for target in list(self.clusters.values()):
+                message = {"type": "call", "id": None, "op": op, "data": data}
+                await _send(target, message)
+
+            return
+
+        results = await self.call(op, data, timeout=message["timeout"])
+        response = {"type": "response", "id": message["id"], "results": results}
+        await _send(writer, response)
+
+    async def call(
+        self,
+        op: str,
+        data: Dict[str, Any],
+        *,
+        timeout: float = IPC_TIMEOUT,
+        clusters: Optional[List[int]] = None,
+    ) -> List[Dict[str, Any]]:
+        """Runs `op` on the clusters and returns their replies in cluster order."""
+
+        loop = asyncio.get_running_loop()
+        waiting: Dict[int, Tuple[int, asyncio.Future]] = {}
+
+        for cluster, writer in list(self.clusters.items()):
+            if clusters is not None and cluster not in clusters:
+                continue
+
+            call_id = next(self._ids)
+            future = self._waiting[call_id] = loop.create_future()
+            waiting[cluster] = (call_id, future)
+
+            try:
+                message = {"type": "call", "id": call_id, "op": op, "data": data}
+                await _send(writer, message)
+
+            except ConnectionError:
+                future.cancel()
+
+        futures = [future for _, future in waiting.values()]
+        if futures:
+            await asyncio.wait(futures, timeout=timeout)
+
+        replies = []
+        for cluster, (call_id, future) in sorted(waiting.items()):
+            self._waiting.pop(call_id, None)
+
+            if future.done() and not future.cancelled():
+                reply = future.result()
+                replies.append(_reply(cluster, reply["result"], reply["error"]))
+
+            else:
+                future.cancel()
+                replies.append(_reply(cluster, error="No answer"))
+
+        return replies
@@ -0,0 +1,265 @@
+import ast
+import asyncio
+import importlib.util
+import logging
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from discord.ext import commands
+from discord.ext.commands import Context
+
+from core.cog import Cog
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Bot
+
+logger = logging.getLogger("bot")
+
+COMMAND_DECORATORS = {"command", "group", "hybrid_command", "hybrid_group"}
+
+
+class NotLazy(Exception):
+    """Raised when an extension can't be described by a manifest."""
+
+
+class CommandManifest:
+    __slots__ = ("name", "aliases", "help", "hidden", "usage", "permissions")
+
+    def __init__(self, name: str, **kwargs: Any):
+        self.name = name
+        self.aliases: List[str] = kwargs.get("aliases", [])
+        self.help: Optional[str] = kwargs.get("help")
+        self.hidden: bool = kwargs.get("hidden", False)
+        self.usage: str = kwargs.get("usage", "")
+        self.permissions: Dict[str, bool] = kwargs.get("permissions", {})
+
+
+class CogManifest:
+    __slots__ = ("name", "emoji", "description", "commands")
+
+    def __init__(self, name: str, emoji: Any, description: Optional[str]):
+        self.name = name
+        self.emoji = emoji
+        self.description = description
+        self.commands: List[CommandManifest] = []
+
+
+def _decorator_name(node: ast.expr) -> str:
+    func = node.func if isinstance(node, ast.Call) else node
+
+    if isinstance(func, ast.Attribute):
+        # `@group.command()` registers a subcommand, which the stub for its
+        # group already covers
+        owner = getattr(func.value, "id", None)
+        return func.attr if owner in ("commands", "Cog") else ""
+
+    return getattr(func, "id", "")
+
+
+def _literal_kwargs(node: ast.expr) -> Dict[str, Any]:
+    if not isinstance(node, ast.Call):
+        return {}
+
+    kwargs = {}
+    for kw in node.keywords:
+        try:
+            kwargs[kw.arg] = ast.literal_eval(kw.value)
+
+        except ValueError:
+            pass
+
+    return kwargs
+
+
+def _usage(func: ast.AsyncFunctionDef) -> str:
+    # the same shape discord.py's Command.signature gives, minus converters
+    args = func.args
+    positional = args.args[2:]  # self, ctx
+    defaults = [None] * (len(positional) - len(args.defaults)) + list(args.defaults)
+    params = [
+        f"[{arg.arg}]" if default is not None else f"<{arg.arg}>"
+        for arg, default in zip(positional, defaults)
+    ]
+
+    if args.vararg is not None:
+        params.append(f"[{args.vararg.arg}...]")
+
+    for arg, default in zip(args.kwonlyargs, args.kw_defaults):
+        params.append(f"[{arg.arg}]" if default is not None else f"<{arg.arg}>")
+
+    return " ".join(params)
+
+
+def build_manifest(extension: str) -> CogManifest:
+    """Reads an extension's source and describes its cog without importing it."""
+
+    spec = importlib.util.find_spec(extension)
+    if spec is None or spec.origin is None:
+        raise NotLazy(f"{extension} could not be found")
+
+    with open(spec.origin, encoding="utf-8") as f:
+        tree = ast.parse(f.read(), spec.origin)
+
+    cogs = [
+        node
+        for node in tree.body
+        if isinstance(node, ast.ClassDef)
+        and any(getattr(base, "id", None) == "Cog" for base in node.bases)
+    ]
+
+    if len(cogs) != 1:
+        raise NotLazy(f"{extension} must define exactly one cog")
+
+    cls = cogs[0]
+    class_kwargs = {kw.arg: kw.value for kw in cls.keywords}
+    emoji = name = None
+
+    if "emoji" in class_kwargs:
+        emoji = ast.literal_eval(class_kwargs["emoji"])
+
+    if "name" in class_kwargs:
+        name = ast.literal_eval(class_kwargs["name"])
+
+    manifest = CogManifest(name or cls.name, emoji, ast.get_docstring(cls))
+
+    for func in cls.body:
+        if not isinstance(func, ast.AsyncFunctionDef):
+            continue
+
+        names = {_decorator_name(d): d for d in func.decorator_list}
+
+        if "listener" in names:
+            # listeners have to be registered from startup
+            raise NotLazy(f"{extension} has event listeners")
+
+        decorator = next((names[n] for n in COMMAND_DECORATORS if n in names), None)
+        if decorator is None:
+            continue
+
+        kwargs = _literal_kwargs(decorator)
+        perms = names.get("has_permissions")
+
+        manifest.commands.append(
+            CommandManifest(
+                kwargs.get("name", func.name),
+                aliases=list(kwargs.get("aliases", [])),
+                help=kwargs.get("help", ast.get_docstring(func)),
+                hidden=kwargs.get("hidden", False),
+                usage=kwargs.get("usage", _usage(func)),
+                permissions=_literal_kwargs(perms) if perms is not None else {},
+            )
+        )
+
+    return manifest
+
+
+class LazyExtension:
+    """
+    Stands in for an extension until one of its commands is used.
+
+    A placeholder cog with the same name, description and commands is added
+    to the bot, so help and suggestions see it like any other cog. The
+    first invoke swaps it for the real extension and re-runs the message.
+    """
+
+    def __init__(self, bot: "Bot", name: str, manifest: CogManifest):
+        self.bot = bot
+        self.name = name
+        self.manifest = manifest
+        self.loaded = False
+        self._lock = asyncio.Lock()
+
+    def _make_stub(self, command: CommandManifest) -> commands.Command:
+        lazy = self
+
+        async def stub(self, ctx: Context):
+            await lazy.activate(ctx)
+
+        # named as a method of the placeholder cog, since discord.py only skips
+        # self and ctx for functions defined in a class
+        stub.__name__ = f"_lazy_{command.name}"
+        stub.__qualname__ = f"{self.manifest.name}.{stub.__name__}"
+
+        cmd = commands.Command(
+            stub,
+            name=command.name,
+            aliases=command.aliases,
+            help=command.help,
+            hidden=command.hidden,
+            usage=command.usage,
+        )
+
+        if command.permissions:
+            cmd = commands.has_permissions(**command.permissions)(cmd)
+
+        return cmd
+
+    def placeholder(self) -> Cog:
+        attrs: Dict[str, Any] = {
+            "__doc__": self.manifest.description,
+            "__module__": __name__,
+        }
+        for command in self.manifest.commands:
+            stub = self._make_stub(command)
+            attrs[stub.callback.__name__] = stub
+
+        cls = type(Cog)(
+            self.manifest.name,
+            (Cog,),
+            attrs,
+            emoji=self.manifest.emoji,
+            name=self.manifest.name,
+        )
+        cog = cls()
+        cog.bot = self.bot  # type: ignore
+        return cog
+
+    async def register(self):
+        await self.bot.add_cog(self.placeholder())
+
+    async def activate(self, ctx: Context):
+        async with self._lock:
+            if not self.loaded:
+                start = time.perf_counter()
+                await self.bot.remove_cog(self.manifest.name)
+
+                try:
+                    await self.bot.load_extension(self.name)
+
+                except Exception:
+                    logger.exception(f"Failed to lazily load {self.name}")
+                    await self.register()
+                    await ctx.send("This command is unavailable right now.")
+                    return
+
+                self.loaded = True
+                self.bot.dispatch("extensions_loaded")
+                elapsed = (time.perf_counter() - start) * 1000
+                logger.info(f"Lazily loaded {self.name} in {elapsed:.0f}ms")
+
+        new_ctx = await self.bot.get_context(ctx.message)
+        await self.bot.invoke(new_ctx)
+
+
+async def register_lazy(bot: "Bot", names: List[str]) -> List[str]:
+    """
+    Registers placeholders for the given extensions and returns the ones
+    that can't be lazy, which should be loaded normally.
+    """
+
+    eager = []
+
+    for name in names:
+        try:
+            manifest = build_manifest(name)
+
+        except (NotLazy, SyntaxError, ValueError) as e:
+            logger.warning(f"Loading {name} eagerly: {e}")
+            eager.append(name)
+            continue
+
+        lazy = LazyExtension(bot, name, manifest)
+        await lazy.register()
+        bot.lazy_extensions[name] = lazy  # type: ignore
+
+    return eager
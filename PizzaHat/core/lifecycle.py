@@ -0,0 +1,153 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+import time
+from typing import Awaitable, Callable, List, Optional, Set, Tuple
+
+from discord.ext import commands
+
+logger = logging.getLogger("bot")
+
+# How long shutting down may spend on work that is still in flight
+SHUTDOWN_TIMEOUT = float(os.getenv("SHUTDOWN_TIMEOUT", "30"))
+HOOK_MIN_TIME = 1.0
+
+Hook = Callable[[], Awaitable[None]]
+
+
+class ShuttingDown(commands.CheckFailure):
+    pass
+
+
+def reexec():
+    """Replaces the process with a fresh copy of itself."""
+    os.execv(sys.executable, ["python"] + sys.argv)
+
+
+class Lifecycle:
+    """
+    Shuts the bot down without dropping the work it is in the middle of.
+
+    Draining refuses new commands and waits for the running ones and any
+    tracked background tasks, with the gateway still up so those waiting on
+    a reply or a button still get it. Then it closes the gateway, waits for
+    the event handlers already running (mod-logs and the like), and runs the
+    drain hooks. It all shares one deadline, and whatever is still going
+    when that passes is logged and cut off.
+    """
+
+    def __init__(self, bot, *, timeout: float = SHUTDOWN_TIMEOUT):
+        self.bot = bot
+        self.timeout = timeout
+        self.draining = False
+        self.restarting = False
+        self.work: Set[asyncio.Task] = set()
+        self.events: Set[asyncio.Task] = set()
+        self.hooks: List[Tuple[str, Hook]] = []
+        self._drain_task: Optional[asyncio.Task] = None
+        self._closers: Set[asyncio.Task] = set()
+        self._shutdown_task: Optional[asyncio.Task] = None
+
+        bot.add_check(self.accepting)
+
+    async def accepting(self, ctx: commands.Context) -> bool:
+        if self.draining:
+            raise ShuttingDown("I'm restarting, try again in a moment.")
+
+        # commands run in the task handling their message, and are waited for
+        # once they got past this check
+        task = asyncio.current_task()
+        if task is not None and task not in self.work:
+            self.track(task)
+
+        return True
+
+    # ====== TRACKING ======
+
+    def track(self, task: asyncio.Task):
+        """Makes shutting down wait for a task, like it does for commands."""
+
+        self.work.add(task)
+        task.add_done_callback(self.work.discard)
+
+    def track_event(self, task: asyncio.Task):
+        self.events.add(task)
+        task.add_done_callback(self.events.discard)
+
+    def add_hook(self, name: str, hook: Hook):
+        """Adds something to run once in-flight work is done, like a flush."""
+        self.hooks.append((name, hook))
+
+    # ====== SHUTTING DOWN ======
+
+    def install_signal_handlers(self):
+        try:
+            loop = asyncio.get_running_loop()
+            loop.add_signal_handler(signal.SIGTERM, self.shutdown)
+
+        except NotImplementedError:
+            # no signal handlers on Windows' loop
+            pass
+
+    def shutdown(self):
+        if self._shutdown_task is None:
+            self._shutdown_task = asyncio.create_task(self.bot.close())
+
+    def restart(self):
+        """Drains and closes the bot, then __main__ starts it again."""
+
+        self.restarting = True
+        self.shutdown()
+
+    async def drain(self):
+        # a handler that closes the bot can't wait for itself to finish
+        current = asyncio.current_task()
+        if current is not None:
+            self._closers.add(current)
+
+        if self._drain_task is None:
+            self._drain_task = asyncio.create_task(self._drain())
+
+        await self._drain_task
+
+    async def _drain(self):
+        self.draining = True
+        start = time.monotonic()
+        deadline = start + self.timeout
+        logger.info("Draining, new commands are refused")
+
+        await self._wait(self.work, deadline, "commands and background tasks")
+
+        # nothing new comes in once the shards are closed
+        for shard in self.bot.shards.values():
+            await shard.disconnect()
+
+        await self._wait(self.events, deadline, "event handlers")
+
+        for name, hook in self.hooks:
+            remaining = max(deadline - time.monotonic(), HOOK_MIN_TIME)
+
+            try:
+                await asyncio.wait_for(hook(), remaining)
+
+            except asyncio.TimeoutError:
+                logger.warning(f"Drain hook {name} ran out of time")
+
+            except Exception:
+                logger.exception(f"Drain hook {name} failed")
+
+        logger.info(f"Drained in {time.monotonic() - start:.1f}s")
+
+    async def _wait(self, tasks: Set[asyncio.Task], deadline: float, what: str):
+        # looped, work can start more work while it finishes
+        while pending := {t for t in tasks - self._closers if not t.done()}:
+            remaining = deadline - time.monotonic()
+
+            if remaining <= 0:
+                names = ", ".join(sorted(t.get_name() for t in pending)[:10])
+                logger.warning(f"Cut off {len(pending)} {what}: {names}")
+                return
+
+            await asyncio.wait(pending, timeout=remaining)
@@ -0,0 +1,139 @@
+import asyncio
+import importlib
+import time
+import traceback
+from typing import TYPE_CHECKING, Dict, Iterable, List, Optional
+
+from utils.formats import TabularData
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Bot
+
+# Extensions that must finish setting up before the listed extension loads.
+EXTENSION_DEPENDENCIES: Dict[str, List[str]] = {
+    "cogs.admin": ["cogs.tickets"],  # re-registers the persistent TicketView
+    "cogs.emojis": ["cogs.utility"],
+}
+
+
+class ExtensionTiming:
+    __slots__ = ("name", "import_time", "setup_time", "error")
+
+    def __init__(self, name: str):
+        self.name = name
+        self.import_time = 0.0
+        self.setup_time = 0.0
+        self.error: Optional[BaseException] = None
+
+    @property
+    def ok(self) -> bool:
+        return self.error is None
+
+
+def load_order(
+    names: Iterable[str], dependencies: Dict[str, List[str]] = EXTENSION_DEPENDENCIES
+) -> List[List[str]]:
+    """
+    Groups extensions into waves, where everything in a wave only depends
+    on extensions from earlier waves. Dependencies outside `names` are ignored.
+    """
+
+    pending = list(dict.fromkeys(names))
+    done: set = set()
+    waves: List[List[str]] = []
+
+    while pending:
+        wave = [
+            name
+            for name in pending
+            if all(
+                dep in done or dep not in pending
+                for dep in dependencies.get(name, [])
+            )
+        ]
+
+        if not wave:
+            raise RuntimeError(f"Circular extension dependencies: {pending}")
+
+        waves.append(wave)
+        done.update(wave)
+        pending = [name for name in pending if name not in done]
+
+    return waves
+
+
+class ExtensionLoader:
+    """
+    Loads extensions in two phases. Every module is imported up front in
+    worker threads, where the heavy third party imports happen, then the
+    extensions are set up concurrently one dependency wave at a time.
+    """
+
+    def __init__(self, bot: "Bot", names: Iterable[str]):
+        self.bot = bot
+        self.names = list(names)
+        self.timings: Dict[str, ExtensionTiming] = {
+            name: ExtensionTiming(name) for name in self.names
+        }
+
+    async def _import(self, name: str):
+        timing = self.timings[name]
+        start = time.perf_counter()
+
+        try:
+            await asyncio.to_thread(importlib.import_module, name)
+
+        except Exception as e:
+            timing.error = e
+
+        timing.import_time = time.perf_counter() - start
+
+    async def _setup(self, name: str):
+        timing = self.timings[name]
+
+        if not timing.ok:
+            return
+
+        start = time.perf_counter()
+
+        try:
+            # discord.py re-executes the module itself, which is cheap now
+            # that its dependencies are already in sys.modules
+            await self.bot.load_extension(name)
+
+        except Exception as e:
+            timing.error = e
+            print(f"Failed to load extension: {name}")
+            print("".join(traceback.format_exception(e, e, e.__traceback__)))  # type: ignore
+
+        timing.setup_time = time.perf_counter() - start
+
+    async def load(self) -> List[ExtensionTiming]:
+        await asyncio.gather(*(self._import(name) for name in self.names))
+
+        for name, timing in self.timings.items():
+            if timing.error is not None:
+                e = timing.error
+                print(f"Failed to import extension: {name}")
+                print("".join(traceback.format_exception(e, e, e.__traceback__)))  # type: ignore
+
+        for wave in load_order(self.names):
+            await asyncio.gather(*(self._setup(name) for name in wave))
+
+        return list(self.timings.values())
+
+    def profile(self) -> str:
+        table = TabularData()
+        table.set_columns(["Extension", "Import", "Setup", "Status"])
+        table.add_rows(
+            [
+                t.name,
+                f"{t.import_time * 1000:.0f}ms",
+                f"{t.setup_time * 1000:.0f}ms",
+                "ok" if t.ok else "failed",
+            ]
+            for t in sorted(
+                self.timings.values(), key=lambda t: -(t.import_time + t.setup_time)
+            )
+        )
+        return table.render()
@@ -0,0 +1,217 @@
+import os
+import sys
+from collections import deque
+from typing import TYPE_CHECKING, Deque, Dict, Optional
+
+import discord
+
+from core.metrics import Gauge, Metrics
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Bot
+
+PER_GUILD = int(os.getenv("MESSAGE_STORE_PER_GUILD", "5000"))
+BUDGET = int(float(os.getenv("MESSAGE_STORE_BUDGET_MB", "64")) * 1024**2)
+
+
+class CachedMessage:
+    __slots__ = ("id", "author_id", "channel_id", "content", "created_at")
+
+    def __init__(
+        self,
+        id: int,
+        author_id: int,
+        channel_id: int,
+        content: str,
+        created_at: float,
+    ):
+        self.id = id
+        self.author_id = author_id
+        self.channel_id = channel_id
+        self.content = content
+        self.created_at = created_at
+
+    @classmethod
+    def from_message(cls, message: discord.Message) -> "CachedMessage":
+        return cls(
+            message.id,
+            message.author.id,
+            message.channel.id,
+            message.content,
+            message.created_at.timestamp(),
+        )
+
+    @property
+    def size(self) -> int:
+        return RECORD_SIZE + sys.getsizeof(self.content)
+
+
+# the record, its four numbers, and its slots in the deque and the index
+RECORD_SIZE = (
+    sys.getsizeof(CachedMessage(0, 0, 0, "", 0.0))
+    + 3 * sys.getsizeof(2**62)
+    + sys.getsizeof(0.0)
+    + 8
+    + 100
+)
+
+
+class GuildMessages:
+    """A ring buffer of one guild's most recent messages, indexed by id."""
+
+    __slots__ = ("messages", "index", "size")
+
+    def __init__(self, limit: int):
+        self.messages: Deque[CachedMessage] = deque(maxlen=limit)
+        self.index: Dict[int, CachedMessage] = {}
+        self.size = 0
+
+    def __len__(self) -> int:
+        return len(self.index)
+
+    def append(self, record: CachedMessage) -> int:
+        freed = 0
+
+        if len(self.messages) == self.messages.maxlen:
+            freed = self._forget(self.messages[0])
+
+        self.messages.append(record)
+        self.index[record.id] = record
+        self.size += record.size
+        return freed
+
+    def _forget(self, record: CachedMessage) -> int:
+        # deleted records stay in the deque until they reach the front
+        if self.index.get(record.id) is record:
+            del self.index[record.id]
+            self.size -= record.size
+            return record.size
+
+        return 0
+
+    def evict(self) -> int:
+        if not self.messages:
+            return 0
+
+        return self._forget(self.messages.popleft())
+
+    def pop(self, message_id: int) -> Optional[CachedMessage]:
+        record = self.index.pop(message_id, None)
+
+        if record is not None:
+            self.size -= record.size
+
+        return record
+
+
+class MessageStore:
+    """
+    Recent guild messages kept for the mod-logs and automod.
+
+    discord.py's own message cache is global, so on a busy bot it covers a
+    few seconds of traffic. This keeps up to `PER_GUILD` messages for every
+    guild, trimming the guilds with the most stored when the whole store
+    goes over `BUDGET` bytes. Only what the logs need is kept, and messages
+    from bots are skipped.
+    """
+
+    def __init__(
+        self, bot: "Bot", *, per_guild: int = PER_GUILD, budget: int = BUDGET
+    ):
+        self.bot = bot
+        self.per_guild = per_guild
+        self.budget = budget
+        self.guilds: Dict[int, GuildMessages] = {}
+        self.size = 0
+
+        for event in ("on_message", "on_guild_remove"):
+            bot.add_listener(getattr(self, event), event)
+
+    def __len__(self) -> int:
+        return sum(len(g) for g in self.guilds.values())
+
+    # ====== READING ======
+
+    def get(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        guild = self.guilds.get(guild_id)
+        return guild.index.get(message_id) if guild else None
+
+    def pop(self, guild_id: int, message_id: int) -> Optional[CachedMessage]:
+        guild = self.guilds.get(guild_id)
+        if guild is None:
+            return None
+
+        record = guild.pop(message_id)
+        if record is not None:
+            self.size -= record.size
+
+        return record
+
+    def edit(self, guild_id: int, message_id: int, content: str) -> Optional[str]:
+        """Updates a stored message and returns what it said before."""
+
+        record = self.get(guild_id, message_id)
+        if record is None:
+            return None
+
+        before = record.content
+        change = sys.getsizeof(content) - sys.getsizeof(before)
+
+        record.content = content
+        self.guilds[guild_id].size += change
+        self.size += change
+        return before
+
+    # ====== BOOKKEEPING ======
+
+    def add(self, message: discord.Message):
+        if message.guild is None or message.author.bot:
+            return
+
+        guild = self.guilds.get(message.guild.id)
+        if guild is None:
+            guild = self.guilds[message.guild.id] = GuildMessages(self.per_guild)
+
+        record = CachedMessage.from_message(message)
+        self.size += record.size - guild.append(record)
+
+        if self.size > self.budget:
+            self._trim()
+
+    def _trim(self):
+        # trim in one go to well under the budget, so the busiest guild isn't
+        # looked for again on every message
+        target = self.budget * 0.9
+
+        while self.size > target:
+            busiest = max(self.guilds.values(), key=len)
+            if not busiest:
+                break
+
+            for _ in range(max(1, len(busiest) // 10)):
+                self.size -= busiest.evict()
+
+    async def on_message(self, message: discord.Message):
+        self.add(message)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        removed = self.guilds.pop(guild.id, None)
+
+        if removed is not None:
+            self.size -= removed.size
+
+    def add_metrics(self, metrics: Metrics):
+        metrics.add(
+            Gauge(
+                "pizzahat_message_store_messages",
+                "Messages held for the mod-logs.",
+                lambda: len(self),
+            )
+        )
+        metrics.add(
+            Gauge(
+                "pizzahat_message_store_bytes",
+                "Estimated memory held by the message store.",
+                lambda: self.size,
+            )
+        )
@@ -0,0 +1,349 @@
+import contextvars
+import functools
+import logging
+import os
+import time
+from collections import defaultdict
+from types import SimpleNamespace
+from typing import Any, Callable, Dict, List, Optional, Sequence, Tuple
+
+import aiohttp
+from aiohttp import web
+from discord.ext import commands
+
+logger = logging.getLogger("bot")
+
+METRICS_HOST = os.getenv("METRICS_HOST", "127.0.0.1")
+METRICS_PORT = int(os.getenv("METRICS_PORT", "9100"))  # 0 turns the endpoint off
+
+DEFAULT_BUCKETS = (0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0, 10.0)
+
+Labels = Tuple[str, ...]
+
+
+def _escape(value: str) -> str:
+    return value.replace("\\", "\\\\").replace("\n", "\\n").replace('"', '\\"')
+
+
+def _format_labels(names: Sequence[str], values: Sequence[str]) -> str:
+    if not names:
+        return ""
+
+    pairs = ",".join(f'{n}="{_escape(str(v))}"' for n, v in zip(names, values))
+    return "{" + pairs + "}"
+
+
+# ====== METRIC TYPES ======
+
+
+class Counter:
+    kind = "counter"
+
+    def __init__(self, name: str, doc: str, labels: Sequence[str] = ()):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.values: Dict[Labels, float] = defaultdict(float)
+
+    def inc(self, *labels: str, amount: float = 1):
+        self.values[labels] += amount
+
+    def samples(self) -> List[str]:
+        return [
+            f"{self.name}{_format_labels(self.labels, k)} {v}"
+            for k, v in self.values.items()
+        ]
+
+
+class Gauge:
+    """
+    A value read from a callback each time the metrics are scraped. With
+    labels, the callback returns a value for each label set instead.
+    """
+
+    kind = "gauge"
+
+    def __init__(
+        self, name: str, doc: str, read: Callable[[], Any], labels: Sequence[str] = ()
+    ):
+        self.name = name
+        self.doc = doc
+        self.read = read
+        self.labels = tuple(labels)
+
+    def samples(self) -> List[str]:
+        if not self.labels:
+            return [f"{self.name} {self.read()}"]
+
+        return [
+            f"{self.name}{_format_labels(self.labels, k)} {v}"
+            for k, v in self.read().items()
+        ]
+
+
+class Histogram:
+    kind = "histogram"
+
+    def __init__(
+        self,
+        name: str,
+        doc: str,
+        labels: Sequence[str] = (),
+        buckets: Sequence[float] = DEFAULT_BUCKETS,
+    ):
+        self.name = name
+        self.doc = doc
+        self.labels = tuple(labels)
+        self.buckets = tuple(buckets)
+        # per label set: bucket counts, then sum and count
+        self.values: Dict[Labels, List[float]] = {}
+
+    def observe(self, value: float, *labels: str):
+        series = self.values.get(labels)
+
+        if series is None:
+            series = self.values[labels] = [0.0] * (len(self.buckets) + 2)
+
+        for i, bound in enumerate(self.buckets):
+            if value <= bound:
+                series[i] += 1
+
+        series[-2] += value
+        series[-1] += 1
+
+    def samples(self) -> List[str]:
+        lines = []
+        names = self.labels + ("le",)
+
+        for labels, series in self.values.items():
+            for bound, count in zip(self.buckets, series):
+                le = _format_labels(names, labels + (str(bound),))
+                lines.append(f"{self.name}_bucket{le} {count:.0f}")
+
+            le = _format_labels(names, labels + ("+Inf",))
+            lines.append(f"{self.name}_bucket{le} {series[-1]:.0f}")
+
+            own = _format_labels(self.labels, labels)
+            lines.append(f"{self.name}_sum{own} {series[-2]}")
+            lines.append(f"{self.name}_count{own} {series[-1]:.0f}")
+
+        return lines
+
+
+# ====== REGISTRY ======
+
+
+class Scope:
+    """What the current task is running on behalf of."""
+
+    __slots__ = ("kind", "name", "start")
+
+    def __init__(self, kind: str, name: str):
+        self.kind = kind
+        self.name = name
+        self.start = time.perf_counter()
+
+
+current_scope: contextvars.ContextVar[Optional[Scope]] = contextvars.ContextVar(
+    "current_scope", default=None
+)
+
+
+def _scope_labels() -> Labels:
+    scope = current_scope.get()
+    return (scope.kind, scope.name) if scope else ("background", "")
+
+
+class Metrics:
+    """
+    Command, listener, database and HTTP metrics for the whole bot.
+
+    Commands are timed from the bot's before/after invoke hooks and listeners
+    by wrapping them as they are added. Both set `current_scope`, so database
+    queries and HTTP calls made underneath get counted against them.
+    """
+
+    def __init__(self):
+        self.metrics: List = []
+        self._listeners: Dict[Callable, Callable] = {}
+        self._runner: Optional[web.AppRunner] = None
+
+        self.command_duration = self.add(
+            Histogram(
+                "pizzahat_command_duration_seconds",
+                "Time spent running commands.",
+                ["command"],
+            )
+        )
+        self.command_errors = self.add(
+            Counter(
+                "pizzahat_command_errors_total",
+                "Commands that raised, by error type.",
+                ["command", "error"],
+            )
+        )
+        self.listener_duration = self.add(
+            Histogram(
+                "pizzahat_listener_duration_seconds",
+                "Time spent in event listeners.",
+                ["event", "listener"],
+            )
+        )
+        self.listener_errors = self.add(
+            Counter(
+                "pizzahat_listener_errors_total",
+                "Event listeners that raised.",
+                ["event", "listener"],
+            )
+        )
+        self.db_queries = self.add(
+            Counter(
+                "pizzahat_db_queries_total",
+                "Database queries, by the command or listener that ran them.",
+                ["kind", "name"],
+            )
+        )
+        self.db_duration = self.add(
+            Histogram(
+                "pizzahat_db_query_duration_seconds", "Database query latency."
+            )
+        )
+        self.http_requests = self.add(
+            Counter(
+                "pizzahat_http_requests_total",
+                "Outgoing HTTP requests, by the command or listener that made them.",
+                ["kind", "name", "host"],
+            )
+        )
+        self.http_duration = self.add(
+            Histogram(
+                "pizzahat_http_request_duration_seconds",
+                "Outgoing HTTP request latency.",
+                ["host"],
+            )
+        )
+
+    def add(self, metric):
+        self.metrics.append(metric)
+        return metric
+
+    def render(self) -> str:
+        lines = []
+
+        for metric in self.metrics:
+            lines.append(f"# HELP {metric.name} {metric.doc}")
+            lines.append(f"# TYPE {metric.name} {metric.kind}")
+            lines.extend(metric.samples())
+
+        return "\n".join(lines) + "\n"
+
+    # ====== COMMANDS ======
+
+    async def before_invoke(self, ctx: commands.Context):
+        if ctx.command is not None:
+            current_scope.set(Scope("command", ctx.command.qualified_name))
+
+    async def after_invoke(self, ctx: commands.Context):
+        scope = current_scope.get()
+
+        if scope is not None and scope.kind == "command":
+            elapsed = time.perf_counter() - scope.start
+            self.command_duration.observe(elapsed, scope.name)
+            current_scope.set(None)
+
+    async def on_command_error(self, ctx: commands.Context, error: Exception):
+        if ctx.command is not None:
+            if isinstance(error, commands.CommandInvokeError):
+                error = error.original
+
+            name = ctx.command.qualified_name
+            self.command_errors.inc(name, type(error).__name__)
+
+    # ====== LISTENERS ======
+
+    def wrap_listener(self, func: Callable, event: str) -> Callable:
+        wrapped = self._listeners.get(func)
+        if wrapped is not None:
+            return wrapped
+
+        listener = getattr(func, "__qualname__", repr(func))
+
+        @functools.wraps(func)
+        async def timed(*args, **kwargs):
+            current_scope.set(Scope("listener", listener))
+            start = time.perf_counter()
+
+            try:
+                return await func(*args, **kwargs)
+
+            except Exception:
+                self.listener_errors.inc(event, listener)
+                raise
+
+            finally:
+                elapsed = time.perf_counter() - start
+                self.listener_duration.observe(elapsed, event, listener)
+
+        self._listeners[func] = timed
+        return timed
+
+    def unwrap_listener(self, func: Callable) -> Callable:
+        return self._listeners.pop(func, func)
+
+    # ====== DATABASE ======
+
+    def on_query(self, record):
+        self.db_queries.inc(*_scope_labels())
+        self.db_duration.observe(record.elapsed)
+
+    async def init_connection(self, conn):
+        conn.add_query_logger(self.on_query)
+
+    # ====== HTTP ======
+
+    def http_trace(self) -> aiohttp.TraceConfig:
+        async def on_start(session, ctx: SimpleNamespace, params):
+            ctx.metrics_start = time.perf_counter()
+
+        async def on_end(session, ctx: SimpleNamespace, params):
+            host = params.url.host or "unknown"
+            self.http_requests.inc(*_scope_labels(), host)
+            self.http_duration.observe(time.perf_counter() - ctx.metrics_start, host)
+
+        trace = aiohttp.TraceConfig()
+        trace.on_request_start.append(on_start)
+        trace.on_request_end.append(on_end)
+        trace.on_request_exception.append(on_end)
+        return trace
+
+    # ====== ENDPOINT ======
+
+    async def handle_metrics(self, request: web.Request) -> web.Response:
+        return web.Response(
+            text=self.render(), content_type="text/plain", charset="utf-8"
+        )
+
+    async def start(self, host: str = METRICS_HOST, port: int = METRICS_PORT):
+        if not port:
+            return
+
+        app = web.Application()
+        app.router.add_get("/metrics", self.handle_metrics)
+
+        self._runner = web.AppRunner(app, access_log=None)
+        await self._runner.setup()
+
+        try:
+            await web.TCPSite(self._runner, host, port).start()
+
+        except OSError as e:
+            logger.warning(f"Could not serve metrics on {host}:{port}: {e}")
+            await self.stop()
+            return
+
+        logger.info(f"Serving metrics on http://{host}:{port}/metrics")
+
+    async def stop(self):
+        if self._runner is not None:
+            await self._runner.cleanup()
+            self._runner = None
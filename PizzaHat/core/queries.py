@@ -0,0 +1,280 @@
+import asyncio
+import logging
+import os
+import time
+from typing import Any, List, Optional
+
+import asyncpg  # type: ignore
+
+from core.database import CONNECTION_ERRORS
+from core.snapshot import SNAPSHOT_PATH, Snapshot
+
+logger = logging.getLogger("bot")
+
+# How often the local snapshot is refreshed from Postgres, and how long a
+# config read may take before the snapshot answers it instead.
+SNAPSHOT_INTERVAL = float(os.getenv("DB_SNAPSHOT_INTERVAL", "300"))
+FALLBACK_TIMEOUT = float(os.getenv("DB_FALLBACK_TIMEOUT", "2"))
+JOURNAL_RETRY = 5.0
+
+SCHEMA = {
+    "warnlogs": """CREATE TABLE IF NOT EXISTS warnlogs
+    (guild_id BIGINT, user_id BIGINT, warns TEXT[], time NUMERIC[])""",
+    "modlogs": """CREATE TABLE IF NOT EXISTS modlogs
+    (guild_id BIGINT PRIMARY KEY, channel_id BIGINT)""",
+    "automod": """CREATE TABLE IF NOT EXISTS automod
+    (guild_id BIGINT PRIMARY KEY, enabled BOOL)""",
+    "staff_role": """CREATE TABLE IF NOT EXISTS staff_role
+    (guild_id BIGINT PRIMARY KEY, role_id BIGINT)""",
+    "tags": """CREATE TABLE IF NOT EXISTS tags
+    (guild_id BIGINT, tag_name TEXT, content TEXT, creator BIGINT)""",
+}
+
+# The guild config the bot needs to keep moderating without Postgres
+SNAPSHOT_TABLES = ["modlogs", "automod", "staff_role", "tags"]
+
+# ====== STATEMENTS ======
+
+# Each is prepared once per connection, on first use, by asyncpg's statement
+# cache. Keeping the text identical everywhere is what lets the cache hit.
+
+# The config writes are safe to run twice: a write that timed out may have
+# committed anyway, and it gets replayed from the journal all the same.
+
+MODLOG_CHANNEL = "SELECT channel_id FROM modlogs WHERE guild_id=$1"
+SET_MODLOG_CHANNEL = """INSERT INTO modlogs (guild_id, channel_id) VALUES ($1, $2)
+ON CONFLICT (guild_id) DO UPDATE SET channel_id=$2"""
+DELETE_MODLOG = "DELETE FROM modlogs WHERE guild_id=$1"
+
+STAFF_ROLE = "SELECT role_id FROM staff_role WHERE guild_id=$1"
+SET_STAFF_ROLE = """INSERT INTO staff_role (guild_id, role_id) VALUES ($1, $2)
+ON CONFLICT (guild_id) DO UPDATE SET role_id=$2"""
+
+AUTOMOD_ENABLED = "SELECT enabled FROM automod WHERE guild_id=$1"
+ENABLE_AUTOMOD = """INSERT INTO automod (guild_id, enabled) VALUES ($1, TRUE)
+ON CONFLICT (guild_id) DO UPDATE SET enabled=TRUE"""
+
+TAG = "SELECT tag_name, content, creator FROM tags WHERE guild_id=$1 AND tag_name=$2"
+TAG_NAMES = "SELECT tag_name FROM tags WHERE guild_id=$1"
+CREATE_TAG = """INSERT INTO tags (guild_id, tag_name, content, creator)
+SELECT $1, $2, $3, $4
+WHERE NOT EXISTS (SELECT 1 FROM tags WHERE guild_id=$1 AND tag_name=$2)"""
+EDIT_TAG = "UPDATE tags SET content=$3 WHERE guild_id=$1 AND tag_name=$2"
+DELETE_TAG = "DELETE FROM tags WHERE guild_id=$1 AND tag_name=$2"
+
+WARNLOG = """SELECT guild_id, user_id, warns, time FROM warnlogs
+WHERE guild_id=$1 AND user_id=$2"""
+CREATE_WARNLOG = """INSERT INTO warnlogs (guild_id, user_id, warns, time)
+VALUES ($1, $2, $3, $4)"""
+UPDATE_WARNLOG = """UPDATE warnlogs SET warns=$3, time=$4
+WHERE guild_id=$1 AND user_id=$2"""
+DELETE_WARNLOG = "DELETE FROM warnlogs WHERE guild_id=$1 AND user_id=$2"
+
+async def create_tables(pool):
+    for table in SCHEMA.values():
+        await pool.execute(table)
+
+
+def _affected(status: str) -> int:
+    # command tags look like "DELETE 1" or "UPDATE 0"
+    last = status.rsplit(" ", 1)[-1]
+    return int(last) if last.isdigit() else 0
+
+
+class Queries:
+    """
+    Typed access to the statements above.
+
+    Goes through `bot.db` on every call rather than holding the pool, so it
+    can be created before the pool exists and keeps working if the pool is
+    swapped out.
+
+    With a snapshot, guild config keeps working through a database incident:
+    reads fall back to the snapshot when Postgres is down or too slow, and
+    writes go into the snapshot's journal to be replayed once it is back.
+    """
+
+    def __init__(self, bot):
+        self.bot = bot
+        self.snapshot: Optional[Snapshot] = None
+        self.refreshed = 0.0
+        self._sync_task: Optional[asyncio.Task] = None
+        self._journalled = asyncio.Event()
+
+    @property
+    def pool(self) -> Any:
+        return self.bot.db
+
+    @property
+    def degraded(self) -> bool:
+        return not getattr(self.pool, "healthy", True)
+
+    async def _read(self, method: str, query: str, *args: Any) -> Any:
+        if self.snapshot is None:
+            return await getattr(self.pool, method)(query, *args)
+
+        if not self.degraded:
+            try:
+                # asyncpg's own timeouts, for the acquire and the query, since
+                # wait_for would cost a task per read
+                return await getattr(self.pool, method)(
+                    query, *args, timeout=FALLBACK_TIMEOUT
+                )
+
+            except CONNECTION_ERRORS as e:
+                logger.warning(f"Reading from the snapshot, Postgres failed: {e!r}")
+
+        return await self.snapshot.fetch(method, query, *args)
+
+    async def _write(self, query: str, *args: Any) -> str:
+        if self.snapshot is None:
+            return await self.pool.execute(query, *args)
+
+        # behind writes still in the journal, so replaying can't reorder them
+        if not self.degraded and not self._journalled.is_set():
+            try:
+                status = await self.pool.execute(
+                    query, *args, timeout=FALLBACK_TIMEOUT
+                )
+
+            except CONNECTION_ERRORS as e:
+                logger.warning(f"Journalling a write, Postgres failed: {e!r}")
+
+            else:
+                await self.snapshot.apply(query, *args)
+                return status
+
+        status = await self.snapshot.record(query, *args)
+        self._journalled.set()
+        return status
+
+    # ====== SNAPSHOT ======
+
+    def start_sync(self, path: str = SNAPSHOT_PATH):
+        if not path or self._sync_task is not None:
+            return
+
+        self.snapshot = Snapshot(path, {t: SCHEMA[t] for t in SNAPSHOT_TABLES})
+        # the journal may hold writes from the last run, until a sync says not
+        self._journalled.set()
+        self._sync_task = asyncio.create_task(self._sync())
+
+    def stop_sync(self):
+        if self._sync_task is not None:
+            self._sync_task.cancel()
+            self._sync_task = None
+
+        if self.snapshot is not None:
+            self.snapshot.close()
+            self.snapshot = None
+
+    async def sync(self):
+        """Replays the journal, then refreshes the snapshot once it is empty."""
+
+        assert self.snapshot is not None
+
+        if await self.snapshot.pending():
+            replayed = await self.snapshot.replay(self.pool, CONNECTION_ERRORS)
+            if replayed:
+                logger.info(f"Replayed {replayed} journalled writes to Postgres")
+
+        if not await self.snapshot.pending():
+            await self.snapshot.refresh(self.pool)
+            self.refreshed = time.time()
+
+    async def flush(self):
+        """Replays the journal, if Postgres can take it, before shutting down."""
+
+        if self.snapshot is None or self.degraded:
+            return
+
+        if await self.snapshot.pending():
+            replayed = await self.snapshot.replay(self.pool, CONNECTION_ERRORS)
+            logger.info(f"Replayed {replayed} journalled writes to Postgres")
+
+    async def _sync(self):
+        assert self.snapshot is not None
+
+        while True:
+            if not self.degraded:
+                try:
+                    await self.sync()
+
+                except CONNECTION_ERRORS as e:
+                    logger.warning(f"Could not sync the snapshot: {e!r}")
+
+            # writes waiting in the journal shouldn't sit there for long
+            if await self.snapshot.pending():
+                await asyncio.sleep(JOURNAL_RETRY)
+                continue
+
+            self._journalled.clear()
+            try:
+                await asyncio.wait_for(self._journalled.wait(), SNAPSHOT_INTERVAL)
+
+            except asyncio.TimeoutError:
+                pass
+
+    # ====== MOD LOGS ======
+
+    async def modlog_channel(self, guild_id: int) -> Optional[int]:
+        return await self._read("fetchval", MODLOG_CHANNEL, guild_id)
+
+    async def set_modlog_channel(self, guild_id: int, channel_id: int):
+        await self._write(SET_MODLOG_CHANNEL, guild_id, channel_id)
+
+    async def delete_modlog(self, guild_id: int):
+        await self._write(DELETE_MODLOG, guild_id)
+
+    # ====== STAFF ROLE ======
+
+    async def staff_role(self, guild_id: int) -> Optional[int]:
+        return await self._read("fetchval", STAFF_ROLE, guild_id)
+
+    async def set_staff_role(self, guild_id: int, role_id: int):
+        await self._write(SET_STAFF_ROLE, guild_id, role_id)
+
+    # ====== AUTOMOD ======
+
+    async def automod_enabled(self, guild_id: int) -> Optional[bool]:
+        return await self._read("fetchval", AUTOMOD_ENABLED, guild_id)
+
+    async def enable_automod(self, guild_id: int):
+        await self._write(ENABLE_AUTOMOD, guild_id)
+
+    # ====== TAGS ======
+
+    async def tag(self, guild_id: int, name: str) -> Optional[asyncpg.Record]:
+        return await self._read("fetchrow", TAG, guild_id, name)
+
+    async def tag_names(self, guild_id: int) -> List[str]:
+        return [row[0] for row in await self._read("fetch", TAG_NAMES, guild_id)]
+
+    async def create_tag(self, guild_id: int, name: str, content: str, creator: int):
+        await self._write(CREATE_TAG, guild_id, name, content, creator)
+
+    async def edit_tag(self, guild_id: int, name: str, content: str) -> bool:
+        status = await self._write(EDIT_TAG, guild_id, name, content)
+        return _affected(status) > 0
+
+    async def delete_tag(self, guild_id: int, name: str) -> bool:
+        status = await self._write(DELETE_TAG, guild_id, name)
+        return _affected(status) > 0
+
+    # ====== WARN LOGS ======
+
+    async def warnlog(self, guild_id: int, user_id: int) -> Optional[asyncpg.Record]:
+        return await self.pool.fetchrow(WARNLOG, guild_id, user_id)
+
+    async def create_warnlog(
+        self, guild_id: int, user_id: int, warns: List[str], times: List[float]
+    ):
+        await self.pool.execute(CREATE_WARNLOG, guild_id, user_id, warns, times)
+
+    async def update_warnlog(
+        self, guild_id: int, user_id: int, warns: List[str], times: List[float]
+    ):
+        await self.pool.execute(UPDATE_WARNLOG, guild_id, user_id, warns, times)
+
+    async def delete_warnlog(self, guild_id: int, user_id: int):
+        await self.pool.execute(DELETE_WARNLOG, guild_id, user_id)
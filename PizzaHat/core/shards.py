@@ -0,0 +1,170 @@
+import logging
+import math
+import os
+import time
+from typing import TYPE_CHECKING, Any, Dict, List, Optional
+
+from core.metrics import Counter, Gauge, Metrics
+
+if TYPE_CHECKING:
+    from discord.ext.commands import AutoShardedBot
+
+logger = logging.getLogger("bot")
+
+
+def parse_shard_ids(value: str) -> Optional[List[int]]:
+    """Reads shard ids written like "0-3,8,10-11"."""
+
+    ids = set()
+    for part in filter(None, (p.strip() for p in value.split(","))):
+        start, _, end = part.partition("-")
+        ids.update(range(int(start), int(end or start) + 1))
+
+    return sorted(ids) or None
+
+
+# Unset, Discord's recommended shard count is used and every shard runs in
+# this process. SHARD_IDS picks some of SHARD_COUNT's shards, to spread them
+# over several processes.
+SHARD_COUNT = int(os.getenv("SHARD_COUNT", "0")) or None
+SHARD_IDS = parse_shard_ids(os.getenv("SHARD_IDS", ""))
+
+
+def shard_config(
+    count: Optional[int] = SHARD_COUNT, ids: Optional[List[int]] = SHARD_IDS
+) -> Dict[str, Any]:
+    if ids is not None:
+        if count is None:
+            raise ValueError("SHARD_IDS needs SHARD_COUNT to be set")
+
+        if ids[-1] >= count:
+            raise ValueError(f"SHARD_IDS go past SHARD_COUNT ({count})")
+
+    return {"shard_count": count, "shard_ids": ids}
+
+
+class ShardState:
+    __slots__ = ("id", "connected", "ready", "since", "disconnects")
+
+    def __init__(self, shard_id: int):
+        self.id = shard_id
+        self.connected = False
+        self.ready = False
+        self.since = time.time()
+        self.disconnects = 0
+
+    @property
+    def status(self) -> str:
+        if not self.connected:
+            return "disconnected"
+
+        return "ready" if self.ready else "starting"
+
+    def _set(self, connected: bool, ready: bool):
+        if (connected, ready) != (self.connected, self.ready):
+            self.since = time.time()
+
+        self.connected = connected
+        self.ready = ready
+
+
+class ShardTracker:
+    """
+    Follows each shard's gateway connection, so commands and the metrics can
+    tell which shards are up, since when, and how far behind they are.
+    """
+
+    def __init__(self, bot: "AutoShardedBot"):
+        self.bot = bot
+        self.shards: Dict[int, ShardState] = {}
+        self.disconnects = Counter(
+            "pizzahat_shard_disconnects_total",
+            "Gateway disconnects, by shard.",
+            ["shard"],
+        )
+
+        for event in (
+            "on_shard_connect",
+            "on_shard_disconnect",
+            "on_shard_ready",
+            "on_shard_resumed",
+        ):
+            bot.add_listener(getattr(self, event), event)
+
+    # ====== READING ======
+
+    @property
+    def shard_ids(self) -> List[int]:
+        return sorted(self.bot.shards)
+
+    def get(self, shard_id: int) -> ShardState:
+        state = self.shards.get(shard_id)
+
+        if state is None:
+            state = self.shards[shard_id] = ShardState(shard_id)
+
+        return state
+
+    def latency(self, shard_id: int) -> Optional[float]:
+        """The shard's heartbeat latency, or None while it has none."""
+
+        shard = self.bot.get_shard(shard_id)
+        if shard is None or shard.is_closed():
+            return None
+
+        latency = shard.latency
+        return latency if math.isfinite(latency) else None
+
+    def latencies(self) -> Dict[int, Optional[float]]:
+        return {shard_id: self.latency(shard_id) for shard_id in self.shard_ids}
+
+    # ====== EVENTS ======
+
+    async def on_shard_connect(self, shard_id: int):
+        # a new session, the shard's guilds are streaming in
+        self.get(shard_id)._set(True, False)
+
+    async def on_shard_ready(self, shard_id: int):
+        self.get(shard_id)._set(True, True)
+        logger.info(f"Shard {shard_id} is ready")
+
+    async def on_shard_resumed(self, shard_id: int):
+        # the session carried on, so did whatever state it was in
+        state = self.get(shard_id)
+        state._set(True, state.ready)
+
+    async def on_shard_disconnect(self, shard_id: int):
+        state = self.get(shard_id)
+        state.disconnects += 1
+        self.disconnects.inc(str(shard_id))
+
+        if state.connected:
+            logger.warning(f"Shard {shard_id} disconnected")
+
+        state._set(False, state.ready)
+
+    def add_metrics(self, metrics: Metrics):
+        metrics.add(
+            Gauge(
+                "pizzahat_gateway_latency_seconds",
+                "Heartbeat latency to the gateway, by shard.",
+                lambda: {
+                    (str(i),): latency
+                    for i, latency in self.latencies().items()
+                    if latency is not None
+                },
+                ["shard"],
+            )
+        )
+        metrics.add(
+            Gauge(
+                "pizzahat_shard_up",
+                "Whether the shard is connected and has all its guilds.",
+                lambda: {
+                    (str(i),): int(self.get(i).status == "ready")
+                    for i in self.shard_ids
+                },
+                ["shard"],
+            )
+        )
+        metrics.add(self.disconnects)
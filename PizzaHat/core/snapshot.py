@@ -0,0 +1,179 @@
+import asyncio
+import functools
+import json
+import logging
+import os
+import re
+import sqlite3
+from typing import Any, Dict, List, Optional, Sequence, Tuple
+
+logger = logging.getLogger("bot")
+
+SNAPSHOT_PATH = os.getenv("DB_SNAPSHOT_PATH", "snapshot.sqlite3")  # "" turns it off
+
+_PARAM = re.compile(r"\$(\d+)")
+
+
+@functools.lru_cache(maxsize=None)
+def to_sqlite(query: str) -> str:
+    # SQLite takes numbered parameters as ?1, ?2, ... and understands the
+    # rest of the statements the snapshot tables are queried with
+    return _PARAM.sub(r"?\1", query)
+
+
+class Snapshot:
+    """
+    A local SQLite copy of the guild config tables, with a journal of the
+    writes made while Postgres couldn't take them.
+
+    sqlite3 blocks, so every call runs in a worker thread, one at a time.
+    """
+
+    def __init__(self, path: str, schema: Dict[str, str]):
+        self.path = path
+        self.schema = schema
+        self._db = sqlite3.connect(path, check_same_thread=False)
+        self._db.row_factory = sqlite3.Row
+        self._lock = asyncio.Lock()
+        # writes made while a refresh is fetching, which it would overwrite
+        self._refreshing: Optional[List[Tuple[str, Sequence]]] = None
+
+        with self._db:
+            for table in schema.values():
+                self._db.execute(table)
+
+            self._db.execute(
+                """CREATE TABLE IF NOT EXISTS journal
+                (id INTEGER PRIMARY KEY AUTOINCREMENT, query TEXT, args TEXT)"""
+            )
+
+    async def _call(self, func, *args) -> Any:
+        async with self._lock:
+            return await asyncio.to_thread(func, *args)
+
+    # ====== READS AND WRITES ======
+
+    def _run(self, method: str, query: str, args: Sequence) -> Any:
+        cursor = self._db.execute(to_sqlite(query), args)
+
+        if method == "fetch":
+            return cursor.fetchall()
+
+        row = cursor.fetchone()
+        if method == "fetchrow" or row is None:
+            return row
+
+        return row[0]
+
+    def _write(self, query: str, args: Sequence, journal: bool) -> str:
+        with self._db:
+            cursor = self._db.execute(to_sqlite(query), args)
+
+            if journal:
+                self._db.execute(
+                    "INSERT INTO journal (query, args) VALUES (?, ?)",
+                    (query, json.dumps(list(args))),
+                )
+
+        # the same command tag Postgres would have answered with
+        return f"{query.split(None, 1)[0].upper()} {cursor.rowcount}"
+
+    async def fetch(self, method: str, query: str, *args: Any) -> Any:
+        return await self._call(self._run, method, query, args)
+
+    async def apply(self, query: str, *args: Any) -> str:
+        """Mirrors a write that Postgres has already taken."""
+
+        if self._refreshing is not None:
+            self._refreshing.append((query, args))
+
+        return await self._call(self._write, query, args, False)
+
+    async def record(self, query: str, *args: Any) -> str:
+        """Applies a write locally and journals it for Postgres."""
+
+        if self._refreshing is not None:
+            self._refreshing.append((query, args))
+
+        return await self._call(self._write, query, args, True)
+
+    # ====== SYNCING ======
+
+    def _pending(self) -> List[Tuple[int, str, List]]:
+        rows = self._db.execute("SELECT id, query, args FROM journal ORDER BY id")
+        return [(row[0], row[1], json.loads(row[2])) for row in rows]
+
+    def _forget(self, entry_id: int):
+        with self._db:
+            self._db.execute("DELETE FROM journal WHERE id=?", (entry_id,))
+
+    def _count(self) -> int:
+        return self._db.execute("SELECT COUNT(*) FROM journal").fetchone()[0]
+
+    def _replace(self, tables: Dict[str, List[Tuple]], writes: List[Tuple]):
+        with self._db:
+            for table, rows in tables.items():
+                self._db.execute(f"DELETE FROM {table}")
+
+                if rows:
+                    marks = ", ".join("?" * len(rows[0]))
+                    self._db.executemany(
+                        f"INSERT INTO {table} VALUES ({marks})", rows
+                    )
+
+            # the writes are safe to repeat, see core.queries
+            for query, args in writes:
+                self._db.execute(to_sqlite(query), args)
+
+    async def pending(self) -> int:
+        return await self._call(self._count)
+
+    async def replay(self, pool, errors: Tuple) -> int:
+        """
+        Sends journalled writes to Postgres in order. Stops at the first
+        connection error and leaves the rest for next time; a write that
+        Postgres rejects outright is logged and dropped.
+        """
+
+        replayed = 0
+
+        for entry_id, query, args in await self._call(self._pending):
+            try:
+                await pool.execute(query, *args)
+
+            except errors:
+                break
+
+            except Exception as e:
+                logger.warning(f"Dropped journalled write {query!r} {args}: {e!r}")
+
+            else:
+                replayed += 1
+
+            await self._call(self._forget, entry_id)
+
+        return replayed
+
+    async def refresh(self, pool):
+        """
+        Replaces the tables with what Postgres has. Writes made while the
+        rows are being fetched may not be in them, so they are applied again
+        on top.
+        """
+
+        tables = {}
+        self._refreshing = writes = []
+
+        try:
+            for table in self.schema:
+                rows = await pool.fetch(f"SELECT * FROM {table}")
+                tables[table] = [tuple(row) for row in rows]
+
+        finally:
+            self._refreshing = None
+
+        # any write from here on queues behind the replace
+        await self._call(self._replace, tables, writes)
+
+    def close(self):
+        self._db.close()
@@ -0,0 +1,260 @@
+import asyncio
+import weakref
+from collections import Counter
+from typing import TYPE_CHECKING, Dict, Optional, Sequence
+
+import discord
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Bot
+
+
+class GuildStats:
+    __slots__ = ("shard_id", "members", "humans", "bots", "channels", "complete")
+
+    def __init__(
+        self,
+        guild: discord.Guild,
+        members: Optional[Sequence[discord.Member]] = None,
+        previous: Optional["GuildStats"] = None,
+    ):
+        # without a full member list the human and bot counts only cover the
+        # members that happen to be cached
+        self.complete = members is not None or guild.chunked
+        members = guild.members if members is None else members
+
+        self.shard_id = guild.shard_id
+        self.members = guild.member_count or 0
+        self.bots = sum(1 for m in members if m.bot)
+        self.humans = len(members) - self.bots
+        self.channels = Counter(c.type for c in guild.channels)
+
+        if not self.complete and previous is not None and previous.complete:
+            # counted from a chunk the cache didn't keep, with MEMBER_CACHE
+            # leaving members out, and kept up to date by join and leave events
+            self.complete = True
+            self.humans = previous.humans
+            self.bots = previous.bots
+
+
+class ShardStats:
+    __slots__ = ("guilds", "members")
+
+    def __init__(self):
+        self.guilds = 0
+        self.members = 0
+
+
+class StatsTracker:
+    """
+    Bot-wide counters kept up to date from gateway events, so commands can
+    read guild, channel and member counts, overall or for one shard, without
+    walking the cache.
+    """
+
+    def __init__(self, bot: "Bot"):
+        self.bot = bot
+        self.guilds: Dict[int, GuildStats] = {}
+        self.members = 0
+        self.channels: Counter = Counter()
+        self.shards: Dict[int, ShardStats] = {}
+        self._command_count: Optional[int] = None
+        # gone once nobody is chunking the guild or waiting to
+        self._chunking: "weakref.WeakValueDictionary[int, asyncio.Lock]" = (
+            weakref.WeakValueDictionary()
+        )
+
+        for event in (
+            "on_ready",
+            "on_guild_join",
+            "on_guild_available",
+            "on_guild_remove",
+            "on_guild_unavailable",
+            "on_guild_channel_create",
+            "on_guild_channel_delete",
+            "on_guild_channel_update",
+            "on_member_join",
+            "on_raw_member_remove",
+        ):
+            bot.add_listener(getattr(self, event), event)
+
+    # ====== READING ======
+
+    @property
+    def guild_count(self) -> int:
+        return len(self.guilds)
+
+    @property
+    def text_channels(self) -> int:
+        # news channels are TextChannels too
+        return (
+            self.channels[discord.ChannelType.text]
+            + self.channels[discord.ChannelType.news]
+        )
+
+    @property
+    def voice_channels(self) -> int:
+        return self.channels[discord.ChannelType.voice]
+
+    @property
+    def command_count(self) -> int:
+        if self._command_count is None:
+            self._command_count = sum(1 for _ in self.bot.walk_commands())
+
+        return self._command_count
+
+    def shard(self, shard_id: int) -> ShardStats:
+        return self.shards.get(shard_id) or ShardStats()
+
+    def guild(self, guild: discord.Guild) -> GuildStats:
+        stats = self.guilds.get(guild.id)
+
+        if stats is None or (not stats.complete and guild.chunked):
+            stats = self._add_guild(guild)
+
+        return stats
+
+    async def complete(self, guild: discord.Guild) -> GuildStats:
+        """
+        Like `guild`, but requests the member list first if it isn't cached.
+        Join and leave events keep the counts right from then on. The
+        members stay cached unless `MEMBER_CACHE` leaves out joined members.
+        """
+
+        stats = self.guild(guild)
+        if stats.complete:
+            return stats
+
+        lock = self._chunking.setdefault(guild.id, asyncio.Lock())
+
+        async with lock:
+            # complete now if whoever held the lock chunked it
+            stats = self.guild(guild)
+
+            if not stats.complete:
+                # only kept if the policy caches joined members anyway
+                flags = self.bot._connection.member_cache_flags
+                members = await guild.chunk(cache=flags.joined)
+                stats = self._add_guild(guild, members)
+
+        return stats
+
+    def invalidate_commands(self):
+        self._command_count = None
+
+    # ====== BOOKKEEPING ======
+
+    def _add_guild(
+        self,
+        guild: discord.Guild,
+        members: Optional[Sequence[discord.Member]] = None,
+        previous: Optional[GuildStats] = None,
+    ) -> GuildStats:
+        previous = self._remove_guild(guild.id) or previous
+
+        stats = self.guilds[guild.id] = GuildStats(guild, members, previous)
+        self.members += stats.members
+        self.channels.update(stats.channels)
+
+        shard = self.shards.get(stats.shard_id)
+        if shard is None:
+            shard = self.shards[stats.shard_id] = ShardStats()
+
+        shard.guilds += 1
+        shard.members += stats.members
+        return stats
+
+    def _remove_guild(self, guild_id: int) -> Optional[GuildStats]:
+        stats = self.guilds.pop(guild_id, None)
+
+        if stats is not None:
+            self.members -= stats.members
+            self.channels.subtract(stats.channels)
+
+            shard = self.shards[stats.shard_id]
+            shard.guilds -= 1
+            shard.members -= stats.members
+
+        return stats
+
+    def rebuild(self):
+        previous = self.guilds.copy()
+        self.guilds.clear()
+        self.members = 0
+        self.channels.clear()
+        self.shards.clear()
+
+        for guild in self.bot.guilds:
+            if not guild.unavailable:
+                self._add_guild(guild, previous=previous.get(guild.id))
+
+    # ====== EVENTS ======
+
+    async def on_ready(self):
+        self.rebuild()
+
+    async def on_guild_join(self, guild: discord.Guild):
+        self._add_guild(guild)
+
+    async def on_guild_available(self, guild: discord.Guild):
+        self._add_guild(guild)
+
+    async def on_guild_remove(self, guild: discord.Guild):
+        self._remove_guild(guild.id)
+
+    async def on_guild_unavailable(self, guild: discord.Guild):
+        self._remove_guild(guild.id)
+
+    async def on_guild_channel_create(self, channel: discord.abc.GuildChannel):
+        stats = self.guilds.get(channel.guild.id)
+
+        if stats is not None:
+            stats.channels[channel.type] += 1
+            self.channels[channel.type] += 1
+
+    async def on_guild_channel_delete(self, channel: discord.abc.GuildChannel):
+        stats = self.guilds.get(channel.guild.id)
+
+        if stats is not None:
+            stats.channels[channel.type] -= 1
+            self.channels[channel.type] -= 1
+
+    async def on_guild_channel_update(
+        self, before: discord.abc.GuildChannel, after: discord.abc.GuildChannel
+    ):
+        # a text channel turned into an announcement channel, or the reverse
+        stats = self.guilds.get(after.guild.id)
+
+        if stats is not None and before.type != after.type:
+            stats.channels[before.type] -= 1
+            stats.channels[after.type] += 1
+            self.channels[before.type] -= 1
+            self.channels[after.type] += 1
+
+    async def on_member_join(self, member: discord.Member):
+        stats = self.guilds.get(member.guild.id)
+
+        if stats is not None:
+            stats.members += 1
+            self.members += 1
+            self.shards[stats.shard_id].members += 1
+
+            if member.bot:
+                stats.bots += 1
+
+            else:
+                stats.humans += 1
+
+    async def on_raw_member_remove(self, payload: discord.RawMemberRemoveEvent):
+        stats = self.guilds.get(payload.guild_id)
+
+        if stats is not None:
+            stats.members -= 1
+            self.members -= 1
+            self.shards[stats.shard_id].members -= 1
+
+            if payload.user.bot:
+                stats.bots -= 1
+
+            else:
+                stats.humans -= 1
@@ -0,0 +1,84 @@
+from collections import Counter, defaultdict
+from typing import TYPE_CHECKING, Dict, FrozenSet, List
+
+if TYPE_CHECKING:
+    from discord.ext.commands import Bot
+
+# Typos longer than this are not worth suggesting for.
+MAX_QUERY_LENGTH = 32
+
+
+def trigrams(word: str) -> FrozenSet[str]:
+    # padded the same way as pg_trgm, so short names and prefixes still match
+    padded = f"  {word.lower()} "
+    return frozenset(padded[i : i + 3] for i in range(len(padded) - 2))
+
+
+class CommandIndex:
+    """
+    Trigram index over command names and aliases, used to suggest commands
+    for typos. Only names sharing at least one trigram with the query get
+    scored, so a lookup never walks the whole command list.
+    """
+
+    def __init__(self, bot: "Bot", *, threshold: float = 0.3):
+        self.bot = bot
+        self.threshold = threshold
+        # name or alias -> qualified command name
+        self.names: Dict[str, str] = {}
+        self.grams: Dict[str, FrozenSet[str]] = {}
+        self.postings: Dict[str, List[str]] = {}
+
+        bot.add_listener(self.on_extensions_loaded, "on_extensions_loaded")
+
+    def rebuild(self):
+        names: Dict[str, str] = {}
+
+        for command in self.bot.walk_commands():
+            # CommandNotFound is only raised for the first word, so
+            # subcommands never need suggesting
+            if command.hidden or command.parent is not None:
+                continue
+
+            for name in (command.name, *command.aliases):
+                names[name.lower()] = command.qualified_name
+
+        postings: Dict[str, List[str]] = defaultdict(list)
+        grams = {name: trigrams(name) for name in names}
+
+        for name, name_grams in grams.items():
+            for gram in name_grams:
+                postings[gram].append(name)
+
+        self.names = names
+        self.grams = grams
+        self.postings = dict(postings)
+
+    def suggest(self, query: str, *, limit: int = 3) -> List[str]:
+        """Returns up to `limit` command names closest to the query, best first."""
+
+        if not query or len(query) > MAX_QUERY_LENGTH:
+            return []
+
+        query_grams = trigrams(query)
+        shared: Counter = Counter()
+
+        for gram in query_grams:
+            shared.update(self.postings.get(gram, ()))
+
+        scores: Dict[str, float] = {}
+
+        for name, count in shared.items():
+            # Dice coefficient over the two trigram sets
+            score = 2 * count / (len(query_grams) + len(self.grams[name]))
+
+            if score >= self.threshold:
+                command = self.names[name]
+                scores[command] = max(score, scores.get(command, 0))
+
+        ranked = sorted(scores, key=lambda c: (-scores[c], c))
+        return ranked[:limit]
+
+    async def on_extensions_loaded(self):
+        self.rebuild()
+
@@ -0,0 +1,158 @@
+import asyncio
+import logging
+import os
+import sys
+import threading
+import time
+import traceback
+from collections import deque
+from typing import Deque, Optional
+
+from core.metrics import Counter, Histogram, Metrics
+
+logger = logging.getLogger("bot")
+
+# How long the loop may go without running the heartbeat before it counts
+# as blocked.
+BLOCK_THRESHOLD = float(os.getenv("LOOP_BLOCK_THRESHOLD_MS", "250")) / 1000
+HEARTBEAT_INTERVAL = 0.1
+
+LAG_BUCKETS = (0.001, 0.005, 0.01, 0.025, 0.05, 0.1, 0.25, 0.5, 1.0, 2.5, 5.0)
+
+
+class Stall:
+    __slots__ = ("started", "duration", "task", "stack")
+
+    def __init__(self, started: float, task: str, stack: str):
+        self.started = started
+        self.duration = 0.0
+        self.task = task
+        self.stack = stack
+
+
+class LoopWatchdog:
+    """
+    Measures event loop lag and catches callbacks that block it.
+
+    A heartbeat task notes the time every `HEARTBEAT_INTERVAL`. A separate
+    thread watches that note, and when the loop has been stuck for longer
+    than the threshold it grabs the loop thread's stack, which is still
+    sitting in whatever is blocking it.
+    """
+
+    def __init__(self, metrics: Metrics, *, threshold: float = BLOCK_THRESHOLD):
+        self.threshold = threshold
+        self.recent: Deque[Stall] = deque(maxlen=20)
+
+        self.lag = metrics.add(
+            Histogram(
+                "pizzahat_loop_lag_seconds",
+                "How late the event loop ran a scheduled heartbeat.",
+                buckets=LAG_BUCKETS,
+            )
+        )
+        self.blocks = metrics.add(
+            Counter(
+                "pizzahat_loop_blocks_total",
+                "Times the event loop was blocked past the threshold, by task.",
+                ["task"],
+            )
+        )
+        self.block_duration = metrics.add(
+            Histogram(
+                "pizzahat_loop_block_duration_seconds",
+                "How long each blocking stall lasted.",
+                buckets=LAG_BUCKETS,
+            )
+        )
+
+        self._loop: Optional[asyncio.AbstractEventLoop] = None
+        self._loop_thread: Optional[int] = None
+        self._last_beat = time.monotonic()
+        self._heartbeat: Optional[asyncio.Task] = None
+        self._thread: Optional[threading.Thread] = None
+        self._stopped = threading.Event()
+
+    def start(self):
+        self._loop = asyncio.get_running_loop()
+        self._loop_thread = threading.get_ident()
+        self._last_beat = time.monotonic()
+        self._stopped.clear()
+
+        self._heartbeat = asyncio.create_task(self._beat())
+        self._thread = threading.Thread(
+            target=self._watch, name="loop-watchdog", daemon=True
+        )
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+
+        if self._heartbeat is not None:
+            self._heartbeat.cancel()
+            self._heartbeat = None
+
+    async def _beat(self):
+        while True:
+            expected = time.monotonic() + HEARTBEAT_INTERVAL
+            await asyncio.sleep(HEARTBEAT_INTERVAL)
+
+            now = time.monotonic()
+            self.lag.observe(max(0.0, now - expected))
+            self._last_beat = now
+
+    # ====== WATCHDOG THREAD ======
+
+    def _blocking_task(self) -> str:
+        try:
+            task = asyncio.current_task(self._loop)
+
+        except RuntimeError:
+            task = None
+
+        if task is None:
+            return "<callback>"
+
+        coro = task.get_coro()
+        return getattr(coro, "__qualname__", None) or task.get_name()
+
+    def _record(self, stall: Stall, ended: bool):
+        # runs on the loop, which is also where the metrics are rendered
+        if ended:
+            self.block_duration.observe(stall.duration)
+
+        else:
+            self.recent.append(stall)
+            self.blocks.inc(stall.task)
+
+    def _capture(self) -> Stall:
+        frame = sys._current_frames().get(self._loop_thread)  # type: ignore
+        stack = "".join(traceback.format_stack(frame)) if frame else ""
+        return Stall(self._last_beat, self._blocking_task(), stack)
+
+    def _watch(self):
+        loop: asyncio.AbstractEventLoop = self._loop  # type: ignore
+        stall: Optional[Stall] = None
+
+        while not self._stopped.wait(self.threshold / 2):
+            beat = self._last_beat
+            blocked_for = time.monotonic() - beat - HEARTBEAT_INTERVAL
+
+            if stall is not None and beat > stall.started:
+                # the loop is running again
+                stall.duration = beat - stall.started - HEARTBEAT_INTERVAL
+                loop.call_soon_threadsafe(self._record, stall, True)
+                logger.warning(
+                    f"Event loop was blocked for {stall.duration * 1000:.0f}ms "
+                    f"by {stall.task}"
+                )
+                stall = None
+
+            if stall is None and blocked_for > self.threshold:
+                stall = self._capture()
+                # counted once the loop is free to run it
+                loop.call_soon_threadsafe(self._record, stall, False)
+                logger.warning(
+                    f"Event loop blocked for {blocked_for * 1000:.0f}ms "
+                    f"by {stall.task}, currently at:\n{stall.stack}"
+                )
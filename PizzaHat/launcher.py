@@ -0,0 +1,244 @@
+import asyncio
+import logging
+import os
+import signal
+import sys
+import tempfile
+from typing import Dict, List, Optional
+
+import aiohttp
+from dotenv import load_dotenv
+
+from core.database import backoff
+from core.ipc import IPCServer
+from core.shards import SHARD_COUNT
+
+load_dotenv()
+
+logging.basicConfig(
+    level=logging.INFO, format="%(levelname)-10s - %(name)-15s : %(message)s"
+)
+logger = logging.getLogger("launcher")
+
+HERE = os.path.dirname(os.path.abspath(__file__))
+
+CLUSTERS = int(os.getenv("CLUSTERS", str(os.cpu_count() or 1)))
+IPC_PATH = os.getenv(
+    "IPC_PATH", os.path.join(tempfile.gettempdir(), "pizzahat-ipc.sock")
+)
+# Chunking large guilds can make a cluster slow to come up
+READY_TIMEOUT = float(os.getenv("CLUSTER_READY_TIMEOUT", "600"))
+# Longer than the bot's own SHUTDOWN_TIMEOUT, so it gets to drain
+STOP_TIMEOUT = float(os.getenv("CLUSTER_STOP_TIMEOUT", "60"))
+
+
+def shard_ranges(shard_count: int, clusters: int) -> List[List[int]]:
+    """Splits the shards into contiguous runs, as even as they go."""
+
+    clusters = max(1, min(clusters, shard_count))
+    size, extra = divmod(shard_count, clusters)
+    ranges, start = [], 0
+
+    for cluster in range(clusters):
+        end = start + size + (cluster < extra)
+        ranges.append(list(range(start, end)))
+        start = end
+
+    return ranges
+
+
+async def recommended_shards(token: str) -> int:
+    async with aiohttp.ClientSession() as session:
+        async with session.get(
+            "https://discord.com/api/v10/gateway/bot",
+            headers={"Authorization": f"Bot {token}"},
+        ) as resp:
+            resp.raise_for_status()
+            return (await resp.json())["shards"]
+
+
+def _per_cluster(path: str, cluster: int) -> str:
+    root, ext = os.path.splitext(path)
+    return f"{root}-{cluster}{ext}"
+
+
+class Launcher:
+    """
+    Runs each shard range as its own bot process and keeps them running.
+
+    Clusters that exit on their own are started again. A rolling restart,
+    asked for with SIGHUP or by a cluster over IPC, replaces them one at a
+    time and waits for each to be ready before moving on, so only one
+    cluster's shards are ever down.
+    """
+
+    def __init__(self, shard_count: int, clusters: int):
+        self.shard_count = shard_count
+        self.ranges = shard_ranges(shard_count, clusters)
+        self.server = IPCServer(IPC_PATH, on_message=self.on_message)
+        self.processes: Dict[int, asyncio.subprocess.Process] = {}
+        self._watchers: Dict[int, asyncio.Task] = {}
+        self._restart_lock = asyncio.Lock()
+        self._restart_task: Optional[asyncio.Task] = None
+        self._stopped = asyncio.Event()
+
+    def environment(self, cluster: int) -> Dict[str, str]:
+        shards = self.ranges[cluster]
+        env = dict(
+            os.environ,
+            SHARD_COUNT=str(self.shard_count),
+            SHARD_IDS=f"{shards[0]}-{shards[-1]}",
+            CLUSTER_ID=str(cluster),
+            CLUSTER_COUNT=str(len(self.ranges)),
+            IPC_PATH=IPC_PATH,
+            LOG_FILE=_per_cluster(os.getenv("LOG_FILE", "bot.log"), cluster),
+        )
+
+        # anything a process keeps to itself can't be shared between clusters
+        snapshot = os.getenv("DB_SNAPSHOT_PATH", "snapshot.sqlite3")
+        if snapshot and snapshot != ":memory:":
+            env["DB_SNAPSHOT_PATH"] = _per_cluster(snapshot, cluster)
+
+        port = int(os.getenv("METRICS_PORT", "9100"))
+        if port:
+            env["METRICS_PORT"] = str(port + cluster)
+
+        return env
+
+    # ====== CLUSTERS ======
+
+    async def _spawn(self, cluster: int) -> asyncio.subprocess.Process:
+        shards = self.ranges[cluster]
+        logger.info(f"Starting cluster {cluster} (shards {shards[0]}-{shards[-1]})")
+
+        # in a session of its own, so a ^C reaches the launcher and the
+        # clusters are stopped by it rather than all at once
+        self.server.reset(cluster)
+        proc = self.processes[cluster] = await asyncio.create_subprocess_exec(
+            sys.executable,
+            os.path.join(HERE, "__main__.py"),
+            env=self.environment(cluster),
+            start_new_session=True,
+        )
+        return proc
+
+    async def start_cluster(self, cluster: int):
+        proc = await self._spawn(cluster)
+        self._watchers[cluster] = asyncio.create_task(self._watch(cluster, proc))
+
+    async def stop_cluster(self, cluster: int):
+        proc = self.processes.pop(cluster, None)
+        watcher = self._watchers.pop(cluster, None)
+
+        if watcher is not None:
+            watcher.cancel()
+
+        if proc is None or proc.returncode is not None:
+            return
+
+        # the bot drains and closes on SIGTERM, see core/lifecycle.py
+        proc.send_signal(signal.SIGTERM)
+
+        try:
+            await asyncio.wait_for(proc.wait(), STOP_TIMEOUT)
+
+        except asyncio.TimeoutError:
+            logger.warning(f"Cluster {cluster} didn't stop in time, killing it")
+            proc.kill()
+            await proc.wait()
+
+    async def _watch(self, cluster: int, proc: asyncio.subprocess.Process):
+        attempt = 0
+
+        while True:
+            code = await proc.wait()
+            logger.error(f"Cluster {cluster} exited with {code}, restarting it")
+
+            # a cluster that keeps dying right away shouldn't spin
+            await asyncio.sleep(backoff(attempt))
+            attempt += 1
+
+            proc = await self._spawn(cluster)
+            if await self._wait_ready(cluster, proc):
+                attempt = 0
+
+    async def _wait_ready(
+        self, cluster: int, proc: asyncio.subprocess.Process
+    ) -> bool:
+        ready = asyncio.create_task(self.server.wait_ready(cluster, READY_TIMEOUT))
+        exited = asyncio.create_task(proc.wait())
+
+        await asyncio.wait([ready, exited], return_when=asyncio.FIRST_COMPLETED)
+        exited.cancel()
+
+        if not ready.done():
+            # it exited first, the watcher takes it from here
+            ready.cancel()
+            return False
+
+        return ready.result()
+
+    async def rolling_restart(self):
+        async with self._restart_lock:
+            logger.info("Rolling restart started")
+
+            for cluster in range(len(self.ranges)):
+                await self.stop_cluster(cluster)
+                await self.start_cluster(cluster)
+
+                if not await self._wait_ready(cluster, self.processes[cluster]):
+                    # a bad deploy shouldn't take the other clusters with it
+                    logger.error(
+                        f"Cluster {cluster} didn't come back ready, "
+                        "leaving the rest on the old version"
+                    )
+                    return
+
+            logger.info("Rolling restart done")
+
+    def request_restart(self):
+        if self._restart_task is None or self._restart_task.done():
+            self._restart_task = asyncio.create_task(self.rolling_restart())
+
+    def on_message(self, cluster: int, message: dict):
+        if message["type"] == "restart":
+            logger.info(f"Cluster {cluster} asked for a rolling restart")
+            self.request_restart()
+
+    # ====== RUNNING ======
+
+    async def run(self):
+        await self.server.start()
+
+        loop = asyncio.get_running_loop()
+        loop.add_signal_handler(signal.SIGHUP, self.request_restart)
+        for sig in (signal.SIGINT, signal.SIGTERM):
+            loop.add_signal_handler(sig, self._stopped.set)
+
+        try:
+            for cluster in range(len(self.ranges)):
+                await self.start_cluster(cluster)
+
+            await self._stopped.wait()
+
+        finally:
+            logger.info("Stopping all clusters")
+            if self._restart_task is not None:
+                self._restart_task.cancel()
+
+            await asyncio.gather(*(self.stop_cluster(c) for c in list(self.processes)))
+            await self.server.close()
+
+
+async def main():
+    shard_count = SHARD_COUNT or await recommended_shards(os.environ["TOKEN"])
+    launcher = Launcher(shard_count, CLUSTERS)
+
+    logger.info(
+        f"Launching {shard_count} shards over {len(launcher.ranges)} clusters"
+    )
+    await launcher.run()
+
+
+if __name__ == "__main__":
+    asyncio.run(main())
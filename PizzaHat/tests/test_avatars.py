@@ -0,0 +1,83 @@
+import asyncio
+import tempfile
+import unittest
+
+from utils.avatars import AvatarCache
+from utils.image_cache import ImageCache
+
+
+class FakeHttp:
+    def __init__(self):
+        self.urls = []
+
+    async def get_bytes(self, url):
+        self.urls.append(url)
+        await asyncio.sleep(0)
+        return url.encode()
+
+
+class FakeAsset:
+    def __init__(self, key):
+        self.key = key
+        self.url = f"https://cdn/{key}"
+
+    def with_format(self, fmt):
+        return FakeAsset._Url(f"{self.url}.{fmt}")
+
+    class _Url(str):
+        def with_size(self, size):
+            return f"{self}?size={size}"
+
+
+class AvatarCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.http = FakeHttp()
+        # each avatar's bytes are its 26 character URL, so two fit in memory
+        self.cache = AvatarCache(
+            self.http, max_bytes=60, disk=ImageCache(self.dir.name, 1024)
+        )
+        await self.cache.load()
+
+    async def asyncTearDown(self):
+        self.dir.cleanup()
+
+    async def test_downloads_once(self):
+        asset = FakeAsset("a")
+        results = await asyncio.gather(
+            *(self.cache.fetch(asset, 128) for _ in range(3))
+        )
+
+        self.assertEqual(results, [b"https://cdn/a.png?size=128"] * 3)
+        self.assertEqual(len(self.http.urls), 1)
+
+        await self.cache.fetch(asset, 128)
+        self.assertEqual(self.cache.memory_hits, 1)
+        self.assertEqual(self.cache.misses, 1)
+
+    async def test_size_and_format_are_separate_entries(self):
+        asset = FakeAsset("a")
+        await self.cache.fetch(asset, 128)
+        await self.cache.fetch(asset, 256)
+        await self.cache.fetch(asset, 128, "gif")
+
+        self.assertEqual(len(self.http.urls), 3)
+
+    async def test_spills_to_disk(self):
+        first, second, third = FakeAsset("a"), FakeAsset("b"), FakeAsset("c")
+        await self.cache.fetch(first, 128)
+        await self.cache.fetch(second, 128)
+        await self.cache.fetch(third, 128)
+        await self.cache.flush()
+
+        self.assertLessEqual(self.cache.total_bytes, 60)
+        self.assertNotIn(("a", 128, "png"), self.cache._memory)
+
+        data = await self.cache.fetch(first, 128)
+        self.assertEqual(data, b"https://cdn/a.png?size=128")
+        self.assertEqual(self.cache.disk_hits, 1)
+        self.assertEqual(len(self.http.urls), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,130 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+import discord
+
+from core.cache import member_cache_flags
+from core.stats import StatsTracker
+
+
+class MemberCacheFlagsTest(unittest.TestCase):
+    def test_default_follows_intents(self):
+        intents = discord.Intents.default()
+
+        self.assertEqual(
+            member_cache_flags(intents, "default"),
+            discord.MemberCacheFlags.from_intents(intents),
+        )
+
+    def test_all_and_none(self):
+        intents = discord.Intents.all()
+
+        self.assertEqual(
+            member_cache_flags(intents, " ALL "), discord.MemberCacheFlags.all()
+        )
+        self.assertEqual(
+            member_cache_flags(intents, "none"), discord.MemberCacheFlags.none()
+        )
+
+    def test_list(self):
+        flags = member_cache_flags(discord.Intents.all(), "voice, joined,")
+
+        self.assertTrue(flags.voice)
+        self.assertTrue(flags.joined)
+
+    def test_unknown_flag(self):
+        with self.assertRaises(ValueError):
+            member_cache_flags(discord.Intents.all(), "voice,online")
+
+
+class FakeBot:
+    def __init__(self, guilds):
+        self.guilds = guilds
+        self._connection = SimpleNamespace(
+            member_cache_flags=discord.MemberCacheFlags.none()
+        )
+
+    def add_listener(self, func, name):
+        pass
+
+
+class FakeGuild:
+    """A guild whose member list is never cached, as with `MEMBER_CACHE=none`."""
+
+    def __init__(self, humans, bots, *, fail=False):
+        self.id = 1
+        self.shard_id = 0
+        self.unavailable = False
+        self.chunked = False
+        self.members = []
+        self.channels = []
+        self.member_count = humans + bots
+        self._members = [SimpleNamespace(bot=False)] * humans
+        self._members += [SimpleNamespace(bot=True)] * bots
+        self.fail = fail
+        self.delay = 0
+        self.chunking = self.most_chunking = 0
+
+    async def chunk(self, *, cache=True):
+        self.chunking += 1
+        self.most_chunking = max(self.most_chunking, self.chunking)
+        await asyncio.sleep(self.delay)
+        self.chunking -= 1
+
+        if self.fail:
+            self.fail = False
+            raise discord.HTTPException(SimpleNamespace(status=500, reason=""), "")
+
+        return self._members
+
+
+class CompleteTest(unittest.TestCase):
+    def test_failed_chunk_releases_the_lock(self):
+        guild = FakeGuild(3, 1, fail=True)
+        stats = StatsTracker(FakeBot([guild]))
+
+        with self.assertRaises(discord.HTTPException):
+            asyncio.run(stats.complete(guild))
+
+        self.assertEqual(len(stats._chunking), 0)
+
+    def test_one_chunk_at_a_time(self):
+        guild = FakeGuild(3, 1, fail=True)
+        guild.delay = 0.01
+        stats = StatsTracker(FakeBot([guild]))
+
+        async def main():
+            first = asyncio.create_task(stats.complete(guild))
+            waiting = asyncio.create_task(stats.complete(guild))
+
+            # arrives once the first failed and the waiting one is chunking
+            await asyncio.sleep(0.015)
+            late = asyncio.create_task(stats.complete(guild))
+
+            return await asyncio.gather(first, waiting, late, return_exceptions=True)
+
+        failed, *results = asyncio.run(main())
+
+        self.assertIsInstance(failed, discord.HTTPException)
+        self.assertTrue(all(r.complete for r in results))
+        self.assertEqual(guild.most_chunking, 1)
+
+    def test_kept_across_reconnects(self):
+        guild = FakeGuild(3, 1)
+        stats = StatsTracker(FakeBot([guild]))
+
+        complete = asyncio.run(stats.complete(guild))
+        self.assertEqual((complete.humans, complete.bots), (3, 1))
+
+        asyncio.run(stats.on_guild_available(guild))
+        asyncio.run(stats.on_ready())
+
+        rebuilt = stats.guild(guild)
+        self.assertTrue(rebuilt.complete)
+        self.assertEqual((rebuilt.humans, rebuilt.bots), (3, 1))
+        self.assertEqual(stats.members, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,179 @@
+import asyncio
+import unittest
+from unittest import mock
+
+from core.database import InstrumentedPool
+
+
+class FakeConnection:
+    def __init__(self, pool):
+        self.pool = pool
+
+    async def _answer(self, result):
+        await asyncio.sleep(self.pool.delay)
+        if self.pool.error is not None:
+            raise self.pool.error
+
+        return result
+
+    async def fetch(self, query, *args, timeout=None):
+        return await self._answer([(1,), (2,)])
+
+    async def fetchval(self, query, *args, timeout=None):
+        return await self._answer(1)
+
+    async def execute(self, query, *args, timeout=None):
+        return await self._answer("UPDATE 3")
+
+
+class FakeAcquire:
+    def __init__(self, pool, timeout):
+        self.pool = pool
+        self.timeout = timeout
+
+    async def _acquire(self):
+        self.pool.timeouts.append(self.timeout)
+        if self.pool.acquire_error is not None:
+            raise self.pool.acquire_error
+
+        self.pool.used += 1
+        return FakeConnection(self.pool)
+
+    def __await__(self):
+        return self._acquire().__await__()
+
+    async def __aenter__(self):
+        return await self._acquire()
+
+    async def __aexit__(self, *args):
+        self.pool.used -= 1
+
+
+class FakePool:
+    """Just enough of asyncpg.Pool."""
+
+    def __init__(self):
+        self.delay = 0
+        self.error = None
+        self.acquire_error = None
+        self.used = 0
+        self.max_size = 2
+        self.expired = 0
+        self.timeouts = []
+
+    def acquire(self, *, timeout=None):
+        return FakeAcquire(self, timeout)
+
+    async def release(self, conn):
+        self.used -= 1
+
+    def get_size(self):
+        return self.max_size
+
+    def get_idle_size(self):
+        return self.max_size - self.used
+
+    def get_max_size(self):
+        return self.max_size
+
+    def expire_connections(self):
+        self.expired += 1
+
+
+class InstrumentedPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakePool()
+        self.pool = InstrumentedPool(self.fake, slow_threshold=0.05)  # type: ignore
+
+    async def test_groups_by_query_text(self):
+        await self.pool.fetch("SELECT  *\n FROM tags WHERE guild_id=$1", 1)
+        await self.pool.fetch("SELECT * FROM tags WHERE guild_id=$1", 2)
+        await self.pool.execute("UPDATE tags SET content=$2", "x", timeout=3)
+
+        select = self.pool.queries["SELECT * FROM tags WHERE guild_id=$1"]
+        self.assertEqual((select.calls, select.rows), (2, 4))
+        self.assertEqual(self.pool.queries["UPDATE tags SET content=$2"].rows, 3)
+        self.assertEqual(self.pool.acquires, 3)
+
+    async def test_errors_are_counted(self):
+        self.fake.error = ValueError("bad")
+
+        with self.assertRaises(ValueError):
+            await self.pool.fetchval("SELECT 1")
+
+        stats = self.pool.queries["SELECT 1"]
+        self.assertEqual((stats.calls, stats.errors), (1, 1))
+
+    async def test_slow_query_call_site(self):
+        self.fake.delay = 0.06
+
+        with self.assertLogs("bot", "WARNING") as logs:
+            await self.pool.fetchval("SELECT pg_sleep(1)")
+
+        slow = self.pool.slow[-1]
+        self.assertEqual(slow.query, "SELECT pg_sleep(1)")
+        self.assertIn("test_database.py", slow.call_site)
+        self.assertIn("test_slow_query_call_site", slow.call_site)
+        self.assertIn(slow.call_site, logs.output[0])
+
+
+class HealthCheckTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.fake = FakePool()
+        self.pool = InstrumentedPool(self.fake)  # type: ignore
+
+        patcher = mock.patch("core.database.backoff", return_value=0.001)
+        patcher.start()
+        self.addCleanup(patcher.stop)
+
+    async def asyncTearDown(self):
+        if self.pool._health_task is not None:
+            self.pool._health_task.cancel()
+
+    async def checks(self, rounds: int = 5):
+        self.pool.start_health_checks(0.001)
+        await asyncio.sleep(0.001 * rounds * 4)
+
+    async def test_healthy(self):
+        self.assertTrue(await self.pool._ping())
+        self.assertEqual(self.fake.used, 0)
+
+    async def test_outage_expires_connections(self):
+        self.fake.acquire_error = OSError("refused")
+
+        with self.assertLogs("bot", "WARNING"):
+            await self.checks()
+
+        self.assertFalse(self.pool.healthy)
+        self.assertGreater(self.pool.failures, 1)
+        self.assertEqual(self.fake.expired, self.pool.failures)
+
+        self.fake.acquire_error = None
+        with self.assertLogs("bot", "INFO"):
+            await asyncio.sleep(0.02)
+
+        self.assertTrue(self.pool.healthy)
+        self.assertEqual((self.pool.failures, self.pool.reconnects), (0, 1))
+
+    async def test_busy_pool_is_not_an_outage(self):
+        self.fake.used = self.fake.max_size
+        self.fake.acquire_error = asyncio.TimeoutError()
+
+        self.assertFalse(await self.pool._ping())
+        await self.checks()
+
+        self.assertTrue(self.pool.healthy)
+        self.assertEqual(self.fake.expired, 0)
+
+    async def test_hung_connect_is_an_outage(self):
+        self.fake.acquire_error = asyncio.TimeoutError()
+
+        with self.assertLogs("bot", "WARNING"):
+            await self.checks()
+
+        self.assertFalse(self.pool.healthy)
+        self.assertGreater(self.fake.expired, 0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,83 @@
+import asyncio
+import unittest
+from io import BytesIO
+
+import numpy as np
+from PIL import Image
+
+from utils import effects
+
+
+def avatar(size=128) -> bytes:
+    # a gradient, so every pixel differs from its neighbours
+    ramp = np.linspace(0, 255, size, dtype=np.uint8)
+    rgb = np.dstack(
+        [
+            np.tile(ramp, (size, 1)),
+            np.tile(ramp[:, None], (1, size)),
+            np.full((size, size), 40, np.uint8),
+        ]
+    )
+
+    buf = BytesIO()
+    Image.fromarray(rgb, "RGB").save(buf, format="PNG")
+    return buf.getvalue()
+
+
+def decode(data: bytes) -> np.ndarray:
+    with Image.open(BytesIO(data)) as img:
+        return np.asarray(img.convert("RGBA"))
+
+
+class EffectsTest(unittest.TestCase):
+    def setUp(self):
+        self.data = avatar()
+        self.source = effects._decode(self.data)
+
+    def test_scaled_to_work_size(self):
+        for name, effect in effects.EFFECTS.items():
+            with self.subTest(name):
+                data, fmt = effect(self.data)
+
+                with Image.open(BytesIO(data)) as img:
+                    self.assertEqual(img.format.lower(), fmt)
+                    self.assertEqual(img.size, (effects.WORK_SIZE, effects.WORK_SIZE))
+
+    def test_invert(self):
+        out = decode(effects.invert(self.data)[0])
+
+        np.testing.assert_array_equal(out[..., :3], 255 - self.source[..., :3])
+        np.testing.assert_array_equal(out[..., 3], self.source[..., 3])
+
+    def test_grayscale(self):
+        out = decode(effects.grayscale(self.data)[0]).astype(int)
+
+        self.assertTrue((out[..., 0] == out[..., 1]).all())
+        self.assertTrue((out[..., 1] == out[..., 2]).all())
+
+    def test_pixelate(self):
+        out = decode(effects.pixelate(self.data, blocks=16)[0])
+        block = effects.WORK_SIZE // 16
+        tile = out[:block, :block]
+
+        self.assertTrue((tile == tile[0, 0]).all())
+        self.assertFalse((out[:block, block : 2 * block] == tile[0, 0]).all())
+
+    def test_triggered_frames(self):
+        data, fmt = effects.triggered(self.data, frames=4)
+
+        with Image.open(BytesIO(data)) as img:
+            self.assertEqual(fmt, "gif")
+            self.assertEqual(img.n_frames, 4)
+
+    def test_source_size(self):
+        self.assertEqual(effects.source_size("triggered"), 512)
+        self.assertEqual(effects.source_size("invert"), effects.WORK_SIZE)
+
+    def test_unknown_effect(self):
+        with self.assertRaises(KeyError):
+            asyncio.run(effects.render("sparkle", self.data))
+
+
+if __name__ == "__main__":
+    unittest.main()
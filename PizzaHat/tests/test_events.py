@@ -0,0 +1,127 @@
+import datetime
+import os
+import unittest
+from types import SimpleNamespace
+
+# core.bot sets up logging to a file when imported
+os.environ.setdefault("LOG_FILE", os.devnull)
+
+from core.messages import MessageStore  # noqa: E402
+from utils.events import Events  # noqa: E402
+
+GUILD = 1
+CHANNEL = 2
+LOGS = 3
+
+
+class FakeChannel:
+    def __init__(self):
+        self.sent = []
+
+    async def send(self, **kwargs):
+        self.sent.append(kwargs)
+
+
+class FakeQueries:
+    def __init__(self, channel_id):
+        self.channel_id = channel_id
+
+    async def modlog_channel(self, guild_id):
+        return self.channel_id
+
+
+class FakeBot:
+    failed = 0xFF0000
+
+    def __init__(self, logs=True):
+        self.logs = FakeChannel()
+        self.queries = FakeQueries(LOGS if logs else None)
+        self.message_store = MessageStore(self)
+        self.users = {10: "alice#0001", 11: "bob#0002"}
+
+    def add_listener(self, func, name):
+        pass
+
+    def get_guild(self, guild_id):
+        return None
+
+    def get_user(self, user_id):
+        return self.users.get(user_id)
+
+    def get_channel(self, channel_id):
+        if channel_id == LOGS:
+            return self.logs
+        if channel_id == CHANNEL:
+            return "general"
+
+
+def message(message_id, author_id, content, *, bot=False):
+    return SimpleNamespace(
+        id=message_id,
+        guild=SimpleNamespace(id=GUILD),
+        author=SimpleNamespace(id=author_id, bot=bot),
+        channel=SimpleNamespace(id=CHANNEL),
+        content=content,
+        created_at=datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+def bulk_delete(message_ids, cached=()):
+    return SimpleNamespace(
+        guild_id=GUILD,
+        channel_id=CHANNEL,
+        message_ids=set(message_ids),
+        cached_messages=list(cached),
+    )
+
+
+class BulkDeleteLogTest(unittest.IsolatedAsyncioTestCase):
+    async def test_one_entry_with_the_cached_content(self):
+        bot = FakeBot()
+        bot.message_store.add(message(100, 10, "from the store"))
+        cached = [
+            message(200, 11, "from discord.py"),
+            message(300, 12, "from a bot", bot=True),
+        ]
+
+        await Events(bot).on_raw_bulk_message_delete(  # type: ignore
+            bulk_delete([100, 200, 300, 400], cached)
+        )
+
+        self.assertIsNone(bot.message_store.get(GUILD, 100))
+        self.assertEqual(len(bot.logs.sent), 1)
+
+        sent = bot.logs.sent[0]
+        self.assertEqual(sent["embed"].title, "4 messages deleted in #general")
+        self.assertTrue(sent["embed"].description.startswith("2 of them"))
+
+        lines = sent["file"].fp.read().decode().splitlines()
+        self.assertEqual(len(lines), 2)
+        self.assertTrue(lines[0].endswith("alice#0001 (10): from the store"))
+        self.assertTrue(lines[1].endswith("bob#0002 (11): from discord.py"))
+
+    async def test_nothing_cached(self):
+        bot = FakeBot()
+
+        await Events(bot).on_raw_bulk_message_delete(  # type: ignore
+            bulk_delete([100, 200])
+        )
+
+        sent = bot.logs.sent[0]
+        self.assertNotIn("file", sent)
+        self.assertEqual(sent["embed"].description, "None of them were cached.")
+
+    async def test_store_is_cleared_without_a_log_channel(self):
+        bot = FakeBot(logs=False)
+        bot.message_store.add(message(100, 10, "hello"))
+
+        await Events(bot).on_raw_bulk_message_delete(  # type: ignore
+            bulk_delete([100])
+        )
+
+        self.assertEqual(len(bot.message_store), 0)
+        self.assertEqual(bot.logs.sent, [])
+
+
+if __name__ == "__main__":
+    unittest.main()
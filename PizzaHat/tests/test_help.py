@@ -0,0 +1,69 @@
+import os
+import unittest
+
+# core.bot sets up logging to a file when imported
+os.environ.setdefault("LOG_FILE", os.devnull)
+
+import discord  # noqa: E402
+from discord.ext import commands  # noqa: E402
+
+from utils.custom_checks import user_is_staff  # noqa: E402
+from utils.help import CommandEntry, required_permissions  # noqa: E402
+
+
+def command(*checks, **kwargs) -> commands.Command:
+    # checks are kept on the function, so each command needs its own
+    async def func(ctx):
+        pass
+
+    for check in checks:
+        func = check(func)
+
+    return commands.Command(func, name="cmd", **kwargs)
+
+
+class RequiredPermissionsTest(unittest.TestCase):
+    def test_stock_checks(self):
+        cmd = command(
+            commands.has_permissions(ban_members=True, kick_members=False),
+            commands.has_permissions(manage_messages=True),
+        )
+        perms, owner_only = required_permissions(cmd)
+
+        self.assertEqual(
+            perms, discord.Permissions(ban_members=True, manage_messages=True)
+        )
+        self.assertFalse(owner_only)
+
+    def test_owner_only(self):
+        perms, owner_only = required_permissions(command(commands.is_owner()))
+
+        self.assertEqual(perms, discord.Permissions.none())
+        self.assertTrue(owner_only)
+
+    def test_other_checks_are_left_alone(self):
+        cmd = command(user_is_staff(), commands.bot_has_permissions(ban_members=True))
+
+        self.assertEqual(
+            required_permissions(cmd), (discord.Permissions.none(), False)
+        )
+
+
+class VisibleToTest(unittest.TestCase):
+    def test_filter(self):
+        entry = CommandEntry(command(commands.has_permissions(ban_members=True)))
+
+        self.assertTrue(entry.visible_to(discord.Permissions(ban_members=True), False))
+        self.assertFalse(entry.visible_to(discord.Permissions.none(), False))
+
+    def test_owner_and_hidden(self):
+        owner = CommandEntry(command(commands.is_owner()))
+        hidden = CommandEntry(command(hidden=True))
+
+        self.assertTrue(owner.visible_to(discord.Permissions.none(), True))
+        self.assertFalse(owner.visible_to(discord.Permissions.all(), False))
+        self.assertFalse(hidden.visible_to(discord.Permissions.all(), True))
+
+
+if __name__ == "__main__":
+    unittest.main()
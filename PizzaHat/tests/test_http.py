@@ -0,0 +1,110 @@
+import socket
+import unittest
+
+import aiohttp
+from aiohttp import web
+
+from core.http import HttpClient, HTTPStatusError
+
+
+def free_port() -> int:
+    with socket.socket() as sock:
+        sock.bind(("127.0.0.1", 0))
+        return sock.getsockname()[1]
+
+
+class HttpClientTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.calls = {}
+        self.failures = {}
+
+        async def handler(request: web.Request):
+            path = request.path
+            self.calls[path] = self.calls.get(path, 0) + 1
+
+            if self.failures.get(path, 0) > 0:
+                self.failures[path] -= 1
+                return web.Response(status=503)
+
+            status = int(request.query.get("status", "200"))
+            return web.json_response({"path": path}, status=status)
+
+        app = web.Application()
+        app.router.add_route("*", "/{name}", handler)
+        self.runner = web.AppRunner(app)
+        await self.runner.setup()
+
+        port = free_port()
+        await web.TCPSite(self.runner, "127.0.0.1", port).start()
+        self.base = f"http://127.0.0.1:{port}"
+        self.client = HttpClient(max_retries=2, backoff=0)
+
+    async def asyncTearDown(self):
+        await self.client.close()
+        await self.runner.cleanup()
+
+    async def test_get_retries_server_errors(self):
+        self.failures["/flaky"] = 2
+
+        with self.assertLogs("bot", "WARNING"):
+            data = await self.client.get_json(f"{self.base}/flaky")
+
+        self.assertEqual(data, {"path": "/flaky"})
+        self.assertEqual(self.calls["/flaky"], 3)
+
+        stats = self.client.stats["127.0.0.1"]
+        self.assertEqual((stats.requests, stats.retries, stats.errors), (3, 2, 2))
+        self.assertEqual(dict(stats.statuses), {503: 2, 200: 1})
+
+    async def test_gives_up_after_max_retries(self):
+        self.failures["/down"] = 10
+
+        with self.assertLogs("bot", "WARNING"):
+            response = await self.client.request("GET", f"{self.base}/down")
+
+        self.assertEqual(response.status, 503)
+        self.assertEqual(self.calls["/down"], 3)
+
+    async def test_post_is_not_retried(self):
+        self.failures["/vote"] = 1
+
+        with self.assertRaises(HTTPStatusError) as caught:
+            await self.client.post_json(f"{self.base}/vote")
+
+        self.assertEqual(caught.exception.status, 503)
+        self.assertEqual(self.calls["/vote"], 1)
+
+    async def test_post_retried_when_asked(self):
+        self.failures["/vote"] = 1
+
+        with self.assertLogs("bot", "WARNING"):
+            response = await self.client.request(
+                "POST", f"{self.base}/vote", retries=1
+            )
+
+        self.assertTrue(response.ok)
+        self.assertEqual(self.calls["/vote"], 2)
+
+    async def test_client_errors_are_not_retried(self):
+        response = await self.client.request("GET", f"{self.base}/missing?status=404")
+
+        self.assertEqual(response.status, 404)
+        self.assertEqual(self.calls["/missing"], 1)
+
+    async def test_connection_errors(self):
+        url = f"http://127.0.0.1:{free_port()}/closed"
+
+        with self.assertLogs("bot", "WARNING"):
+            with self.assertRaises(aiohttp.ClientConnectionError):
+                await self.client.get_bytes(url)
+
+        self.assertEqual(self.client.stats["127.0.0.1"].retries, 2)
+
+    def test_retry_delay(self):
+        self.assertEqual(self.client._retry_delay(0, "2"), 2.0)
+        self.assertEqual(self.client._retry_delay(0, "600"), 30.0)
+        self.assertEqual(self.client._retry_delay(3, "soon"), 0.0)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,85 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from utils.image_cache import ImageCache
+
+
+class ImageCacheTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.cache = ImageCache(self.dir.name, max_bytes=10)
+        await self.cache.load()
+
+    async def asyncTearDown(self):
+        self.dir.cleanup()
+
+    def write(self, name: str, data: bytes, mtime: float):
+        path = os.path.join(self.dir.name, name)
+        with open(path, "wb") as f:
+            f.write(data)
+
+        os.utime(path, (mtime, mtime))
+
+    async def test_put_and_get(self):
+        await self.cache.put("a", b"1234", "png")
+
+        self.assertEqual(await self.cache.get("a"), (b"1234", "png"))
+        self.assertIsNone(await self.cache.get("b"))
+        self.assertEqual(self.cache.total_bytes, 4)
+
+    async def test_evicts_least_recently_used(self):
+        await self.cache.put("a", b"1234", "png")
+        await self.cache.put("b", b"1234", "png")
+        await self.cache.get("a")
+        await self.cache.put("c", b"1234", "gif")
+
+        self.assertIsNone(await self.cache.get("b"))
+        self.assertIsNotNone(await self.cache.get("a"))
+        self.assertEqual(self.cache.total_bytes, 8)
+        self.assertEqual(sorted(os.listdir(self.dir.name)), ["a.png", "c.gif"])
+
+    async def test_load_skips_half_written_files(self):
+        self.write("old.png", b"12", 100)
+        self.write("new.gif", b"123", 200)
+        self.write("partial.png.tmp", b"12345", 300)
+
+        await self.cache.load()
+
+        self.assertEqual(list(self.cache._index), ["old", "new"])
+        self.assertEqual(self.cache.total_bytes, 5)
+        self.assertNotIn("partial.png.tmp", os.listdir(self.dir.name))
+        self.assertEqual(await self.cache.get("new"), (b"123", "gif"))
+
+    async def test_load_evicts_over_budget(self):
+        self.write("old.png", b"123456", 100)
+        self.write("new.png", b"123456", 200)
+
+        await self.cache.load()
+
+        self.assertEqual(list(self.cache._index), ["new"])
+        self.assertEqual(os.listdir(self.dir.name), ["new.png"])
+
+    async def test_concurrent_misses_share_one_call(self):
+        calls = 0
+
+        async def factory():
+            nonlocal calls
+            calls += 1
+            await asyncio.sleep(0)
+            return b"12", "png"
+
+        results = await asyncio.gather(
+            *(self.cache.get_or_create("k", factory) for _ in range(3))
+        )
+
+        self.assertEqual(calls, 1)
+        self.assertEqual(results, [(b"12", "png")] * 3)
+        self.assertEqual((self.cache.hits, self.cache.misses), (0, 3))
+        self.assertEqual(await self.cache.get_or_create("k", factory), (b"12", "png"))
+        self.assertEqual(self.cache.hits, 1)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,80 @@
+import asyncio
+import os
+import tempfile
+import unittest
+
+from core.ipc import IPC, IPCServer
+
+
+class FakeLifecycle:
+    def __init__(self):
+        self.stopped = asyncio.Event()
+
+    def shutdown(self):
+        self.stopped.set()
+
+
+class FakeBot:
+    def __init__(self):
+        self.lifecycle = FakeLifecycle()
+
+    def add_listener(self, func, name):
+        pass
+
+    def is_ready(self):
+        return True
+
+
+class ClusterTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.dir = tempfile.TemporaryDirectory()
+        self.path = os.path.join(self.dir.name, "ipc.sock")
+        self.server = IPCServer(self.path)
+        await self.server.start()
+
+    async def asyncTearDown(self):
+        await self.server.close()
+        self.dir.cleanup()
+
+    async def cluster(self, grace: float) -> IPC:
+        ipc = IPC(FakeBot(), path=self.path, reconnect_grace=grace)
+        ipc.add_handler("ping", self.pong)
+        await ipc.connect()
+
+        while 0 not in self.server.clusters:
+            await asyncio.sleep(0.01)
+
+        return ipc
+
+    async def pong(self):
+        return "pong"
+
+    async def test_gather(self):
+        ipc = await self.cluster(1)
+
+        self.assertEqual(await ipc.gather("ping"), ["pong"])
+        await ipc.close()
+
+    async def test_reconnects_to_a_restarted_launcher(self):
+        ipc = await self.cluster(5)
+
+        await self.server.close()
+        await self.server.start()
+
+        # says it is ready again, the bot already was
+        self.assertTrue(await self.server.wait_ready(0, 3))
+        self.assertFalse(ipc.bot.lifecycle.stopped.is_set())
+        await ipc.close()
+
+    async def test_shuts_down_without_a_launcher(self):
+        ipc = await self.cluster(0.1)
+
+        await self.server.close()
+
+        await asyncio.wait_for(ipc.bot.lifecycle.stopped.wait(), 3)
+        self.assertFalse(ipc.connected)
+        await ipc.close()
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,93 @@
+import unittest
+from unittest import mock
+
+import discord
+from discord.ext import commands
+from discord.ext.commands.view import StringView
+
+from core.lazy import CogManifest, CommandManifest, LazyExtension, build_manifest
+
+
+class RecordingLazy(LazyExtension):
+    def __init__(self, bot, manifest):
+        super().__init__(bot, "cogs.fake", manifest)
+        self.activated = []
+
+    async def activate(self, ctx):
+        self.activated.append(ctx)
+
+
+def make_bot() -> commands.Bot:
+    return commands.Bot(command_prefix="!", intents=discord.Intents.none())
+
+
+def make_context(bot: commands.Bot, command: commands.Command) -> commands.Context:
+    message = mock.MagicMock(spec=discord.Message)
+    ctx = commands.Context(message=message, bot=bot, view=StringView(""), prefix="!")
+    ctx.command = command
+    return ctx
+
+
+class LazyStubTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        manifest = CogManifest("Fake", None, "A cog that isn't loaded yet.")
+        manifest.commands.append(
+            CommandManifest("ping", aliases=["p"], help="Pong.", usage="")
+        )
+        manifest.commands.append(
+            CommandManifest(
+                "purge", usage="<amount>", permissions={"manage_messages": True}
+            )
+        )
+
+        self.bot = make_bot()
+        self.lazy = RecordingLazy(self.bot, manifest)
+        await self.lazy.register()
+        self.cog = self.bot.get_cog("Fake")
+        self.commands = {c.name: c for c in self.cog.get_commands()}
+
+    def test_stub_takes_no_arguments(self):
+        for command in self.commands.values():
+            self.assertEqual(command.params, {})
+            self.assertIs(command.cog, self.cog)
+
+    def test_stub_keeps_manifest_details(self):
+        ping = self.commands["ping"]
+        self.assertEqual(ping.aliases, ["p"])
+        self.assertEqual(ping.help, "Pong.")
+
+        purge = self.commands["purge"]
+        self.assertEqual(purge.usage, "<amount>")
+        self.assertTrue(purge.checks[0].__qualname__.startswith("has_permissions."))
+
+    async def test_parse_arguments(self):
+        ctx = make_context(self.bot, self.commands["ping"])
+        await self.commands["ping"]._parse_arguments(ctx)
+
+        self.assertEqual(ctx.args, [self.cog, ctx])
+        self.assertEqual(ctx.kwargs, {})
+
+    async def test_invoke_activates(self):
+        ctx = make_context(self.bot, self.commands["ping"])
+        await self.commands["ping"].invoke(ctx)
+
+        self.assertEqual(self.lazy.activated, [ctx])
+
+
+class BuildManifestTest(unittest.TestCase):
+    def test_lazy_extensions(self):
+        for extension in ("cogs.games", "cogs.images", "cogs.meta"):
+            with self.subTest(extension=extension):
+                manifest = build_manifest(extension)
+                lazy = LazyExtension(make_bot(), extension, manifest)
+                cog = lazy.placeholder()
+
+                self.assertTrue(manifest.commands)
+                self.assertEqual(len(cog.get_commands()), len(manifest.commands))
+
+                for command in cog.get_commands():
+                    self.assertEqual(command.params, {}, command.name)
+
+
+if __name__ == "__main__":
+    unittest.main()
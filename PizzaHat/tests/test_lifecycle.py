@@ -0,0 +1,53 @@
+import asyncio
+import unittest
+
+from core.lifecycle import Lifecycle, ShuttingDown
+
+
+class FakeBot:
+    def __init__(self):
+        self.shards = {}
+
+    def add_check(self, func):
+        pass
+
+
+class AcceptingTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.lifecycle = Lifecycle(FakeBot(), timeout=1)
+
+    async def test_tracks_commands_it_lets_in(self):
+        started, release = asyncio.Event(), asyncio.Event()
+
+        async def command():
+            await self.lifecycle.accepting(None)
+            started.set()
+            await release.wait()
+
+        task = asyncio.create_task(command())
+        await started.wait()
+        self.assertIn(task, self.lifecycle.work)
+
+        drain = asyncio.create_task(self.lifecycle.drain())
+        await asyncio.sleep(0)
+        self.assertFalse(drain.done())
+
+        release.set()
+        await drain
+        self.assertNotIn(task, self.lifecycle.work)
+
+    async def test_refused_commands_are_not_waited_for(self):
+        await self.lifecycle.drain()
+
+        async def command():
+            await self.lifecycle.accepting(None)
+
+        task = asyncio.create_task(command())
+        with self.assertRaises(ShuttingDown):
+            await task
+
+        self.assertEqual(self.lifecycle.work, set())
+
+
+if __name__ == "__main__":
+    unittest.main()
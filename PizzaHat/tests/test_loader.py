@@ -0,0 +1,78 @@
+import asyncio
+import contextlib
+import io
+import unittest
+from unittest import mock
+
+from core import loader
+from core.loader import ExtensionLoader, load_order
+
+
+class FakeBot:
+    def __init__(self, fail=()):
+        self.events = []
+        self.fail = set(fail)
+
+    async def load_extension(self, name):
+        self.events.append(("start", name))
+        await asyncio.sleep(0)
+
+        if name in self.fail:
+            raise RuntimeError(f"{name} broke")
+
+        self.events.append(("done", name))
+
+
+class LoadOrderTest(unittest.TestCase):
+    def test_waves(self):
+        deps = {"a": ["b"], "b": ["c"], "d": ["c"]}
+
+        self.assertEqual(
+            load_order(["a", "b", "c", "d", "e"], deps),
+            [["c", "e"], ["b", "d"], ["a"]],
+        )
+
+    def test_outside_dependencies_are_ignored(self):
+        self.assertEqual(load_order(["a", "a"], {"a": ["z"]}), [["a"]])
+
+    def test_cycle(self):
+        with self.assertRaises(RuntimeError):
+            load_order(["a", "b"], {"a": ["b"], "b": ["a"]})
+
+
+class ExtensionLoaderTest(unittest.IsolatedAsyncioTestCase):
+    async def load(self, bot, names):
+        extensions = ExtensionLoader(bot, names)
+
+        with contextlib.redirect_stdout(io.StringIO()):
+            timings = await extensions.load()
+
+        return {t.name: t for t in timings}
+
+    async def test_dependencies_finish_first(self):
+        bot = FakeBot()
+
+        with mock.patch.dict(loader.EXTENSION_DEPENDENCIES, {"json": ["csv"]}):
+            timings = await self.load(bot, ["json", "csv", "string"])
+
+        # csv and string set up together, json only once csv is done
+        self.assertEqual(bot.events[:2], [("start", "csv"), ("start", "string")])
+        self.assertLess(
+            bot.events.index(("done", "csv")), bot.events.index(("start", "json"))
+        )
+        self.assertTrue(all(t.ok for t in timings.values()))
+
+    async def test_failures_are_recorded(self):
+        bot = FakeBot(fail={"csv"})
+        timings = await self.load(bot, ["json", "csv", "no_such_extension"])
+
+        self.assertTrue(timings["json"].ok)
+        self.assertIsInstance(timings["csv"].error, RuntimeError)
+        self.assertIsInstance(timings["no_such_extension"].error, ImportError)
+
+        # an extension that didn't import isn't set up
+        self.assertNotIn(("start", "no_such_extension"), bot.events)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,97 @@
+import asyncio
+import datetime
+import itertools
+import unittest
+from types import SimpleNamespace
+
+from core.messages import RECORD_SIZE, MessageStore
+
+_ids = itertools.count(1)
+
+
+class FakeBot:
+    def add_listener(self, func, name):
+        pass
+
+
+def message(guild_id, content="hello", *, bot=False):
+    return SimpleNamespace(
+        id=next(_ids),
+        guild=SimpleNamespace(id=guild_id) if guild_id else None,
+        author=SimpleNamespace(id=1, bot=bot),
+        channel=SimpleNamespace(id=2),
+        content=content,
+        created_at=datetime.datetime.now(datetime.timezone.utc),
+    )
+
+
+def stored_size(store: MessageStore) -> int:
+    return sum(r.size for g in store.guilds.values() for r in g.index.values())
+
+
+class MessageStoreTest(unittest.TestCase):
+    def test_keeps_the_latest_per_guild(self):
+        store = MessageStore(FakeBot(), per_guild=3)
+        messages = [message(1) for _ in range(5)]
+
+        for m in messages:
+            store.add(m)
+
+        self.assertEqual(len(store), 3)
+        self.assertIsNone(store.get(1, messages[1].id))
+        self.assertIsNotNone(store.get(1, messages[4].id))
+        self.assertEqual(store.size, stored_size(store))
+
+    def test_skips_bots_and_dms(self):
+        store = MessageStore(FakeBot())
+        store.add(message(1, bot=True))
+        store.add(message(None))
+
+        self.assertEqual(len(store), 0)
+        self.assertEqual(store.size, 0)
+
+    def test_trims_the_busiest_guild(self):
+        budget = 100 * (RECORD_SIZE + 100)
+        store = MessageStore(FakeBot(), budget=budget)
+
+        quiet = [message(1) for _ in range(5)]
+        for m in quiet:
+            store.add(m)
+
+        for _ in range(200):
+            store.add(message(2))
+
+        self.assertLessEqual(store.size, budget)
+        self.assertEqual(store.size, stored_size(store))
+        self.assertEqual(len(store.guilds[1]), 5)
+        self.assertLess(len(store.guilds[2]), 200)
+
+    def test_pop_and_edit_keep_the_size(self):
+        store = MessageStore(FakeBot(), per_guild=2)
+        first, second = message(1, "a"), message(1, "b")
+        store.add(first)
+        store.add(second)
+
+        self.assertEqual(store.edit(1, second.id, "a longer message"), "b")
+        self.assertEqual(store.pop(1, first.id).content, "a")
+        self.assertEqual(store.size, stored_size(store))
+
+        # the popped record is still in the ring, and must not be freed twice
+        store.add(message(1))
+        store.add(message(1))
+        self.assertEqual(len(store), 2)
+        self.assertEqual(store.size, stored_size(store))
+
+    def test_forgets_removed_guilds(self):
+        store = MessageStore(FakeBot())
+        store.add(message(1))
+        store.add(message(2))
+
+        asyncio.run(store.on_guild_remove(SimpleNamespace(id=1)))
+
+        self.assertNotIn(1, store.guilds)
+        self.assertEqual(store.size, stored_size(store))
+
+
+if __name__ == "__main__":
+    unittest.main()
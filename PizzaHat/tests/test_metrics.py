@@ -0,0 +1,76 @@
+import unittest
+
+from core.metrics import Counter, Gauge, Histogram, Metrics
+
+
+class SamplesTest(unittest.TestCase):
+    def test_counter(self):
+        counter = Counter("hits_total", "Hits.", ["command"])
+        counter.inc("ping")
+        counter.inc("ping", amount=2)
+        counter.inc("ban")
+
+        self.assertEqual(
+            counter.samples(),
+            ['hits_total{command="ping"} 3.0', 'hits_total{command="ban"} 1.0'],
+        )
+
+    def test_label_escaping(self):
+        counter = Counter("errors_total", "Errors.", ["error"])
+        counter.inc('say "hi"\\\n')
+
+        self.assertEqual(
+            counter.samples(), ['errors_total{error="say \\"hi\\"\\\\\\n"} 1.0']
+        )
+
+    def test_gauge(self):
+        gauge = Gauge("guilds", "Guilds.", lambda: 12)
+        self.assertEqual(gauge.samples(), ["guilds 12"])
+
+        gauge = Gauge("latency", "Latency.", lambda: {("0",): 0.5}, ["shard"])
+        self.assertEqual(gauge.samples(), ['latency{shard="0"} 0.5'])
+
+    def test_histogram(self):
+        histogram = Histogram("duration", "Duration.", ["command"], buckets=(0.1, 1))
+        histogram.observe(0.05, "ping")
+        histogram.observe(0.5, "ping")
+        histogram.observe(5, "ping")
+
+        self.assertEqual(
+            histogram.samples(),
+            [
+                'duration_bucket{command="ping",le="0.1"} 1',
+                'duration_bucket{command="ping",le="1"} 2',
+                'duration_bucket{command="ping",le="+Inf"} 3',
+                'duration_sum{command="ping"} 5.55',
+                'duration_count{command="ping"} 3',
+            ],
+        )
+
+
+class RenderTest(unittest.TestCase):
+    def test_render(self):
+        metrics = Metrics()
+        metrics.metrics = []
+        metrics.add(Counter("hits_total", "Hits.")).inc()
+        metrics.add(Gauge("guilds", "Guilds.", lambda: 2))
+
+        self.assertEqual(
+            metrics.render(),
+            "# HELP hits_total Hits.\n"
+            "# TYPE hits_total counter\n"
+            "hits_total 1.0\n"
+            "# HELP guilds Guilds.\n"
+            "# TYPE guilds gauge\n"
+            "guilds 2\n",
+        )
+
+    def test_empty_series_still_declared(self):
+        rendered = Metrics().render()
+
+        self.assertIn("# TYPE pizzahat_command_duration_seconds histogram\n", rendered)
+        self.assertTrue(rendered.endswith("\n"))
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,100 @@
+import asyncio
+import itertools
+import unittest
+from unittest import mock
+
+from utils.prefetch import PrefetchPool, single
+
+
+class FakeEndpoint:
+    def __init__(self, batch=1):
+        self.batch = batch
+        self.calls = 0
+        self._ids = itertools.count()
+        self.fail = False
+
+    async def __call__(self):
+        self.calls += 1
+        if self.fail:
+            raise OSError("down")
+
+        return [next(self._ids) for _ in range(self.batch)]
+
+
+async def filled(pool: PrefetchPool, size: int):
+    # the refills run in the background, give them a moment under load
+    for _ in range(1000):
+        if len(pool) >= size:
+            return
+        await asyncio.sleep(0.001)
+
+
+class PrefetchPoolTest(unittest.IsolatedAsyncioTestCase):
+    async def test_dry_pool_fetches_directly(self):
+        endpoint = FakeEndpoint(batch=3)
+        pool = PrefetchPool("test", endpoint)
+
+        self.assertEqual(await pool.get(), 0)
+        # the rest of the batch is kept for the next callers
+        self.assertEqual(len(pool), 2)
+        self.assertEqual(await pool.get(), 1)
+        self.assertEqual((pool.hits, pool.misses), (1, 1))
+
+    async def test_no_results(self):
+        pool = PrefetchPool("test", FakeEndpoint(batch=0))
+
+        with self.assertRaises(LookupError):
+            await pool.get()
+
+    async def test_refills_in_the_background(self):
+        endpoint = FakeEndpoint()
+        pool = PrefetchPool("test", endpoint, size=6, low_water=3, concurrency=4)
+        pool.start()
+
+        await filled(pool, 6)
+        self.assertEqual(len(pool), 6)
+        self.assertEqual(endpoint.calls, 6)
+
+        for _ in range(4):
+            await pool.get()
+
+        # dropped below the low watermark, so it tops back up
+        await filled(pool, 6)
+        self.assertEqual(len(pool), 6)
+        self.assertEqual(pool.hits, 4)
+        pool.stop()
+
+    async def test_drops_stale_results(self):
+        pool = PrefetchPool("test", single(FakeEndpoint()), max_age=10)
+
+        with mock.patch("time.monotonic", return_value=100.0):
+            pool._add(["old"])
+
+        with mock.patch("time.monotonic", return_value=105.0):
+            pool._add(["fresh"])
+
+        with mock.patch("time.monotonic", return_value=112.0):
+            self.assertEqual(await pool.get(), "fresh")
+
+    async def test_backs_off_when_the_endpoint_fails(self):
+        for endpoint in (FakeEndpoint(), FakeEndpoint(batch=0)):
+            endpoint.fail = endpoint.batch == 1
+            pool = PrefetchPool("test", endpoint, size=2, concurrency=1)
+            delays = []
+
+            async def sleep(delay):
+                delays.append(delay)
+                if len(delays) == 3:
+                    raise asyncio.CancelledError
+
+            with mock.patch("asyncio.sleep", sleep), self.assertLogs("bot"):
+                pool.start()
+                with self.assertRaises(asyncio.CancelledError):
+                    await pool._task
+
+            self.assertEqual(delays, [2, 4, 8])
+            self.assertEqual(endpoint.calls, 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,102 @@
+import asyncio
+import time
+import unittest
+from types import SimpleNamespace
+from unittest import mock
+
+import discord
+
+from utils import reactions
+from utils.reactions import ReactionBucket, seed_reactions
+
+
+def http_error(cls, status):
+    return cls(SimpleNamespace(status=status, reason=""), "")
+
+
+class FakeMessage:
+    def __init__(self, channel_id=1, fail=None):
+        self.id = 10
+        self.channel = SimpleNamespace(id=channel_id)
+        self.added = []
+        self.fail = fail or {}
+
+    async def add_reaction(self, emoji):
+        error = self.fail.get(emoji)
+        if error is not None:
+            raise error
+
+        self.added.append((emoji, time.monotonic()))
+
+
+class ReactionBucketTest(unittest.TestCase):
+    def test_spaces_out_slots(self):
+        bucket = ReactionBucket(10)
+
+        with mock.patch("time.monotonic", return_value=100.0):
+            waits = [bucket.reserve() for _ in range(3)]
+            self.assertFalse(bucket.idle)
+
+        self.assertEqual(waits, [0.0, 10.0, 20.0])
+
+        with mock.patch("time.monotonic", return_value=130.0):
+            self.assertTrue(bucket.idle)
+            self.assertEqual(bucket.reserve(), 0.0)
+
+
+class SeedTest(unittest.IsolatedAsyncioTestCase):
+    def use_bucket(self, channel_id, interval):
+        reactions._buckets[channel_id] = ReactionBucket(interval)
+
+    async def test_in_order_and_paced(self):
+        self.use_bucket(1, 0.02)
+        message = FakeMessage()
+
+        await seed_reactions(message, ["a", "b", "c"])
+
+        self.assertEqual([emoji for emoji, _ in message.added], ["a", "b", "c"])
+        times = [at for _, at in message.added]
+        gaps = [b - a for a, b in zip(times, times[1:])]
+        self.assertTrue(all(gap >= 0.015 for gap in gaps), gaps)
+
+        # forgotten once its last slot has passed
+        self.assertIn(1, reactions._buckets)
+        await asyncio.sleep(0.03)
+        self.assertNotIn(1, reactions._buckets)
+
+    async def test_channels_share_a_bucket(self):
+        self.use_bucket(2, 0.02)
+        first, second = FakeMessage(2), FakeMessage(2)
+
+        await asyncio.gather(
+            seed_reactions(first, ["a", "b"]), seed_reactions(second, ["c", "d"])
+        )
+
+        times = sorted(at for m in (first, second) for _, at in m.added)
+        self.assertGreaterEqual(times[-1] - times[0], 0.05)
+
+    async def test_errors(self):
+        self.use_bucket(3, 0)
+        failed = FakeMessage(3, fail={"a": http_error(discord.HTTPException, 400)})
+        deleted = FakeMessage(3, fail={"b": http_error(discord.NotFound, 404)})
+
+        with self.assertLogs("bot", "WARNING"):
+            await seed_reactions(failed, ["a", "b"])
+
+        await seed_reactions(deleted, ["a", "b", "c"])
+
+        self.assertEqual([e for e, _ in failed.added], ["b"])
+        self.assertEqual([e for e, _ in deleted.added], ["a"])
+
+    async def test_drain_waits_for_seeding(self):
+        self.use_bucket(4, 0.01)
+        message = FakeMessage(4)
+
+        seed_reactions(message, ["a", "b", "c"])
+        await reactions.drain()
+
+        self.assertEqual(len(message.added), 3)
+
+
+if __name__ == "__main__":
+    unittest.main()
@@ -0,0 +1,53 @@
+import unittest
+
+from core.shards import parse_shard_ids, shard_config
+from launcher import shard_ranges
+
+
+class ParseShardIdsTest(unittest.TestCase):
+    def test_ranges_and_single_ids(self):
+        self.assertEqual(parse_shard_ids("0-3,8,10-11"), [0, 1, 2, 3, 8, 10, 11])
+
+    def test_overlaps_and_spaces(self):
+        self.assertEqual(parse_shard_ids(" 2-4 , 3, 1,"), [1, 2, 3, 4])
+
+    def test_empty(self):
+        self.assertIsNone(parse_shard_ids(""))
+        self.assertIsNone(parse_shard_ids(" , "))
+
+    def test_not_a_number(self):
+        with self.assertRaises(ValueError):
+            parse_shard_ids("a-b")
+
+
+class ShardConfigTest(unittest.TestCase):
+    def test_unset(self):
+        self.assertEqual(
+            shard_config(None, None), {"shard_count": None, "shard_ids": None}
+        )
+
+    def test_ids_need_a_count(self):
+        with self.assertRaises(ValueError):
+            shard_config(None, [0, 1])
+
+    def test_ids_past_the_count(self):
+        with self.assertRaises(ValueError):
+            shard_config(4, [3, 4])
+
+        self.assertEqual(shard_config(4, [2, 3])["shard_ids"], [2, 3])
+
+
+class ShardRangesTest(unittest.TestCase):
+    def test_even_split(self):
+        self.assertEqual(shard_ranges(6, 3), [[0, 1], [2, 3], [4, 5]])
+
+    def test_remainder_goes_first(self):
+        self.assertEqual(shard_ranges(7, 3), [[0, 1, 2], [3, 4], [5, 6]])
+
+    def test_more_clusters_than_shards(self):
+        self.assertEqual(shard_ranges(2, 4), [[0], [1]])
+        self.assertEqual(shard_ranges(3, 0), [[0, 1, 2]])
+
+
+if __name__ == "__main__":
+    unittest.main()
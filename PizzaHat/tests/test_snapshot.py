@@ -0,0 +1,176 @@
+import asyncio
+import unittest
+from typing import List, Tuple
+
+from core import queries as q
+from core.queries import SCHEMA, SNAPSHOT_TABLES, Queries
+from core.snapshot import Snapshot
+
+
+class FakePool:
+    """Records writes, failing the ones listed in `fail` with the given error."""
+
+    def __init__(self):
+        self.executed: List[Tuple] = []
+        self.fail = {}
+        self.healthy = True
+
+    async def execute(self, query, *args, **kwargs):
+        error = self.fail.pop(len(self.executed), None)
+        if error is not None:
+            raise error
+
+        self.executed.append((query, *args))
+        return "INSERT 0 1"
+
+    async def fetch(self, query, *args, **kwargs):
+        return []
+
+
+class FakeBot:
+    def __init__(self, pool):
+        self.db = pool
+
+
+def make_snapshot() -> Snapshot:
+    return Snapshot(":memory:", {t: SCHEMA[t] for t in SNAPSHOT_TABLES})
+
+
+class ReplayTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.snapshot = make_snapshot()
+        self.pool = FakePool()
+
+    async def asyncTearDown(self):
+        self.snapshot.close()
+
+    async def test_record_applies_locally_and_journals(self):
+        await self.snapshot.record(q.SET_STAFF_ROLE, 1, 10)
+
+        role = await self.snapshot.fetch("fetchval", q.STAFF_ROLE, 1)
+        self.assertEqual(role, 10)
+        self.assertEqual(await self.snapshot.pending(), 1)
+
+    async def test_replays_in_order(self):
+        await self.snapshot.record(q.SET_MODLOG_CHANNEL, 1, 100)
+        await self.snapshot.record(q.CREATE_TAG, 1, "hi", "hello", 5)
+        await self.snapshot.record(q.DELETE_MODLOG, 1)
+
+        replayed = await self.snapshot.replay(self.pool, (OSError,))
+
+        self.assertEqual(replayed, 3)
+        self.assertEqual(
+            self.pool.executed,
+            [
+                (q.SET_MODLOG_CHANNEL, 1, 100),
+                (q.CREATE_TAG, 1, "hi", "hello", 5),
+                (q.DELETE_MODLOG, 1),
+            ],
+        )
+        self.assertEqual(await self.snapshot.pending(), 0)
+
+    async def test_connection_error_keeps_the_rest(self):
+        await self.snapshot.record(q.SET_STAFF_ROLE, 1, 10)
+        await self.snapshot.record(q.SET_STAFF_ROLE, 1, 20)
+        self.pool.fail[1] = OSError("refused")
+
+        self.assertEqual(await self.snapshot.replay(self.pool, (OSError,)), 1)
+        self.assertEqual(await self.snapshot.pending(), 1)
+
+        self.assertEqual(await self.snapshot.replay(self.pool, (OSError,)), 1)
+        self.assertEqual(self.pool.executed[-1], (q.SET_STAFF_ROLE, 1, 20))
+        self.assertEqual(await self.snapshot.pending(), 0)
+
+    async def test_rejected_write_is_dropped(self):
+        await self.snapshot.record(q.SET_STAFF_ROLE, 1, 10)
+        await self.snapshot.record(q.SET_STAFF_ROLE, 1, 20)
+        self.pool.fail[0] = ValueError("rejected")
+
+        with self.assertLogs("bot", "WARNING"):
+            replayed = await self.snapshot.replay(self.pool, (OSError,))
+
+        self.assertEqual(replayed, 1)
+        self.assertEqual(await self.snapshot.pending(), 0)
+
+    async def test_writes_are_safe_to_repeat(self):
+        writes = [
+            (q.SET_MODLOG_CHANNEL, 1, 100),
+            (q.SET_STAFF_ROLE, 1, 10),
+            (q.ENABLE_AUTOMOD, 1),
+            (q.CREATE_TAG, 1, "hi", "hello", 5),
+            (q.EDIT_TAG, 1, "hi", "edited"),
+        ]
+
+        for _ in range(2):
+            for query, *args in writes:
+                await self.snapshot.apply(query, *args)
+
+        tags = await self.snapshot.fetch("fetch", q.TAG, 1, "hi")
+        self.assertEqual([tuple(t) for t in tags], [("hi", "edited", 5)])
+        self.assertEqual(await self.snapshot.fetch("fetchval", q.STAFF_ROLE, 1), 10)
+        self.assertEqual(
+            await self.snapshot.fetch("fetchval", q.AUTOMOD_ENABLED, 1), True
+        )
+
+    async def test_refresh_keeps_writes_made_while_fetching(self):
+        fetching, release = asyncio.Event(), asyncio.Event()
+        rows = {"staff_role": [(1, 10)]}
+
+        async def fetch(query, *args, **kwargs):
+            fetching.set()
+            await release.wait()
+            return rows.get(query.rsplit(" ", 1)[-1], [])
+
+        self.pool.fetch = fetch
+        refresh = asyncio.create_task(self.snapshot.refresh(self.pool))
+        await fetching.wait()
+
+        # taken by Postgres after the rows above were read
+        await self.snapshot.apply(q.SET_STAFF_ROLE, 1, 20)
+        release.set()
+        await refresh
+
+        self.assertEqual(await self.snapshot.fetch("fetchval", q.STAFF_ROLE, 1), 20)
+
+        # and the next refresh doesn't replay it again
+        rows["staff_role"] = [(1, 30)]
+        await self.snapshot.refresh(self.pool)
+        self.assertEqual(await self.snapshot.fetch("fetchval", q.STAFF_ROLE, 1), 30)
+
+
+class QueriesJournalTest(unittest.IsolatedAsyncioTestCase):
+    async def asyncSetUp(self):
+        self.pool = FakePool()
+        self.queries = Queries(FakeBot(self.pool))
+        self.queries.snapshot = make_snapshot()
+
+    async def asyncTearDown(self):
+        self.queries.stop_sync()
+
+    async def test_failed_write_is_journalled_then_replayed(self):
+        self.pool.fail[0] = OSError("refused")
+        await self.queries.set_staff_role(1, 10)
+
+        # queued behind the journal, so replay keeps them in order
+        await self.queries.set_staff_role(1, 20)
+        self.assertEqual(self.pool.executed, [])
+        self.assertEqual(await self.queries.snapshot.pending(), 2)
+
+        await self.queries.sync()
+
+        self.assertEqual(
+            self.pool.executed,
+            [(q.SET_STAFF_ROLE, 1, 10), (q.SET_STAFF_ROLE, 1, 20)],
+        )
+        self.assertEqual(await self.queries.snapshot.pending(), 0)
+
+    async def test_degraded_writes_skip_postgres(self):
+        self.pool.healthy = False
+        await self.queries.set_modlog_channel(1, 100)
+
+        self.assertEqual(self.pool.executed, [])
+        self.assertEqual(await self.queries.modlog_channel(1), 100)
+
+
+if __name__ == "__main__":
+    unittest.main()
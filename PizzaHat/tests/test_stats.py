@@ -0,0 +1,111 @@
+import asyncio
+import unittest
+from types import SimpleNamespace
+
+from discord import ChannelType
+
+from core.stats import StatsTracker
+
+
+class FakeBot:
+    def __init__(self, guilds):
+        self.guilds = guilds
+
+    def add_listener(self, func, name):
+        pass
+
+
+def guild(guild_id, shard_id=0, *, humans=2, bots=1, channels=(ChannelType.text,)):
+    members = [SimpleNamespace(bot=False)] * humans + [SimpleNamespace(bot=True)] * bots
+    g = SimpleNamespace(
+        id=guild_id,
+        shard_id=shard_id,
+        unavailable=False,
+        chunked=True,
+        members=members,
+        member_count=len(members),
+    )
+    g.channels = [SimpleNamespace(guild=g, type=t) for t in channels]
+    return g
+
+
+def run(coro):
+    return asyncio.run(coro)
+
+
+class StatsTrackerTest(unittest.TestCase):
+    def setUp(self):
+        self.guilds = [
+            guild(1, channels=(ChannelType.text, ChannelType.voice)),
+            guild(2, 1, humans=5, bots=0, channels=(ChannelType.news,)),
+        ]
+        self.stats = StatsTracker(FakeBot(self.guilds))
+        run(self.stats.on_ready())
+
+    def test_rebuild(self):
+        self.assertEqual(self.stats.guild_count, 2)
+        self.assertEqual(self.stats.members, 8)
+        self.assertEqual(self.stats.text_channels, 2)
+        self.assertEqual(self.stats.voice_channels, 1)
+        self.assertEqual(self.stats.shard(1).members, 5)
+        self.assertEqual(self.stats.shard(7).guilds, 0)
+
+        first = self.stats.guild(self.guilds[0])
+        self.assertEqual((first.humans, first.bots), (2, 1))
+
+    def test_guild_join_and_remove(self):
+        joined = guild(3, 1, humans=1, bots=0)
+        run(self.stats.on_guild_join(joined))
+
+        self.assertEqual(self.stats.shard(1).guilds, 2)
+        self.assertEqual(self.stats.members, 9)
+
+        run(self.stats.on_guild_remove(self.guilds[1]))
+        run(self.stats.on_guild_unavailable(joined))
+
+        self.assertEqual(self.stats.guild_count, 1)
+        self.assertEqual(self.stats.members, 3)
+        self.assertEqual(self.stats.text_channels, 1)
+        self.assertEqual(self.stats.shard(1).guilds, 0)
+
+    def test_channels(self):
+        text, voice = self.guilds[0].channels
+        run(self.stats.on_guild_channel_delete(voice))
+        created = SimpleNamespace(guild=text.guild, type=ChannelType.text)
+        run(self.stats.on_guild_channel_create(created))
+
+        self.assertEqual(self.stats.voice_channels, 0)
+        self.assertEqual(self.stats.text_channels, 3)
+
+    def test_channel_type_change(self):
+        text = self.guilds[0].channels[0]
+        voice = SimpleNamespace(guild=text.guild, type=ChannelType.voice)
+
+        run(self.stats.on_guild_channel_update(text, voice))
+
+        self.assertEqual(self.stats.text_channels, 1)
+        self.assertEqual(self.stats.voice_channels, 2)
+        channels = self.stats.guild(self.guilds[0]).channels
+        self.assertEqual(channels[ChannelType.voice], 2)
+
+        # a rename leaves the counts alone
+        run(self.stats.on_guild_channel_update(voice, voice))
+        self.assertEqual(self.stats.voice_channels, 2)
+
+    def test_members(self):
+        run(self.stats.on_member_join(SimpleNamespace(guild=self.guilds[0], bot=True)))
+        run(
+            self.stats.on_raw_member_remove(
+                SimpleNamespace(guild_id=2, user=SimpleNamespace(bot=False))
+            )
+        )
+
+        first, second = (self.stats.guild(g) for g in self.guilds)
+        self.assertEqual((first.members, first.humans, first.bots), (4, 2, 2))
+        self.assertEqual((second.members, second.humans), (4, 4))
+        self.assertEqual(self.stats.members, 8)
+        self.assertEqual(self.stats.shard(0).members, 4)
+
+
+if __name__ == "__main__":
+    unittest.main()
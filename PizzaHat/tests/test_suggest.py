@@ -0,0 +1,66 @@
+import unittest
+
+import discord
+from discord.ext import commands
+
+from core.suggest import CommandIndex, trigrams
+
+
+async def callback(ctx):
+    pass
+
+
+def make_index(**kwargs) -> CommandIndex:
+    bot = commands.Bot(command_prefix="!", intents=discord.Intents.none())
+    bot.remove_command("help")
+
+    bot.add_command(commands.Command(callback, name="ban", aliases=["hammer"]))
+    bot.add_command(commands.Command(callback, name="kick"))
+    bot.add_command(commands.Command(callback, name="serverinfo", aliases=["si"]))
+    bot.add_command(commands.Command(callback, name="secret", hidden=True))
+
+    tag = commands.Group(callback, name="tag")
+    tag.add_command(commands.Command(callback, name="create"))
+    bot.add_command(tag)
+
+    index = CommandIndex(bot, **kwargs)
+    index.rebuild()
+    return index
+
+
+class TrigramsTest(unittest.TestCase):
+    def test_padded_like_pg_trgm(self):
+        self.assertEqual(trigrams("Ban"), {"  b", " ba", "ban", "an "})
+
+
+class SuggestTest(unittest.TestCase):
+    def setUp(self):
+        self.index = make_index()
+
+    def test_typo(self):
+        self.assertEqual(self.index.suggest("serverinf")[0], "serverinfo")
+        self.assertEqual(self.index.suggest("bna"), [])
+        self.assertEqual(self.index.suggest("kik")[0], "kick")
+
+    def test_alias_suggests_its_command(self):
+        self.assertEqual(self.index.suggest("hamer"), ["ban"])
+
+    def test_skips_hidden_and_subcommands(self):
+        self.assertNotIn("secret", self.index.names)
+        self.assertNotIn("create", self.index.names)
+        self.assertEqual(self.index.suggest("secrt"), [])
+
+    def test_limit_and_order(self):
+        # shares "an " with ban and "  k" with kick, ban's is the closer match
+        index = make_index(threshold=0.0)
+
+        self.assertEqual(index.suggest("kan"), ["ban", "kick"])
+        self.assertEqual(index.suggest("kan", limit=1), ["ban"])
+
+    def test_empty_or_long_query(self):
+        self.assertEqual(self.index.suggest(""), [])
+        self.assertEqual(self.index.suggest("serverinfo" * 4), [])
+
+
+if __name__ == "__main__":
+    unittest.main()
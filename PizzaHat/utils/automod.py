@@ -35,12 +35,12 @@ class AutoMod(Cog):
         )
 
     async def get_logs_channel(self, guild_id: int):
-        data = await self.bot.db.fetchval("SELECT channel_id FROM modlogs WHERE guild_id=$1", guild_id)  # type: ignore
+        data = await self.bot.queries.modlog_channel(guild_id)
         if data:
             return self.bot.get_channel(data)
 
     async def check_if_am_is_enabled(self, guild_id: int):
-        data = await self.bot.db.fetchval("SELECT enabled FROM automod WHERE guild_id=$1", guild_id)  # type: ignore
+        data = await self.bot.queries.automod_enabled(guild_id)
         if data:
             return data
 
@@ -0,0 +1,114 @@
+import asyncio
+import logging
+import os
+from collections import OrderedDict
+from typing import Dict, Optional, Set, Tuple
+
+import discord
+from core.http import HttpClient
+
+from .image_cache import ImageCache
+
+logger = logging.getLogger("bot")
+
+AVATAR_CACHE_MAX_BYTES = int(os.getenv("AVATAR_CACHE_MAX_MB", "32")) * 1024**2
+AVATAR_DISK_DIR = os.getenv("AVATAR_CACHE_DIR", ".cache/avatars")
+AVATAR_DISK_MAX_BYTES = int(os.getenv("AVATAR_DISK_MAX_MB", "256")) * 1024**2
+
+# (avatar hash, size, format)
+AvatarKey = Tuple[str, int, str]
+
+
+class AvatarCache:
+    """
+    Avatar bytes keyed by avatar hash, size and format.
+
+    Discord never reuses an avatar hash for different image data, so entries
+    never go stale. Recently used avatars live in memory under a byte
+    budget; whatever falls out of memory spills to a disk tier.
+    """
+
+    def __init__(
+        self,
+        http: HttpClient,
+        *,
+        max_bytes: int = AVATAR_CACHE_MAX_BYTES,
+        disk: Optional[ImageCache] = None,
+    ):
+        self.http = http
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self.disk = disk or ImageCache(AVATAR_DISK_DIR, AVATAR_DISK_MAX_BYTES)
+        self._memory: "OrderedDict[AvatarKey, bytes]" = OrderedDict()
+        self._inflight: Dict[AvatarKey, "asyncio.Task[bytes]"] = {}
+        self._spills: Set[asyncio.Task] = set()
+
+        self.memory_hits = 0
+        self.disk_hits = 0
+        self.misses = 0
+
+    async def load(self):
+        await self.disk.load()
+
+    async def flush(self):
+        """Waits for avatars still being written to disk."""
+
+        if self._spills:
+            await asyncio.wait(set(self._spills))
+
+    @staticmethod
+    def _disk_key(key: AvatarKey) -> str:
+        avatar_hash, size, fmt = key
+        return ImageCache.make_key("avatar", avatar_hash, size=size, format=fmt)
+
+    def _remember(self, key: AvatarKey, data: bytes):
+        self._memory[key] = data
+        self.total_bytes += len(data)
+
+        while self.total_bytes > self.max_bytes and len(self._memory) > 1:
+            old_key, old_data = self._memory.popitem(last=False)
+            self.total_bytes -= len(old_data)
+            self._spill(old_key, old_data)
+
+    def _spill(self, key: AvatarKey, data: bytes):
+        task = asyncio.create_task(self.disk.put(self._disk_key(key), data, key[2]))
+        self._spills.add(task)
+        task.add_done_callback(self._spills.discard)
+
+    async def _load(self, key: AvatarKey, url: str) -> bytes:
+        try:
+            cached = await self.disk.get(self._disk_key(key))
+
+            if cached is not None:
+                self.disk_hits += 1
+                data = cached[0]
+
+            else:
+                self.misses += 1
+                data = await self.http.get_bytes(url)
+
+            self._remember(key, data)
+            return data
+
+        finally:
+            self._inflight.pop(key, None)
+
+    async def fetch(self, asset: discord.Asset, size: int, fmt: str = "png") -> bytes:
+        """Returns the avatar's bytes at the given size, downloading it at most once."""
+
+        key = (asset.key, size, fmt)
+        data = self._memory.get(key)
+
+        if data is not None:
+            self.memory_hits += 1
+            self._memory.move_to_end(key)
+            return data
+
+        task = self._inflight.get(key)
+
+        if task is None:
+            url = str(asset.with_format(fmt).with_size(size))  # type: ignore
+            task = asyncio.create_task(self._load(key, url))
+            self._inflight[key] = task
+
+        return await asyncio.shield(task)
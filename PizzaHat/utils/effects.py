@@ -0,0 +1,177 @@
+import asyncio
+import os
+from concurrent.futures import ProcessPoolExecutor
+from io import BytesIO
+from typing import Callable, Dict, List, Optional, Tuple
+
+import numpy as np
+from PIL import Image, ImageDraw, ImageFont
+
+Rendered = Tuple[bytes, str]
+
+# Avatars are scaled to this size before any effect runs.
+WORK_SIZE = 256
+
+
+def _decode(data: bytes, size: int = WORK_SIZE) -> np.ndarray:
+    with Image.open(BytesIO(data)) as img:
+        img = img.convert("RGBA")
+        if img.size != (size, size):
+            img = img.resize((size, size), Image.Resampling.BILINEAR)
+
+        return np.asarray(img, dtype=np.uint8)
+
+
+def _encode(arr: np.ndarray, fmt: str = "png", **params) -> bytes:
+    buf = BytesIO()
+    mode = "RGBA" if arr.shape[-1] == 4 else "RGB"
+    Image.fromarray(arr, mode).save(buf, format=fmt.upper(), **params)
+    return buf.getvalue()
+
+
+def _clip(arr: np.ndarray) -> np.ndarray:
+    return np.clip(arr, 0, 255).astype(np.uint8)
+
+
+def _luma(rgb: np.ndarray) -> np.ndarray:
+    return rgb @ np.array([0.299, 0.587, 0.114], dtype=np.float32)
+
+
+def pixelate(data: bytes, blocks: int = 32) -> Rendered:
+    arr = _decode(data)
+    size = arr.shape[0]
+    block = size // blocks
+
+    # average every block x block tile, then blow the tiles back up
+    tiles = arr.reshape(blocks, block, blocks, block, 4).mean(axis=(1, 3))
+    out = np.repeat(np.repeat(tiles, block, axis=0), block, axis=1)
+    return _encode(_clip(out)), "png"
+
+
+def invert(data: bytes) -> Rendered:
+    arr = _decode(data).copy()
+    arr[..., :3] = 255 - arr[..., :3]
+    return _encode(arr), "png"
+
+
+def grayscale(data: bytes) -> Rendered:
+    arr = _decode(data)
+    gray = _luma(arr[..., :3].astype(np.float32))
+    out = np.dstack([gray, gray, gray, arr[..., 3]])
+    return _encode(_clip(out)), "png"
+
+
+def deepfry(data: bytes) -> Rendered:
+    arr = _decode(data)
+    rgb = arr[..., :3].astype(np.float32)
+    rng = np.random.default_rng()
+
+    gray = _luma(rgb)[..., None]
+    rgb = gray + (rgb - gray) * 2.5  # saturation
+    rgb = (rgb - 128) * 1.6 + 128  # contrast
+    rgb *= np.array([1.3, 1.05, 0.75], dtype=np.float32)  # orange tint
+    rgb += rng.normal(0, 20, rgb.shape)  # grain
+    rgb = (_clip(rgb) // 48) * 48  # posterize
+
+    # a very low quality JPEG pass adds the blocky artifacts
+    return _encode(rgb, "jpeg", quality=8), "jpeg"
+
+
+def _banner_text(width: int, height: int, text: str) -> np.ndarray:
+    banner = Image.new("RGB", (width, height), (228, 28, 28))
+    draw = ImageDraw.Draw(banner)
+
+    try:
+        font = ImageFont.load_default(size=int(height * 0.7))
+
+    except TypeError:  # Pillow < 10.1 has no sized default font
+        font = ImageFont.load_default()
+
+    draw.text((width // 2, height // 2), text, font=font, fill="white", anchor="mm")
+    return np.asarray(banner, dtype=np.uint8)
+
+
+def triggered(data: bytes, frames: int = 10, shake: int = 12) -> Rendered:
+    arr = _decode(data, WORK_SIZE + 2 * shake)[..., :3].astype(np.float32)
+    rng = np.random.default_rng()
+
+    # red wash over the whole avatar
+    red = np.array([255, 0, 0], dtype=np.float32)
+    tinted = _clip(arr * 0.7 + red * 0.3)
+
+    banner_h = WORK_SIZE // 5
+    banner = _banner_text(WORK_SIZE, banner_h, "TRIGGERED")
+
+    # each frame is the tinted avatar viewed through a randomly offset window
+    offsets = rng.integers(0, 2 * shake + 1, size=(frames, 2))
+    shots: List[Image.Image] = []
+
+    for dy, dx in offsets:
+        frame = tinted[dy : dy + WORK_SIZE, dx : dx + WORK_SIZE].copy()
+        frame[-banner_h:] = banner
+        shots.append(Image.fromarray(frame, "RGB"))
+
+    buf = BytesIO()
+    shots[0].save(
+        buf,
+        format="GIF",
+        save_all=True,
+        append_images=shots[1:],
+        duration=40,
+        loop=0,
+        optimize=False,
+    )
+    return buf.getvalue(), "gif"
+
+
+# Local stand-ins for avatar effects, used when dagpi is slow or down.
+EFFECTS: Dict[str, Callable[[bytes], Rendered]] = {
+    "pixelate": pixelate,
+    "invert": invert,
+    "grayscale": grayscale,
+    "deepfry": deepfry,
+    "triggered": triggered,
+}
+
+# Avatar size to download for each effect, the smallest that still looks
+# right after the effect has scaled it to WORK_SIZE.
+SOURCE_SIZES: Dict[str, int] = {
+    "triggered": 512,  # the shake crops a window out of a slightly larger image
+}
+
+_pool: Optional[ProcessPoolExecutor] = None
+
+
+def source_size(effect: str) -> int:
+    return SOURCE_SIZES.get(effect, WORK_SIZE)
+
+
+def _run(effect: str, data: bytes) -> Rendered:
+    return EFFECTS[effect](data)
+
+
+def get_pool() -> ProcessPoolExecutor:
+    global _pool
+
+    if _pool is None:
+        _pool = ProcessPoolExecutor(max_workers=min(2, os.cpu_count() or 1))
+
+    return _pool
+
+
+def shutdown_pool():
+    global _pool
+
+    if _pool is not None:
+        _pool.shutdown(wait=False, cancel_futures=True)
+        _pool = None
+
+
+async def render(effect: str, data: bytes) -> Rendered:
+    """Runs an effect on image bytes in the process pool."""
+
+    if effect not in EFFECTS:
+        raise KeyError(f"Unknown effect: {effect}")
+
+    loop = asyncio.get_running_loop()
+    return await loop.run_in_executor(get_pool(), _run, effect, data)
@@ -1,4 +1,5 @@
 import datetime
+import io
 import os
 
 import discord
@@ -7,6 +8,7 @@ from humanfriendly import format_timespan
 
 from core.bot import PizzaHat
 from core.cog import Cog
+from utils.formats import plural
 
 load_dotenv()
 
@@ -14,6 +16,14 @@ LOG_CHANNEL = 980151632199299092
 DLIST_TOKEN = os.getenv("DLIST_AUTH")
 
 
+def _clip(text: str, limit: int = 1024) -> str:
+    # embed field values can't be empty or longer than 1024 characters
+    if not text:
+        return "*Empty*"
+
+    return text if len(text) <= limit else text[: limit - 3] + "..."
+
+
 class Events(Cog):
     """Events cog"""
 
@@ -44,37 +54,17 @@ class Events(Cog):
     #     except Exception as e:
     #         print(e)
 
-    @Cog.listener()
-    async def on_ready(self):
-        await self.bot.db.execute(  # type: ignore
-            """CREATE TABLE IF NOT EXISTS warnlogs
-            (guild_id BIGINT, user_id BIGINT, warns TEXT[], time NUMERIC[])"""
-        )
-
-        await self.bot.db.execute(  # type: ignore
-            """CREATE TABLE IF NOT EXISTS modlogs
-            (guild_id BIGINT PRIMARY KEY, channel_id BIGINT)"""
-        )
-
-        await self.bot.db.execute(  # type: ignore
-            """CREATE TABLE IF NOT EXISTS automod
-            (guild_id BIGINT PRIMARY KEY, enabled BOOL)"""
-        )
-
-        await self.bot.db.execute(  # type: ignore
-            """CREATE TABLE IF NOT EXISTS staff_role
-            (guild_id BIGINT PRIMARY KEY, role_id BIGINT)"""
-        )
+    @property
+    def log_channel(self) -> discord.PartialMessageable:
+        # the support server is on one cluster's shards, the others can't
+        # look the channel up but can still send to it
+        return self.bot.get_partial_messageable(LOG_CHANNEL)
 
-        await self.bot.db.execute(  # type: ignore
-            """CREATE TABLE IF NOT EXISTS tags
-            (guild_id BIGINT, tag_name TEXT, content TEXT, creator BIGINT)"""
-        )
+    async def total_guilds(self) -> int:
+        return sum(c["guilds"] for c in await self.bot.ipc.gather("stats"))
 
     async def get_logs_channel(self, guild_id):
-        data = await self.bot.db.fetchval(
-            "SELECT channel_id FROM modlogs WHERE guild_id=$1", guild_id
-        )  # type: ignore
+        data = await self.bot.queries.modlog_channel(guild_id)
         if data:
             return self.bot.get_channel(data)
 
@@ -100,52 +90,155 @@ class Events(Cog):
 
                 await msg.channel.send(embed=em)
 
+    def _message_author(self, guild_id: int, author_id: int):
+        guild = self.bot.get_guild(guild_id)
+        member = guild.get_member(author_id) if guild else None
+        return member or self.bot.get_user(author_id)
+
+    def _channel_name(self, channel_id: int) -> str:
+        channel = self.bot.get_channel(channel_id)
+        return f"#{channel}" if channel else f"<#{channel_id}>"
+
     @Cog.listener()
-    async def on_message_edit(self, before, after):
-        channel = await self.get_logs_channel(before.guild.id)
+    async def on_raw_message_edit(self, payload: discord.RawMessageUpdateEvent):
+        # embed and pin updates come through here without any content
+        if payload.guild_id is None or "content" not in payload.data:
+            return
 
-        if not channel:
+        after = payload.data["content"]
+        before = self.bot.message_store.edit(
+            payload.guild_id, payload.message_id, after
+        )
+
+        if before is None and payload.cached_message is not None:
+            before = payload.cached_message.content
+
+        if before == after:
             return
 
-        if before.author.bot:
+        author = payload.data.get("author")
+        if author is None or author.get("bot"):
             return
 
-        if before.content == after.content:
+        channel = await self.get_logs_channel(payload.guild_id)
+        if not channel:
             return
 
         em = discord.Embed(
-            title=f"Message edited in #{before.channel}",
+            title=f"Message edited in {self._channel_name(payload.channel_id)}",
             color=self.bot.success,
-            timestamp=before.created_at,
+            timestamp=discord.utils.snowflake_time(payload.message_id),
+        )
+        em.add_field(
+            name="- Before",
+            value=_clip(before) if before is not None else "*Not cached*",
+            inline=False,
         )
-        em.add_field(name="- Before", value=before.content, inline=False)
-        em.add_field(name="+ After", value=after.content, inline=False)
-        em.set_author(name=before.author, icon_url=before.author.avatar.url)
-        em.set_footer(text=f"User ID: {before.author.id}")
+        em.add_field(name="+ After", value=_clip(after), inline=False)
+
+        user = self._message_author(payload.guild_id, int(author["id"]))
+        if user is not None:
+            em.set_author(name=user, icon_url=user.display_avatar.url)
+
+        em.set_footer(text=f"User ID: {author['id']}")
 
         await channel.send(embed=em)  # type: ignore
 
     @Cog.listener()
-    async def on_message_delete(self, msg):
-        channel = await self.get_logs_channel(msg.guild.id)
+    async def on_raw_message_delete(self, payload: discord.RawMessageDeleteEvent):
+        if payload.guild_id is None:
+            return
 
-        if not channel:
+        record = self.bot.message_store.pop(payload.guild_id, payload.message_id)
+        cached = payload.cached_message
+
+        # the store skips bots, so only discord.py's cache can tell us this
+        if record is None and cached is not None and cached.author.bot:
             return
 
-        if msg.author.bot:
+        channel = await self.get_logs_channel(payload.guild_id)
+        if not channel:
             return
 
         em = discord.Embed(
-            title=f"Message deleted in #{msg.channel}",
-            description=msg.content,
+            title=f"Message deleted in {self._channel_name(payload.channel_id)}",
             color=self.bot.failed,
-            timestamp=msg.created_at,
+            timestamp=discord.utils.snowflake_time(payload.message_id),
         )
-        em.set_author(name=msg.author, icon_url=msg.author.avatar.url)
-        em.set_footer(text=f"User ID: {msg.author.id}")
+
+        if record is not None:
+            em.description = record.content
+            author_id = record.author_id
+
+        elif cached is not None:
+            em.description = cached.content
+            author_id = cached.author.id
+
+        else:
+            em.description = "*This message was not cached.*"
+            em.set_footer(text=f"Message ID: {payload.message_id}")
+            return await channel.send(embed=em)  # type: ignore
+
+        user = self._message_author(payload.guild_id, author_id)
+        if user is not None:
+            em.set_author(name=user, icon_url=user.display_avatar.url)
+
+        em.set_footer(text=f"User ID: {author_id}")
 
         await channel.send(embed=em)  # type: ignore
 
+    @Cog.listener()
+    async def on_raw_bulk_message_delete(
+        self, payload: discord.RawBulkMessageDeleteEvent
+    ):
+        if payload.guild_id is None:
+            return
+
+        store = self.bot.message_store
+        found = {}
+
+        for message in payload.cached_messages:
+            if not message.author.bot:
+                found[message.id] = (message.author.id, message.content)
+
+        for message_id in payload.message_ids:
+            record = store.pop(payload.guild_id, message_id)
+            if record is not None:
+                found[message_id] = (record.author_id, record.content)
+
+        channel = await self.get_logs_channel(payload.guild_id)
+        if not channel:
+            return
+
+        lines = []
+        for message_id in sorted(found):
+            author_id, content = found[message_id]
+            user = self._message_author(payload.guild_id, author_id)
+            sent = discord.utils.snowflake_time(message_id)
+            lines.append(
+                f"[{sent:%Y-%m-%d %H:%M:%S}] {user or 'Unknown user'} "
+                f"({author_id}): {content}"
+            )
+
+        where = self._channel_name(payload.channel_id)
+        em = discord.Embed(
+            title=f"{plural(len(payload.message_ids)):message} deleted in {where}",
+            description=(
+                f"{len(found)} of them were cached, their content is attached."
+                if found
+                else "None of them were cached."
+            ),
+            color=self.bot.failed,
+            timestamp=discord.utils.utcnow(),
+        )
+
+        if not lines:
+            return await channel.send(embed=em)  # type: ignore
+
+        fp = io.BytesIO("\n".join(lines).encode("utf-8"))
+        file = discord.File(fp, f"deleted-messages-{payload.channel_id}.txt")
+        await channel.send(embed=em, file=file)  # type: ignore
+
     # ====== MEMBER LOGS ======
 
     @Cog.listener()
@@ -474,27 +567,24 @@ class Events(Cog):
         #     except:
         #         pass
 
+        counts = await self.bot.stats.complete(guild)
+
         em = discord.Embed(title="Guild Joined", color=self.bot.success)
         em.add_field(name="Guild", value=guild.name, inline=False)
-        em.add_field(
-            name="Members",
-            value=len([m for m in guild.members if not m.bot]),
-            inline=False,
-        )
-        em.add_field(
-            name="Bots", value=sum(member.bot for member in guild.members), inline=False
-        )
+        em.add_field(name="Members", value=counts.humans, inline=False)
+        em.add_field(name="Bots", value=counts.bots, inline=False)
         em.add_field(name="Owner", value=guild.owner, inline=False)
+        em.add_field(name="Total guilds", value=await self.total_guilds())
 
-        channel = self.bot.get_channel(LOG_CHANNEL)
-        await channel.send(embed=em)  # type: ignore
+        await self.log_channel.send(embed=em)
 
     @Cog.listener()
     async def on_guild_remove(self, guild):
-        await self.bot.db.execute("DELETE FROM modlogs WHERE guild_id=$1", guild.id)  # type: ignore
+        await self.bot.queries.delete_modlog(guild.id)
 
-        channel = self.bot.get_channel(LOG_CHANNEL)
-        await channel.send(f"Left {guild.name}")  # type: ignore
+        await self.log_channel.send(
+            f"Left {guild.name}, now in {await self.total_guilds()} guilds"
+        )
 
 
 async def setup(bot):
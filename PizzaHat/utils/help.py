@@ -1,4 +1,5 @@
-from typing import List, Mapping, Optional, Set
+import inspect
+from typing import Any, Dict, FrozenSet, List, Optional, Sequence, Set, Tuple
 
 import discord
 from discord import ButtonStyle, Interaction, ui
@@ -8,12 +9,46 @@ from core.bot import PizzaHat
 from core.cog import Cog
 from utils.config import COG_EXCEPTIONS
 
+Payload = Dict[str, Any]
 
-def bot_help_embed(ctx: commands.Context[PizzaHat]):
-    assert ctx.bot.user is not None, "Bot is not logged in yet."
+
+def required_permissions(
+    command: commands.Command,
+) -> Tuple[discord.Permissions, bool]:
+    """
+    Reads the permissions a command's checks ask for, and whether it is owner
+    only, without running the checks.
+
+    This is the one place that looks inside discord.py's checks. The stock
+    `commands.has_permissions` keeps the permissions it was given in its
+    predicate's closure, and `commands.is_owner`'s predicate is a local
+    function of it, so any command using them is covered. Other checks
+    can't be read and are left to run when the command is invoked.
+    """
+
+    perms = discord.Permissions.none()
+    owner_only = False
+
+    for check in command.checks:
+        if getattr(check, "__module__", None) != commands.core.__name__:
+            continue
+
+        qualname = getattr(check, "__qualname__", "")
+
+        if qualname.startswith("has_permissions."):
+            wanted = inspect.getclosurevars(check).nonlocals.get("perms", {})
+            perms.update(**{k: v for k, v in wanted.items() if v})
+
+        elif qualname.startswith("is_owner."):
+            owner_only = True
+
+    return perms, owner_only
+
+
+def bot_help_payload(bot: PizzaHat) -> Payload:
+    assert bot.user is not None, "Bot is not logged in yet."
     em = discord.Embed(
-        title=f"{ctx.bot.user.name} Help",
-        timestamp=ctx.message.created_at,
+        title=f"{bot.user.name} Help",
         color=discord.Color.blue(),
     )
     em.description = """
@@ -28,22 +63,19 @@ Use the dropdown menu to select a category.\n
         value="For more help, consider joining the official server over at https://discord.gg/WhNVDTF",
         inline=False,
     )
-    em.add_field(name="About me", value=ctx.bot.description, inline=False)
+    em.add_field(name="About me", value=bot.description, inline=False)
     em.add_field(
         name="🔗 Links",
         value="**[Invite me](https://dsc.gg/pizza-invite)** • **[Vote](https://top.gg/bot/860889936914677770/vote)**",
         inline=False,
     )
 
-    em.set_thumbnail(url=ctx.bot.user.display_avatar.url)
-    em.set_footer(
-        text=f"Requested by {ctx.author}", icon_url=ctx.author.display_avatar.url
-    )
+    em.set_thumbnail(url=bot.user.display_avatar.url)
 
-    return em
+    return em.to_dict()
 
 
-def cog_help_embed(cog: Cog):
+def cog_help_embed(cog: Cog, cmds: Sequence[commands.Command]):
     desc = cog.full_description if cog.full_description else None
     title = cog.qualified_name
 
@@ -55,7 +87,7 @@ def cog_help_embed(cog: Cog):
         color=discord.Color.blue(),
     )
 
-    for x in sorted(cog.get_commands(), key=lambda c: c.name):
+    for x in cmds:
         cmd_help = x.short_doc if x.short_doc else x.help
         em.add_field(name=f"{x.name} {x.signature}", value=cmd_help, inline=False)
 
@@ -64,10 +96,145 @@ def cog_help_embed(cog: Cog):
     return em
 
 
-def cmds_list_embed(
-    ctx: commands.Context[PizzaHat],
-    mapping: Mapping[Optional[Cog], List[commands.Command]],
-):
+def command_help_payload(command: commands.Command) -> Payload:
+    # the title is the signature, which depends on the prefix used, so
+    # it gets filled in when the embed is sent
+    embed = discord.Embed(
+        description=command.help or "No help found...",
+        color=discord.Color.blue(),
+    )
+
+    if command.aliases:
+        embed.add_field(
+            name="Aliases",
+            value=", ".join(["`" + str(alias) + "`" for alias in command.aliases]),
+            inline=False,
+        )
+
+    if cog := command.cog:
+        embed.add_field(name="Category", value=cog.qualified_name, inline=False)
+
+    if command._buckets and (cooldown := command._buckets._cooldown):
+        embed.add_field(
+            name="Cooldown",
+            value=f"{cooldown.rate} per {cooldown.per:.0f} seconds",
+            inline=False,
+        )
+
+    return embed.to_dict()
+
+
+class CommandEntry:
+    __slots__ = ("command", "required", "owner_only")
+
+    def __init__(self, command: commands.Command):
+        self.command = command
+        self.required, self.owner_only = required_permissions(command)
+
+    def visible_to(self, perms: discord.Permissions, is_owner: bool) -> bool:
+        if self.command.hidden or (self.owner_only and not is_owner):
+            return False
+
+        return self.required.is_subset(perms)
+
+
+class CogEntry:
+    """A cog's commands in display order, with its embeds cached per visible set."""
+
+    def __init__(self, cog: Cog):
+        self.cog = cog
+        self.name = cog.qualified_name
+        self.listed = self.name not in COG_EXCEPTIONS
+        self.commands = [
+            CommandEntry(c) for c in sorted(cog.get_commands(), key=lambda c: c.name)
+        ]
+        self.option = discord.SelectOption(
+            label=self.name,
+            description=cog.description,
+            emoji=cog.emoji if hasattr(cog, "emoji") else None,
+        )
+        self._embeds: Dict[FrozenSet[str], Payload] = {}
+        self._fields: Dict[FrozenSet[str], Payload] = {}
+
+    def visible(
+        self, perms: discord.Permissions, is_owner: bool
+    ) -> List[CommandEntry]:
+        return [e for e in self.commands if e.visible_to(perms, is_owner)]
+
+    def embed(self, visible: Optional[List[CommandEntry]] = None) -> discord.Embed:
+        entries = self.commands if visible is None else visible
+        key = frozenset(e.command.name for e in entries)
+        payload = self._embeds.get(key)
+
+        if payload is None:
+            cmds = [e.command for e in entries]
+            payload = self._embeds[key] = cog_help_embed(self.cog, cmds).to_dict()
+
+        return discord.Embed.from_dict(payload)
+
+    def field(self, visible: List[CommandEntry]) -> Payload:
+        key = frozenset(e.command.name for e in visible)
+        field = self._fields.get(key)
+
+        if field is None:
+            cmds = ", ".join(f"`{e.command.name}`" for e in visible)
+            cog_emoji = self.cog.emoji if hasattr(self.cog, "emoji") else None
+            field = self._fields[key] = {
+                "name": f"{cog_emoji} {self.name}",
+                "value": cmds,
+                "inline": False,
+            }
+
+        return field
+
+
+class HelpIndex:
+    """
+    Everything the help command shows, built once when extensions load.
+    Filtering by the invoker's permissions only picks from prebuilt entries.
+    """
+
+    def __init__(self):
+        self.home: Payload = {}
+        self.cogs: Dict[str, CogEntry] = {}
+        self.commands: Dict[str, Payload] = {}
+        self.options: List[discord.SelectOption] = []
+
+    @property
+    def built(self) -> bool:
+        return bool(self.home)
+
+    def build(self, bot: PizzaHat):
+        self.home = bot_help_payload(bot)
+        self.cogs = {
+            cog.qualified_name: CogEntry(cog)  # type: ignore
+            for cog in sorted(bot.cogs.values(), key=lambda c: c.qualified_name)
+        }
+        self.commands = {
+            command.qualified_name: command_help_payload(command)
+            for command in bot.walk_commands()
+        }
+        self.options = [entry.option for entry in self.cogs.values() if entry.listed]
+
+    def get_cog(self, name: str) -> Optional[CogEntry]:
+        return self.cogs.get(name)
+
+
+def _invoker(ctx: commands.Context) -> Tuple[discord.Permissions, bool]:
+    return ctx.permissions, ctx.author.id == ctx.bot.owner_id
+
+
+def bot_help_embed(ctx: commands.Context[PizzaHat], index: HelpIndex):
+    em = discord.Embed.from_dict(index.home)
+    em.timestamp = ctx.message.created_at
+    em.set_footer(
+        text=f"Requested by {ctx.author}", icon_url=ctx.author.display_avatar.url
+    )
+
+    return em
+
+
+def cmds_list_embed(ctx: commands.Context[PizzaHat], index: HelpIndex):
     assert ctx.bot.user is not None, "Bot is not logged in yet."
     em = discord.Embed(
         title=f"{ctx.bot.user.name} Help",
@@ -80,75 +247,43 @@ def cmds_list_embed(
         text=f"Requested by {ctx.author}", icon_url=ctx.author.display_avatar.url
     )
 
-    for cog, commands_ in mapping.items():
-        if cog and cog.qualified_name not in COG_EXCEPTIONS:
-            cmds = ", ".join(
-                [
-                    f"`{command.name}`"
-                    for command in sorted(commands_, key=lambda x: x.name)
-                ]
-            )
-            cog_emoji = cog.emoji if hasattr(cog, "emoji") else None
-
-            em.add_field(
-                name=f"{cog_emoji} {cog.qualified_name}", value=cmds, inline=False
-            )
+    perms, is_owner = _invoker(ctx)
+    for entry in index.cogs.values():
+        if entry.listed:
+            visible = entry.visible(perms, is_owner)
+            if visible:
+                em.add_field(**entry.field(visible))
 
     return em
 
 
 class HelpDropdown(ui.Select):
-    def __init__(
-        self,
-        mapping: Mapping[Optional[Cog], List[commands.Command]],
-        ctx: commands.Context,
-    ):
-        self.cog_mapping = mapping
+    def __init__(self, index: HelpIndex, ctx: commands.Context):
+        self.index = index
         self.ctx = ctx
 
-        options = []
-
-        for cog, _ in mapping.items():
-            if cog and cog.qualified_name not in COG_EXCEPTIONS:
-                options.append(
-                    discord.SelectOption(
-                        label=cog.qualified_name,
-                        description=cog.description,
-                        emoji=cog.emoji if hasattr(cog, "emoji") else None,
-                    )
-                )
-
         super().__init__(
             placeholder="Choose a category...",
             min_values=1,
             max_values=1,
-            options=sorted(options, key=lambda x: x.label),
+            options=index.options,
         )
 
     async def callback(self, interaction: Interaction):
-        cog_name = self.values[0]
-        cog = None
+        entry = self.index.get_cog(self.values[0])
 
-        for c, _ in self.cog_mapping.items():
-            if c and c.qualified_name == cog_name:
-                cog = c
-                break
-
-        if cog:
-            await interaction.response.edit_message(embed=cog_help_embed(cog))
+        if entry:
+            visible = entry.visible(*_invoker(self.ctx))
+            await interaction.response.edit_message(embed=entry.embed(visible))
 
 
 class HelpView(ui.View):
-    def __init__(
-        self,
-        mapping: Mapping[Optional[Cog], List[commands.Command]],
-        ctx: commands.Context,
-    ):
+    def __init__(self, index: HelpIndex, ctx: commands.Context):
         super().__init__(timeout=180)
         self.ctx = ctx
-        self.mapping = mapping
+        self.index = index
         self.message = None
-        self.add_item(HelpDropdown(mapping, ctx))
+        self.add_item(HelpDropdown(index, ctx))
 
     async def on_timeout(self) -> None:
         if self.message:
@@ -167,12 +302,12 @@ class HelpView(ui.View):
 
     @ui.button(label="Home", emoji="🏠", style=ButtonStyle.blurple)
     async def go_home(self, interaction: Interaction, button: ui.Button):
-        embed = bot_help_embed(self.ctx)
+        embed = bot_help_embed(self.ctx, self.index)
         await interaction.response.edit_message(embed=embed, view=self)
 
     @ui.button(label="Commands List", emoji="📜", style=ButtonStyle.blurple)
     async def cmds_list(self, interaction: Interaction, button: ui.Button):
-        embed = cmds_list_embed(self.ctx, self.mapping)
+        embed = cmds_list_embed(self.ctx, self.index)
         await interaction.response.edit_message(embed=embed, view=self)
 
     @ui.button(label="Delete Menu", emoji="🛑", style=ButtonStyle.red)
@@ -194,38 +329,31 @@ class MyHelp(commands.HelpCommand):
             }
         )
 
+    @property
+    def ready_index(self) -> HelpIndex:
+        # HelpCommand deep copies its constructor arguments on every invoke,
+        # so the index lives on the cog instead of being passed in
+        index: HelpIndex = self.cog.index
+        if not index.built:
+            index.build(self.context.bot)
+
+        return index
+
     async def send(self, **kwargs):
         await self.get_destination().send(**kwargs)
 
     async def send_bot_help(self, mapping):
         ctx = self.context
-        view = HelpView(mapping, ctx)
-        view.message = await ctx.send(embed=bot_help_embed(ctx), view=view)
+        view = HelpView(self.ready_index, ctx)
+        view.message = await ctx.send(embed=bot_help_embed(ctx, view.index), view=view)
 
     async def send_command_help(self, command: commands.Command):
-        signature = self.get_command_signature(command)
-        embed = discord.Embed(
-            title=signature,
-            description=command.help or "No help found...",
-            color=discord.Color.blue(),
-        )
-
-        if command.aliases:
-            embed.add_field(
-                name="Aliases",
-                value=", ".join(["`" + str(alias) + "`" for alias in command.aliases]),
-                inline=False,
-            )
+        payload = self.ready_index.commands.get(command.qualified_name)
+        if payload is None:
+            payload = command_help_payload(command)
 
-        if cog := command.cog:
-            embed.add_field(name="Category", value=cog.qualified_name, inline=False)
-
-        if command._buckets and (cooldown := command._buckets._cooldown):
-            embed.add_field(
-                name="Cooldown",
-                value=f"{cooldown.rate} per {cooldown.per:.0f} seconds",
-                inline=False,
-            )
+        embed = discord.Embed.from_dict(payload)
+        embed.title = self.get_command_signature(command)
 
         await self.send(embed=embed)
 
@@ -253,7 +381,12 @@ class MyHelp(commands.HelpCommand):
         await self.send_help_embed(title, group.help, group.commands)
 
     async def send_cog_help(self, cog):
-        await self.send(embed=cog_help_embed(cog))
+        entry = self.ready_index.get_cog(cog.qualified_name)
+
+        if entry is None:
+            return await self.send(embed=cog_help_embed(cog, cog.get_commands()))
+
+        await self.send(embed=entry.embed(entry.visible(*_invoker(self.context))))
 
     async def send_error_message(self, error):
         channel = self.get_destination()
@@ -263,10 +396,15 @@ class MyHelp(commands.HelpCommand):
 class Help(Cog, emoji="❓"):
     def __init__(self, bot: PizzaHat):
         self.bot: PizzaHat = bot
+        self.index = HelpIndex()
         help_command = MyHelp()
         help_command.cog = self
         bot.help_command = help_command
 
+    @Cog.listener()
+    async def on_extensions_loaded(self):
+        self.index.build(self.bot)
+
 
 async def setup(bot: PizzaHat):
     await bot.add_cog(Help(bot))
@@ -0,0 +1,177 @@
+import asyncio
+import hashlib
+import json
+import logging
+import os
+from collections import OrderedDict
+from typing import Any, Awaitable, Callable, Dict, Optional, Tuple
+
+logger = logging.getLogger("bot")
+
+CACHE_DIR = os.getenv("IMAGE_CACHE_DIR", ".cache/images")
+CACHE_MAX_BYTES = int(os.getenv("IMAGE_CACHE_MAX_MB", "256")) * 1024**2
+
+# (image bytes, format) - format is the file extension, e.g. "png" or "gif"
+CachedImage = Tuple[bytes, str]
+
+
+class ImageCache:
+    """
+    Content-addressed, size-bounded LRU cache for generated images on disk.
+
+    Keys are derived from everything that determines the output, so an
+    entry never needs invalidating. Concurrent misses for the same key
+    share a single call to the factory.
+    """
+
+    def __init__(self, directory: str = CACHE_DIR, max_bytes: int = CACHE_MAX_BYTES):
+        self.directory = directory
+        self.max_bytes = max_bytes
+        self.total_bytes = 0
+        self._index: "OrderedDict[str, Tuple[int, str]]" = OrderedDict()
+        self._inflight: Dict[str, "asyncio.Task[CachedImage]"] = {}
+
+        self.hits = 0
+        self.misses = 0
+
+    @staticmethod
+    def make_key(feature: str, avatar_key: str, **args: Any) -> str:
+        raw = json.dumps([feature, avatar_key, args], sort_keys=True)
+        return hashlib.sha256(raw.encode("utf-8")).hexdigest()
+
+    def _path(self, key: str, fmt: str) -> str:
+        return os.path.join(self.directory, f"{key}.{fmt}")
+
+    def _scan(self):
+        os.makedirs(self.directory, exist_ok=True)
+        entries = []
+
+        for entry in os.scandir(self.directory):
+            if not entry.is_file():
+                continue
+
+            # left half written by a run that stopped mid `_write`
+            if entry.name.endswith(".tmp"):
+                os.remove(entry.path)
+                continue
+
+            key, fmt = os.path.splitext(entry.name)
+            if fmt:
+                stat = entry.stat()
+                entries.append((stat.st_mtime, key, stat.st_size, fmt[1:]))
+
+        # oldest first, so the least recently used entries get evicted first
+        for _, key, size, fmt in sorted(entries):
+            self._index[key] = (size, fmt)
+            self.total_bytes += size
+
+    async def load(self):
+        """Indexes whatever a previous run left on disk."""
+
+        self._index.clear()
+        self.total_bytes = 0
+        await asyncio.to_thread(self._scan)
+        await self._evict()
+
+    def _read(self, path: str) -> bytes:
+        with open(path, "rb") as f:
+            data = f.read()
+
+        # mtime doubles as the "last used" time across restarts
+        os.utime(path)
+        return data
+
+    def _write(self, path: str, data: bytes):
+        tmp = f"{path}.tmp"
+        with open(tmp, "wb") as f:
+            f.write(data)
+
+        os.replace(tmp, path)
+
+    async def _evict(self):
+        doomed = []
+
+        while self.total_bytes > self.max_bytes and self._index:
+            key, (size, fmt) = self._index.popitem(last=False)
+            self.total_bytes -= size
+            doomed.append(self._path(key, fmt))
+
+        for path in doomed:
+            try:
+                await asyncio.to_thread(os.remove, path)
+
+            except FileNotFoundError:
+                pass
+
+    async def get(self, key: str) -> Optional[CachedImage]:
+        entry = self._index.get(key)
+
+        if entry is None:
+            return None
+
+        size, fmt = entry
+
+        try:
+            data = await asyncio.to_thread(self._read, self._path(key, fmt))
+
+        except FileNotFoundError:
+            self._index.pop(key, None)
+            self.total_bytes -= size
+            return None
+
+        self._index.move_to_end(key)
+        return data, fmt
+
+    async def put(self, key: str, data: bytes, fmt: str):
+        await asyncio.to_thread(self._write, self._path(key, fmt), data)
+
+        old = self._index.pop(key, None)
+        if old is not None:
+            self.total_bytes -= old[0]
+
+        self._index[key] = (len(data), fmt)
+        self.total_bytes += len(data)
+        await self._evict()
+
+    async def _create(
+        self, key: str, factory: Callable[[], Awaitable[CachedImage]]
+    ) -> CachedImage:
+        try:
+            data, fmt = await factory()
+
+            try:
+                await self.put(key, data, fmt)
+
+            except OSError as e:
+                logger.warning(f"Could not write image cache entry {key}: {e}")
+
+            return data, fmt
+
+        finally:
+            self._inflight.pop(key, None)
+
+    async def get_or_create(
+        self, key: str, factory: Callable[[], Awaitable[CachedImage]]
+    ) -> CachedImage:
+        """
+        Returns the cached image for `key`, or awaits `factory` to make it.
+
+        If a call for the same key is already running, waits for that one
+        instead of calling `factory` again.
+        """
+
+        cached = await self.get(key)
+
+        if cached is not None:
+            self.hits += 1
+            return cached
+
+        self.misses += 1
+        task = self._inflight.get(key)
+
+        if task is None:
+            task = asyncio.create_task(self._create(key, factory))
+            self._inflight[key] = task
+
+        # shielded so one impatient caller can't cancel it for the others
+        return await asyncio.shield(task)
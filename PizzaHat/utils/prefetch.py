@@ -0,0 +1,142 @@
+import asyncio
+import logging
+import time
+from collections import deque
+from typing import Awaitable, Callable, Deque, Generic, List, Optional, Tuple, TypeVar
+
+logger = logging.getLogger("bot")
+
+T = TypeVar("T")
+
+
+class PrefetchPool(Generic[T]):
+    """
+    Keeps a buffer of results from an endpoint that returns something random
+    on every call, topping it up in the background whenever it drops below
+    the low watermark so commands can answer straight from memory.
+
+    `fetch` returns a list so endpoints that hand out a batch per call
+    (like a subreddit listing) fill several slots with one request.
+    """
+
+    def __init__(
+        self,
+        name: str,
+        fetch: Callable[[], Awaitable[List[T]]],
+        *,
+        size: int = 20,
+        low_water: int = 5,
+        concurrency: int = 4,
+        max_age: Optional[float] = None,
+    ):
+        self.name = name
+        self.size = size
+        self.low_water = low_water
+        self.concurrency = concurrency
+        self.max_age = max_age
+        self._fetch = fetch
+        self._buffer: Deque[Tuple[float, T]] = deque()
+        self._wakeup = asyncio.Event()
+        self._task: Optional[asyncio.Task] = None
+
+        self.hits = 0
+        self.misses = 0
+        self.fetches = 0
+
+    def __len__(self) -> int:
+        return len(self._buffer)
+
+    def start(self):
+        if self._task is None or self._task.done():
+            self._wakeup.set()
+            self._task = asyncio.create_task(self._run(), name=f"prefetch:{self.name}")
+
+    def stop(self):
+        if self._task is not None:
+            self._task.cancel()
+            self._task = None
+
+    def _add(self, results: List[T]):
+        now = time.monotonic()
+        self._buffer.extend((now, r) for r in results)
+
+    def _pop(self) -> Optional[T]:
+        cutoff = time.monotonic() - self.max_age if self.max_age else None
+
+        while self._buffer:
+            fetched_at, item = self._buffer.popleft()
+            if cutoff is None or fetched_at >= cutoff:
+                return item
+
+        return None
+
+    async def _fetch_counted(self) -> List[T]:
+        self.fetches += 1
+        return await self._fetch()
+
+    async def _run(self):
+        failures = 0
+
+        while True:
+            await self._wakeup.wait()
+            self._wakeup.clear()
+
+            while len(self._buffer) < self.size:
+                missing = self.size - len(self._buffer)
+                batches = await asyncio.gather(
+                    *(
+                        self._fetch_counted()
+                        for _ in range(min(self.concurrency, missing))
+                    ),
+                    return_exceptions=True,
+                )
+
+                before = len(self._buffer)
+                errors = [b for b in batches if isinstance(b, BaseException)]
+                for batch in batches:
+                    if not isinstance(batch, BaseException):
+                        self._add(batch)
+
+                # empty batches too, or the loop would keep asking for more
+                if len(self._buffer) == before:
+                    failures += 1
+                    delay = min(2**failures, 300)
+                    reason = repr(errors[0]) if errors else "no results"
+                    logger.warning(
+                        f"Prefetch pool {self.name} failed to refill "
+                        f"({reason}), retrying in {delay}s"
+                    )
+                    await asyncio.sleep(delay)
+
+                else:
+                    failures = 0
+
+    async def get(self) -> T:
+        """Returns a buffered result, fetching one directly if the pool is dry."""
+
+        item = self._pop()
+
+        if len(self._buffer) < self.low_water:
+            self._wakeup.set()
+
+        if item is not None:
+            self.hits += 1
+            return item
+
+        self.misses += 1
+        results = await self._fetch_counted()
+
+        if not results:
+            raise LookupError(f"Prefetch pool {self.name} got no results")
+
+        self._add(results[1:])
+        return results[0]
+
+
+def single(fetch: Callable[[], Awaitable[T]]) -> Callable[[], Awaitable[List[T]]]:
+    """Adapts a fetcher that returns one result to the batch interface."""
+
+    async def wrapper() -> List[T]:
+        return [await fetch()]
+
+    return wrapper
@@ -0,0 +1,103 @@
+import asyncio
+import logging
+import time
+from typing import Dict, Iterable, Set, Union
+
+import discord
+
+logger = logging.getLogger("bot")
+
+# Discord's add-reaction route is bucketed per channel and allows
+# roughly one request every 250ms before returning a 429.
+REACTION_INTERVAL = 0.25
+
+EmojiType = Union[discord.Emoji, discord.PartialEmoji, discord.Reaction, str]
+
+
+class ReactionBucket:
+    """Hands out send slots for one channel's add-reaction bucket."""
+
+    def __init__(self, interval: float = REACTION_INTERVAL):
+        self.interval = interval
+        self.next_at = 0.0
+
+    def reserve(self) -> float:
+        """Reserves the next free slot and returns how long to wait for it."""
+
+        now = time.monotonic()
+        slot = max(now, self.next_at)
+        self.next_at = slot + self.interval
+        return slot - now
+
+    @property
+    def idle(self) -> bool:
+        return self.next_at <= time.monotonic()
+
+
+_buckets: Dict[int, ReactionBucket] = {}
+_pending: Set["asyncio.Task[float]"] = set()
+
+
+def _forget(channel_id: int, bucket: ReactionBucket):
+    if _buckets.get(channel_id) is bucket and bucket.idle:
+        del _buckets[channel_id]
+
+
+async def _seed(message: discord.Message, emojis: list) -> float:
+    channel_id = message.channel.id
+    bucket = _buckets.setdefault(channel_id, ReactionBucket())
+    added = 0
+    start = time.perf_counter()
+
+    try:
+        for emoji in emojis:
+            await asyncio.sleep(bucket.reserve())
+
+            try:
+                await message.add_reaction(emoji)
+                added += 1
+
+            except discord.NotFound:
+                # the message was deleted while we were still seeding it
+                break
+
+            except discord.HTTPException as e:
+                logger.warning(f"Failed to add {emoji} to message {message.id}: {e}")
+
+    finally:
+        # kept until its last slot has passed, so a new bucket for the
+        # channel doesn't start sending too early
+        asyncio.get_running_loop().call_later(
+            max(bucket.next_at - time.monotonic(), 0), _forget, channel_id, bucket
+        )
+
+    elapsed = time.perf_counter() - start
+    logger.info(
+        f"Seeded {added}/{len(emojis)} reactions on message {message.id} in {elapsed:.2f}s"
+    )
+    return elapsed
+
+
+async def drain():
+    """Waits for the reactions still being seeded."""
+
+    while _pending:
+        await asyncio.wait(set(_pending))
+
+
+def seed_reactions(
+    message: discord.Message, emojis: Iterable[EmojiType]
+) -> "asyncio.Task[float]":
+    """
+    Adds reactions to a message in the background, in order, paced to the
+    channel's reaction rate-limit bucket.
+
+    Returns the seeding task, whose result is the time seeding took in seconds.
+    """
+
+    task = asyncio.create_task(
+        _seed(message, list(emojis)), name=f"seed-reactions:{message.id}"
+    )
+    _pending.add(task)
+    task.add_done_callback(_pending.discard)
+    return task